@@ -0,0 +1,55 @@
+import statistics
+import subprocess
+import sys
+
+# Modules and commands to time, each is started in a fresh interpreter, so
+# the timings include everything imported on the way
+modules = [
+    "simscale_eba.cli",
+    "simscale_eba.cli.cast_data",
+    "simscale_eba.cli.read_direction",
+    "simscale_eba.cli.create_speed_matrix",
+    "simscale_eba.PedestrianWindComfort",
+    "simscale_eba.HourlyContinuous",
+]
+
+commands = [
+    ["cast-ordinate", "--help"],
+    ["cast-speed", "--help"],
+    ["get-direction", "--help"],
+]
+
+repeats = 5
+
+
+def time_code(code):
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", code],
+                                capture_output=True, text=True, check=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+
+    return statistics.median(timings)
+
+
+module_code = ("import time\n"
+               "start = time.perf_counter()\n"
+               "import {}\n"
+               "print(time.perf_counter() - start)")
+
+command_code = ("import sys, time\n"
+                "start = time.perf_counter()\n"
+                "from simscale_eba.cli import main\n"
+                "sys.argv = ['simscale-eba'] + {}\n"
+                "try:\n"
+                "    main()\n"
+                "except SystemExit:\n"
+                "    pass\n"
+                "print(time.perf_counter() - start)")
+
+for module in modules:
+    print("import {:<45} {:.3f}s".format(module, time_code(module_code.format(module))))
+
+for command in commands:
+    print("simscale-eba {:<39} {:.3f}s".format(" ".join(command),
+                                               time_code(command_code.format(command))))
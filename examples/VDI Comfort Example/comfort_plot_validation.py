@@ -47,42 +47,26 @@ vdi_comfort_array = np.array([[6, 9, 12, 15],
 vdi_comfort_labels = ['A', 'B', 'C', 'D']
 vdi_frequency_bins = [0.01, 0.05, 0.2, 1, 5, 10]
 
-i = 0
-for frequency in vdi_frequency_bins:
-    speeds = vdi_comfort_array[i]
-
-    comfort_dict = {
-        "0": {"name": vdi_comfort_labels[0],
-              "description": None,
-              "frequency": ["less", frequency],
-              "speed": speeds[0]
-              },
-        "1": {"name": vdi_comfort_labels[1],
-              "description": None,
-              "frequency": ["less", frequency],
-              "speed": speeds[1]
-              },
-        "2": {"name": vdi_comfort_labels[2],
-              "description": None,
-              "frequency": ["less", frequency],
-              "speed": speeds[2]
-              },
-        "3": {"name": vdi_comfort_labels[3],
-              "description": None,
-              "frequency": ["less", frequency],
-              "speed": speeds[3]
-              }
-    }
+criteria = []
+for frequency, speeds in zip(vdi_frequency_bins, vdi_comfort_array):
+    comfort_dict = {}
+    for i, (label, speed) in enumerate(zip(vdi_comfort_labels, speeds)):
+        comfort_dict[str(i)] = {"name": label,
+                                "description": None,
+                                "frequency": ["less", frequency],
+                                "speed": speed
+                                }
 
     comfort_criteria = pp.comfort_criteria("VDI {}".format(frequency))
     comfort_criteria.set_dict(comfort_dict)
+    criteria.append(comfort_criteria)
 
-    results.set_comfort_criteria(comfort_criteria)
-
-    results.calculate_wind_comfort()
-    test = results.weather_statistics.weibull_parameters
+# Every frequency bin is evaluated together, with the worst category
+results.set_comfort_criteria(criteria)
+results.calculate_wind_comfort()
 
-    comfort_path = pathlib.Path.cwd()
+comfort_path = pathlib.Path.cwd()
+for frequency in vdi_frequency_bins:
     pp.to_paraview(comfort_path, "comfort_map_VDI {}.result".format(frequency))
 
-    i += 1
+pp.to_paraview(comfort_path, "comfort_map_worst_case.result")
@@ -0,0 +1,88 @@
+import pathlib
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import weibull_min
+
+import simscale_eba.HourlyContinuous as hc
+import simscale_eba.post_processing.ComfortFrequencies as cf
+
+# Compares the closed form Weibull exceedance and its lookup table to
+# scipy, on the probe points and weather of the PWC example
+pwc_path = pathlib.Path(__file__).parent.parent / "PWC"
+epw_path = pwc_path / "USA_MA_Boston-Logan.Intl.AP.725090_TMYx.2004-2018.epw"
+
+directions = np.arange(0, 360, 30)
+criteria_speeds = np.array([1.8, 3.6, 5.3, 7.6, 15])
+
+# The probe points are tiled to a map sized number of points
+repeats = 100
+reference_speed = 10
+
+hourly_continuous = hc.HourlyContinuous()
+hourly_continuous.import_epw(epw_path)
+
+weather = hc.WeatherStatistics()
+weather.set_directions(directions)
+weather.set_speeds(np.arange(0.5, 20, 0.5))
+weather.set_hourly_continuous(hourly_continuous)
+
+columns = []
+for direction in directions:
+    path = pwc_path / "PROBE_POINT_PLOT_STATISTICAL_DATA_Comfort plot_{}.csv".format(direction)
+    df = pd.read_csv(path)
+    columns.append(df.loc[df["VARIABLE"] == "UMag", "AVG"].to_numpy() / reference_speed)
+
+gamma = np.tile(np.stack(columns, axis=1), (repeats, 1))
+scale, shape, P = cf.align_weibull_parameters(directions, weather.weibull_parameters)
+
+print("{} points, {} directions, {} criteria".format(
+    gamma.shape[0], gamma.shape[1], len(criteria_speeds)))
+
+
+def scipy_exceedance(gamma):
+    bins = criteria_speeds[np.newaxis, np.newaxis, :] / gamma[:, :, np.newaxis]
+    return (weibull_min.sf(bins,
+                           shape[np.newaxis, :, np.newaxis], 0,
+                           scale[np.newaxis, :, np.newaxis])
+            * P[np.newaxis, :, np.newaxis]).sum(axis=1)
+
+
+def time_function(function, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings), result
+
+
+scipy_time, expected = time_function(lambda: scipy_exceedance(gamma))
+kernel_time, kernel = time_function(
+    lambda: cf.total_exceedance(gamma, criteria_speeds, scale, shape, P))
+
+start = time.perf_counter()
+table = cf.ExceedanceTable(criteria_speeds, scale, shape, P)
+table_build_time = time.perf_counter() - start
+table_time, interpolated = time_function(lambda: table.total_exceedance(gamma))
+
+print("scipy weibull_min.sf     {:.3f}s".format(scipy_time))
+print("closed form kernel       {:.3f}s, max error {:.1e}".format(
+    kernel_time, np.abs(kernel - expected).max()))
+print("lookup table             {:.3f}s, max error {:.1e}, built in {:.3f}s".format(
+    table_time, np.abs(interpolated - expected).max(), table_build_time))
+
+# Scalar calls, as frequencies() is used
+start = time.perf_counter()
+for i in range(10000):
+    weibull_min.sf(5.3 / 1.2, shape[0], 0, scale[0]) * P[0]
+scalar_scipy = time.perf_counter() - start
+
+start = time.perf_counter()
+for i in range(10000):
+    cf.weibull_exceedance(5.3, 1.2, scale[0], shape[0], P[0])
+scalar_kernel = time.perf_counter() - start
+
+print("10000 scalar calls, scipy {:.3f}s, kernel {:.3f}s".format(scalar_scipy, scalar_kernel))
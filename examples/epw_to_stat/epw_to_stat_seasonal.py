@@ -10,23 +10,30 @@ epw = hc.HourlyContinuous()
 path = r'E:\Current Cases\external-building-aerodynamics\examples\epw_to_stat\USA_MA_Boston-Logan.Intl.AP.725090_TMYx.2004-2018.epw'
 epw.import_epw(pathlib.Path(path))
 
-#Set aperiod, summer only, between 7am and 6pm
-period = hc.WeatherPeriod()
-period.set_name('summer')
-period.set_start_datetime(7, 1, 7)
-period.set_end_datetime(18, 30, 9)
-
-epw.set_period(period)
-
-#Create statistics for the stat file, use 36 wind directions, set the 
-#speed bins from 0.5m/s in 1m/s increments
-weather_stats = hc.WeatherStatistics()
-weather_stats.set_directions(np.arange(0, 360, 10))
-weather_stats.set_speeds(np.arange(0.5, 16, 1))
-weather_stats.set_hourly_continuous(epw)
-
-#Export for SimScale
-weather_stats.to_stat()
-
-#Plot the mathmatical distribution for each direction
-weather_stats.plot_cumulative_distributions()
\ No newline at end of file
+#Set the periods, summer and winter, between 7am and 6pm
+summer = hc.WeatherPeriod()
+summer.set_name('summer')
+summer.set_start_datetime(7, 1, 7)
+summer.set_end_datetime(18, 30, 9)
+
+winter = hc.WeatherPeriod()
+winter.set_name('winter')
+winter.set_start_datetime(7, 1, 12)
+winter.set_end_datetime(18, 28, 2)
+
+#Both periods are found in one pass over the hours
+seasons = epw.split_periods([summer, winter])
+
+for name, season in seasons.items():
+    #Create statistics for the stat file, use 36 wind directions, set the 
+    #speed bins from 0.5m/s in 1m/s increments
+    weather_stats = hc.WeatherStatistics()
+    weather_stats.set_directions(np.arange(0, 360, 10))
+    weather_stats.set_speeds(np.arange(0.5, 16, 1))
+    weather_stats.set_hourly_continuous(season)
+
+    #Export for SimScale, as summer.stat and winter.stat
+    weather_stats.to_stat()
+
+    #Plot the mathmatical distribution for each direction
+    weather_stats.plot_cumulative_distributions()
@@ -38,9 +38,43 @@ def list_to_tree(input, none_and_holes=True, source=[0]):
 
     if input is not None: t = Tree[object]();proc(input, t, source[:]);return t
 
-speed_to_csv(path, speeds, directions)
 
+# The code after "Start of GH code" is pasted into a GhPython component,
+# which runs IronPython and cannot import simscale_eba or a module next to
+# this file, so each component keeps its own copy of query_server. Keep
+# the copies in return_points.py, return_results.py and
+# create_speed_matrix.py the same.
+def query_server(request, port=50123):
+    """Ask a running simscale-eba serve process, None if there is none"""
+    import json
+    import socket
+    try:
+        connection = socket.create_connection(("127.0.0.1", port), 1)
+    except socket.error:
+        return None
+    try:
+        connection.settimeout(None)
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        response = connection.makefile("rb").readline()
+    finally:
+        connection.close()
+    response = json.loads(response)
+    if "error" in response:
+        raise Exception(response["error"])
+    return response["result"]
+
+speed = None
 if _run:
+    speed = query_server({"command": "speed-matrix",
+                          "path": path,
+                          "speeds": [float(s) for s in speeds],
+                          "directions": [float(d) for d in directions]})
+    if speed is not None:
+        speed = list_to_tree(speed)
+
+if _run and speed is None:
+    speed_to_csv(path, speeds, directions)
+    
     # Hide the cmd window
     si = subprocess.STARTUPINFO()
     si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
@@ -9,7 +9,6 @@ _run = True
 # reference_speed = 10
 # direction = 45
 
-import ast
 # Start of GH code
 import subprocess
 
@@ -36,61 +35,77 @@ def list_to_tree(input, none_and_holes=True, source=[0]):
     if input is not None: t = Tree[object]();proc(input, t, source[:]);return t
 
 
+# The code after "Start of GH code" is pasted into a GhPython component,
+# which runs IronPython and cannot import simscale_eba or a module next to
+# this file, so each component keeps its own copy of query_server. Keep
+# the copies in return_points.py, return_results.py and
+# create_speed_matrix.py the same.
+def query_server(request, port=50123):
+    """Ask a running simscale-eba serve process, None if there is none"""
+    import json
+    import socket
+    try:
+        connection = socket.create_connection(("127.0.0.1", port), 1)
+    except socket.error:
+        return None
+    try:
+        connection.settimeout(None)
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        response = connection.makefile("rb").readline()
+    finally:
+        connection.close()
+    response = json.loads(response)
+    if "error" in response:
+        raise Exception(response["error"])
+    return response["result"]
+
+
+ordinates = None
 if _run:
-    # Hide the cmd window
-    si = subprocess.STARTUPINFO()
-    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-
-    read_x_code = subprocess.Popen(['simscale-eba',
-                                    'cast-ordinate',
-                                    path,
-                                    'X'],
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   startupinfo=si)
-
-    output, error = read_x_code.communicate()
-    output = output.decode("utf-8")
-
-    cleaned_error = error.replace("Exception", "")
+    answers = query_server({"command": "query",
+                            "path": path,
+                            "requests": [{"type": "ordinate", "ordinate": o}
+                                         for o in ["X", "Y", "Z"]]})
+    if answers is not None:
+        ordinates = [[], [], []]
+        for answer in answers:
+            ordinates[answer["request"]].append(answer["values"])
 
-    if (error != None) and (cleaned_error != ""):
-        raise Exception(error)
+        X, Y, Z = [list_to_tree(ordinate) for ordinate in ordinates]
 
-    X = list_to_tree(ast.literal_eval(output))
+if _run and ordinates is None:
+    import json
 
-    read_y_code = subprocess.Popen(['simscale-eba',
-                                    'cast-ordinate',
-                                    path,
-                                    'Y'],
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   startupinfo=si)
+    # Hide the cmd window
+    si = subprocess.STARTUPINFO()
+    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
 
-    output, error = read_y_code.communicate()
+    # X, Y and Z from a single process
+    read_xyz_code = subprocess.Popen(['simscale-eba',
+                                      'query',
+                                      path,
+                                      '-',
+                                      '--output-format',
+                                      'json'],
+                                     stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE,
+                                     startupinfo=si)
+
+    requests = [{"type": "ordinate", "ordinate": o} for o in ["X", "Y", "Z"]]
+    output, error = read_xyz_code.communicate(json.dumps(requests).encode("utf-8"))
     output = output.decode("utf-8")
+    error = error.decode("utf-8")
 
     cleaned_error = error.replace("Exception", "")
 
     if (error != None) and (cleaned_error != ""):
         raise Exception(error)
 
-    Y = list_to_tree(ast.literal_eval(output))
-
-    read_z_code = subprocess.Popen(['simscale-eba',
-                                    'cast-ordinate',
-                                    path,
-                                    'Z'],
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   startupinfo=si)
-
-    output, error = read_z_code.communicate()
-    output = output.decode("utf-8")
-
-    cleaned_error = error.replace("Exception", "")
+    answers = json.loads(output)
 
-    if (error != None) and (cleaned_error != ""):
-        raise Exception(error)
+    ordinates = [[], [], []]
+    for answer in answers:
+        ordinates[answer["request"]].append(answer["values"])
 
-    Z = list_to_tree(ast.literal_eval(output))
+    X, Y, Z = [list_to_tree(ordinate) for ordinate in ordinates]
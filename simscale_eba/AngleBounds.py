@@ -25,19 +25,101 @@ def return_quad(u, v):
 
 
 def check_within_bounds(upper, lower, angle):
-    u_upper, v_upper = angle_to_vectors(upper)
-    u_lower, v_lower = angle_to_vectors(lower)
-    u, v = angle_to_vectors(angle)
+    '''
+    Take the bounds of a sector, return if the angles are within it
 
-    q_upper = return_quad(u_upper, v_upper)
-    q_lower = return_quad(u_lower, v_lower)
+    A sector runs clockwise from lower, exclusive, to upper, inclusive,
+    and may wrap around north, e.g. 355 to 5. All arguments are in 
+    compass degrees and may be arrays.
+    '''
+    width = np.mod(np.subtract(upper, lower), 360)
+    offset = np.mod(np.subtract(angle, lower), 360)
 
-    if (q_lower > q_upper) and (((angle > lower) and (angle <= 360)) or ((angle <= upper) and (angle >= 0))):
-        return True
-    elif (angle <= upper) and (angle > lower):
-        return True
+    return (offset > 0) & (offset <= width)
+
+
+def sector_bounds(directions):
+    '''
+    Take the sector directions, return the bounds of each sector
+
+    The bounds are halfway between neighbouring directions, the sector
+    of the last direction wraps around north to the first.
+
+    Parameters
+    ----------
+    directions : list
+        The centre of each sector in compass degrees.
+
+    Returns
+    -------
+    lower : np.array
+        The lower bound of each sector, 0 to 360, in the order of 
+        directions.
+    upper : np.array
+        The upper bound of each sector, 0 to 360.
+
+    '''
+    directions = np.mod(np.asarray(directions, dtype=float), 360)
+    order = np.argsort(directions)
+    sorted_directions = directions[order]
+
+    upper = np.empty(len(directions))
+    upper[order] = (sorted_directions + np.append(sorted_directions[1:],
+                                                  sorted_directions[0] + 360)) / 2
+
+    lower = np.empty(len(directions))
+    lower[order] = np.roll(upper[order], 1)
+
+    return np.mod(lower, 360), np.mod(upper, 360)
+
+
+def sector_index(directions, angles, right=False):
+    '''
+    Take sector directions and angles, return the sector of each angle
+
+    The sector edges are computed once, and every angle is placed with 
+    a single search, including the sector that wraps around north.
+
+    Parameters
+    ----------
+    directions : list
+        The centre of each sector in compass degrees, in any order.
+    angles : float or np.array
+        One or many angles in compass degrees.
+    right : bool, optional
+        If False, an angle on an edge is in the sector clockwise of it, 
+        i.e. sectors are [lower, upper), if True, in the sector 
+        anticlockwise of it, i.e. (lower, upper].
+        
+        The default is False.
+
+    Returns
+    -------
+    int or np.array
+        The position in directions of the sector of each angle.
+
+    '''
+    directions = np.mod(np.asarray(directions, dtype=float), 360)
+    order = np.argsort(directions, kind="stable")
+    sorted_directions = directions[order]
+
+    # The upper edge of each sorted sector, the last wraps around north
+    edges = (sorted_directions + np.append(sorted_directions[1:],
+                                           sorted_directions[0] + 360)) / 2
+    first_lower = edges[-1] - 360
+
+    # Angles and edges as clockwise offsets from the first sector's 
+    # lower edge, so the wrap around north is a single interval
+    offset = np.mod(np.asarray(angles, dtype=float) - first_lower, 360)
+    edges = edges - first_lower
+
+    if right:
+        offset = np.where(offset == 0, 360, offset)
+        position = np.searchsorted(edges, offset, side="left")
     else:
-        return False
+        position = np.searchsorted(edges, offset, side="right")
+
+    return order[np.minimum(position, len(edges) - 1)]
 
 
 check = check_within_bounds(270, 5, 0)
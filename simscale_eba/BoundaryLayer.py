@@ -3,8 +3,6 @@ import pathlib
 import numpy as np
 import pandas as pd
 import pint as pt
-from scipy import optimize
-import matplotlib.pyplot as plt
 
 import simscale_eba.AblProfileFunctions as abl
 
@@ -127,6 +125,8 @@ class AtmosphericBoundaryLayer():
               )
 
     def get_z0_from_alpha(self):
+        from scipy import optimize
+
         def fun(x, alpha):
             return 0.24 + (0.096 * np.log10(x)) + (0.016 * (np.log10(x) ** 2)) - alpha
 
@@ -781,6 +781,8 @@ class AtmosphericBoundaryLayer():
     '''
     
     def plot_correction(self):
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots()
         
         correction = self.correctors
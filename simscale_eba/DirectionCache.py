@@ -0,0 +1,95 @@
+import collections
+import pathlib
+
+import pyarrow.feather as feather
+
+import simscale_eba.SimulationCore as sc
+
+# Default upper bound, in bytes, of the parsed tables held at once
+DEFAULT_CACHE_SIZE = 1024 ** 3
+
+
+class DirectionCache():
+    '''
+    A least recently used cache of parsed directional result tables.
+
+    Every processing stage of a PWC result reads the same directional
+    tables, the cache lets them share one parse of each file. Tables are
+    keyed by their resolved path, modification time and size, so a file
+    that is downloaded again is parsed again. When the tables held exceed
+    the memory budget, the least recently used are dropped.
+    '''
+
+    def __init__(self, memory_budget=DEFAULT_CACHE_SIZE):
+        self.memory_budget = memory_budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._tables = collections.OrderedDict()
+
+    def _key(self, path):
+        path = pathlib.Path(path).resolve()
+        stat = path.stat()
+        return (path.as_posix(), stat.st_mtime_ns, stat.st_size)
+
+    def read(self, path):
+        '''
+        Take a path to a directional result table, return a dataframe
+
+        The dataframe is shared between callers and should not be
+        modified in place.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            A path to a .csv or .feather file written from a .case file.
+
+        Returns
+        -------
+        pd.DataFrame
+            A dataframe with a row per point, and a column per field
+            component.
+
+        '''
+        key = self._key(path)
+
+        if key in self._tables:
+            self.hits += 1
+            self._tables.move_to_end(key)
+            return self._tables[key][0]
+
+        self.misses += 1
+        table = sc.read_direction_table(path)
+        size = int(table.memory_usage(index=True, deep=False).sum())
+
+        self._tables[key] = (table, size)
+        self.size += size
+
+        # Keep at least the table just read, even if it alone is too big
+        while self.size > self.memory_budget and len(self._tables) > 1:
+            _, (_, evicted_size) = self._tables.popitem(last=False)
+            self.size -= evicted_size
+
+        return table
+
+    def number_of_rows(self, path):
+        '''
+        Take a path to a directional result table, return its row count
+
+        A cached table is used if there is one, a .feather file is
+        otherwise counted from its metadata without parsing the columns.
+        '''
+        key = self._key(path)
+
+        if key in self._tables:
+            return self._tables[key][0].shape[0]
+
+        if pathlib.Path(path).suffix == ".feather":
+            return feather.read_table(path, columns=[], memory_map=True).num_rows
+
+        return self.read(path).shape[0]
+
+    def clear(self):
+        self._tables.clear()
+        self.size = 0
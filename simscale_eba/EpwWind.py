@@ -0,0 +1,213 @@
+import hashlib
+import io
+import os
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+# The number of header lines before the hourly data of an EPW
+HEADER_LINES = 8
+
+# The EPW fields read, counted from 0, month, day and hour 1 to 24, and
+# wind direction and speed
+MONTH, DAY, HOUR = 1, 2, 3
+WIND_DIRECTION, WIND_SPEED = 20, 21
+
+LOCATION_FIELDS = ["city", "state", "country", "source", "station_id",
+                   "latitude", "longitude", "time_zone", "elevation"]
+
+# Changed when the sidecar contents change, so older sidecars are re-read
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".wind.npz"
+
+
+class EpwWind():
+    '''
+    The hourly wind of an EPW, without its other weather fields.
+
+    Read with read_epw_wind. The datetimes are in 2017, or 2016 for a
+    leap year, and the values are aligned to them the same as the hourly
+    data of ladybug.epw.EPW.
+
+    Attributes
+    ----------
+    header : list
+        The 8 header lines of the EPW.
+    location : dict
+        The fields of the LOCATION header line, e.g. city, latitude.
+    is_leap_year : bool
+        True if the data has a 29th of February.
+    datetimes : pd.DatetimeIndex
+        The start of each hour.
+    wind_direction : np.array
+        The wind direction of each hour in degrees, as integers.
+    wind_speed : np.array
+        The wind speed of each hour in m/s.
+    '''
+
+    def __init__(self, header, datetimes, wind_direction, wind_speed):
+        self.header = list(header)
+        # The same unit whether parsed or loaded from the sidecar
+        self.datetimes = pd.DatetimeIndex(np.asarray(datetimes, dtype="datetime64[us]"))
+        self.wind_direction = np.asarray(wind_direction, dtype=np.int64)
+        self.wind_speed = np.asarray(wind_speed, dtype=np.float64)
+
+        location = self.header[0].strip().split(",")[1:]
+        self.location = dict(zip(LOCATION_FIELDS, location))
+
+        self.is_leap_year = bool(np.any((self.datetimes.month == 2)
+                                        & (self.datetimes.day == 29)))
+
+    def to_dataframe(self):
+        '''
+        Return the hourly direction and speed, indexed by datetime
+        '''
+        df = pd.DataFrame({"direction": self.wind_direction,
+                           "speed": self.wind_speed},
+                          index=self.datetimes)
+        df.index.name = "datetime"
+
+        return df
+
+
+def parse_epw_wind(data):
+    '''
+    Take the bytes of an EPW, return its wind
+
+    Only the header lines, and the month, day, hour, wind direction and
+    wind speed of each hour are parsed, the other 30 fields are skipped
+    by the C parser of pandas.
+
+    Parameters
+    ----------
+    data : bytes
+        The contents of an EPW file.
+
+    Returns
+    -------
+    EpwWind
+
+    '''
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        text = data.decode("latin-1")
+
+    header = text.split("\n", HEADER_LINES)[:HEADER_LINES]
+    if len(header) < HEADER_LINES or not header[0].startswith("LOCATION"):
+        raise Exception("Not an EPW, the first line should be LOCATION")
+
+    columns = [MONTH, DAY, HOUR, WIND_DIRECTION, WIND_SPEED]
+    df = pd.read_csv(io.StringIO(text), header=None, skiprows=HEADER_LINES,
+                     usecols=columns, names=range(WIND_SPEED + 1),
+                     index_col=False)
+
+    month = df[MONTH].to_numpy(dtype=np.int64)
+    day = df[DAY].to_numpy(dtype=np.int64)
+    hour = df[HOUR].to_numpy(dtype=np.int64) - 1
+
+    # The EPW year is the source year of each month, the hours are put
+    # in one year, as ladybug does
+    is_leap_year = bool(np.any((month == 2) & (day == 29)))
+    year = 2016 if is_leap_year else 2017
+
+    datetimes = pd.to_datetime({"year": np.full(len(df), year), "month": month,
+                                "day": day, "hour": hour})
+
+    # Wind is a reading at the end of each hour, the reading at 24:00 on
+    # the last day is put at 00:00 on the first, as ladybug does, so each
+    # datetime is the reading at the start of its hour
+    wind_direction = np.roll(np.rint(df[WIND_DIRECTION].to_numpy(dtype=float)), 1)
+    wind_speed = np.roll(df[WIND_SPEED].to_numpy(dtype=float), 1)
+
+    return EpwWind(header, datetimes, wind_direction, wind_speed)
+
+
+def _cache_path(epw_file):
+    epw_file = pathlib.Path(epw_file)
+    return epw_file.with_name(epw_file.name + CACHE_SUFFIX)
+
+
+def _read_cache(path, digest):
+    '''
+    Take a sidecar path and file hash, return the cached wind or None
+    '''
+    try:
+        with np.load(path, allow_pickle=False) as cache:
+            if (int(cache["version"]) != CACHE_VERSION
+                    or str(cache["digest"]) != digest):
+                return None
+
+            return EpwWind(cache["header"].tolist(),
+                           cache["datetimes"],
+                           cache["wind_direction"],
+                           cache["wind_speed"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_cache(path, digest, wind):
+    '''
+    Take a sidecar path, file hash and wind, write the sidecar if we can
+    '''
+    temporary = path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+    try:
+        with open(temporary, "wb") as outfile:
+            np.savez(outfile,
+                     version=np.array(CACHE_VERSION),
+                     digest=np.array(digest),
+                     header=np.array(wind.header),
+                     datetimes=np.asarray(wind.datetimes, dtype="datetime64[us]"),
+                     wind_direction=wind.wind_direction,
+                     wind_speed=wind.wind_speed)
+
+        # Atomic, so processes reading the same EPW never see half a file
+        os.replace(temporary, path)
+    except OSError:
+        # A read only folder, the EPW is parsed each time instead
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def read_epw_wind(epw_file, cache=True):
+    '''
+    Take a path to an EPW, return its hourly wind
+
+    The parsed wind is kept in a binary sidecar next to the EPW,
+    <name>.epw.wind.npz, with the hash of the EPW's contents. When the
+    same EPW is read again, e.g. by each process of a batch, or each
+    time a Grasshopper component runs, it is loaded from the sidecar
+    instead of parsed. If the EPW changes its hash does too, and it is
+    parsed again.
+
+    Parameters
+    ----------
+    epw_file : pathlib.Path
+        A path to the epw to read.
+    cache : bool, optional
+        Read and write the sidecar. The default is True.
+
+    Returns
+    -------
+    EpwWind
+        The header, datetimes, wind direction and wind speed.
+
+    '''
+    epw_file = pathlib.Path(epw_file)
+    data = epw_file.read_bytes()
+
+    if not cache:
+        return parse_epw_wind(data)
+
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    path = _cache_path(epw_file)
+
+    wind = _read_cache(path, digest)
+    if wind is None:
+        wind = parse_epw_wind(data)
+        _write_cache(path, digest, wind)
+
+    return wind
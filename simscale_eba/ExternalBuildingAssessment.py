@@ -2,10 +2,12 @@ import pathlib
 import time
 import uuid
 
-import simscale_sdk as sim
 import pandas as pd
 
 import simscale_eba.SimulationCore as sc
+from simscale_eba.lazy_import import lazy_import
+
+sim = lazy_import("simscale_sdk")
 
 
 class PedestrianComfort():
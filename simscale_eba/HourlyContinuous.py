@@ -8,13 +8,11 @@ Created on Tue Jul  6 10:52:07 2021
 import pathlib
 from datetime import datetime
 
-import ladybug.epw as epw
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-from matplotlib import cm
 import numpy as np
 import pandas as pd
-from scipy.stats import weibull_min
+
+import simscale_eba.AngleBounds as ab
+import simscale_eba.EpwWind as ew
 
 
 class HourlyContinuous():
@@ -31,19 +29,28 @@ class HourlyContinuous():
 
         self.hourly_continuous_df = None
 
-    def import_epw(self, epw_file):
-        self._original_data = epw.EPW(epw_file)
+    def import_epw(self, epw_file, cache=True):
+        '''
+        Take a path to an EPW, store its hourly wind direction and speed
 
-        self._hourly_wind_speed = self._original_data.wind_speed.values
-        self._hourly_direction = self._original_data.wind_direction.values
-        self._hourly_timestamp = self._original_data.wind_speed.datetimes
+        Only the wind is parsed, see EpwWind.read_epw_wind, and it is 
+        cached next to the EPW, so importing the same EPW again is fast.
 
-        frames = [pd.DataFrame(self._hourly_timestamp, columns=["datetime"]),
-                  pd.DataFrame(self._hourly_direction, columns=["direction"]),
-                  pd.DataFrame(self._hourly_wind_speed, columns=["speed"])]
-        
-        df = pd.concat(frames, axis=1)
-        self.hourly_continuous_df = df.set_index("datetime")
+        Parameters
+        ----------
+        epw_file : pathlib.Path
+            A path to the epw to read.
+        cache : bool, optional
+            Read and write the cache of the EPW. The default is True.
+
+        '''
+        self._original_data = ew.read_epw_wind(epw_file, cache=cache)
+
+        self._hourly_wind_speed = self._original_data.wind_speed
+        self._hourly_direction = self._original_data.wind_direction
+        self._hourly_timestamp = self._original_data.datetimes
+
+        self.hourly_continuous_df = self._original_data.to_dataframe()
         self._original_df = self.hourly_continuous_df
         self._remove_zero_speeds()
 
@@ -96,30 +103,85 @@ class HourlyContinuous():
         self.period_name = self.weather_period.period_name
     
         df = self.hourly_continuous_df
-        period = self.weather_period
-    
-        # Generate date ranges based on the period
-        if period.start.month <= period.end.month:  # Case: within the same year
-            dates = pd.date_range(period.start, period.end)
-        else:  # Case: bridges the end of the year
-            # Create two ranges: one for the end of the year, one for the beginning
-            dates_start_year = pd.date_range(period.start, f"{period.start.year}-12-31")
-            dates_end_year = pd.date_range(f"{period.end.year}-01-01", period.end)
-            dates = dates_start_year.append(dates_end_year)
-    
-        # Map to month-day format
-        no_year = dates.map(lambda x: x.strftime("%m-%d"))
-        df["no_year"] = df.index.map(lambda x: x.strftime("%m-%d"))
-        mask = df["no_year"].isin(no_year)
-    
-        # Filter data by date
-        df = df.loc[mask]
-    
-        # Filter data by time of day
-        df = df.between_time('{}:00'.format(period.get_start_hour()),
-                             '{}:00'.format(period.get_end_hour()),
-                             inclusive='both')
-        self.hourly_continuous_df = df
+        
+        # Filter data by date and time of day
+        mask = self.weather_period.contains(*date_parts(df.index))
+        
+        self.hourly_continuous_df = df.loc[mask]
+
+    def period_masks(self, periods):
+        '''
+        Take weather periods, return the hours in each
+        
+        The month, day and minute of each hour are found once, and each 
+        period is an integer comparison on them, so many periods, e.g. 
+        the seasons, cost little more than one.
+
+        Parameters
+        ----------
+        periods : list
+            A list of WeatherPeriod objects, each with a unique name.
+
+        Raises
+        ------
+        Exception
+            If two periods have the same name.
+
+        Returns
+        -------
+        masks : dict
+            A boolean array per period name, True for the rows of 
+            hourly_continuous_df in the period.
+
+        '''
+        names = [period.period_name for period in periods]
+        if len(set(names)) != len(names):
+            raise Exception("Each period needs a unique name, got {}".format(names))
+        
+        parts = date_parts(self.hourly_continuous_df.index)
+        
+        return {period.period_name: period.contains(*parts) for period in periods}
+
+    def split_periods(self, periods):
+        '''
+        Take weather periods, return an hourly continuous object for each
+        
+        The same as calling set_period on a fresh object per period, 
+        with the periods evaluated in one pass by period_masks. Each 
+        object shares the original data, only the rows of its period 
+        are taken from hourly_continuous_df.
+
+        Parameters
+        ----------
+        periods : list
+            A list of WeatherPeriod objects, each with a unique name.
+
+        Returns
+        -------
+        dict
+            A HourlyContinuous object per period name, ready for 
+            WeatherStatistics.set_hourly_continuous.
+
+        '''
+        masks = self.period_masks(periods)
+        
+        hourly_continuous = {}
+        for period in periods:
+            split = HourlyContinuous()
+            split.weather_period = period
+            split.period_name = period.period_name
+            
+            split._hourly_wind_speed = self._hourly_wind_speed
+            split._hourly_direction = self._hourly_direction
+            split._hourly_timestamp = self._hourly_timestamp
+            split._original_data = self._original_data
+            split._original_df = self._original_df
+            
+            split.hourly_continuous_df = self.hourly_continuous_df.loc[masks[period.period_name]]
+            
+            hourly_continuous[period.period_name] = split
+            
+        return hourly_continuous
 
 class WeatherPeriod():
 
@@ -168,76 +230,115 @@ class WeatherPeriod():
     def get_end_month(self):
         return self.end.month
 
+    def contains(self, month, day, minute):
+        '''
+        Take the date parts of hours, return which are in the period
 
-def add_mid_angle(angle1, angle2):
-    return ((angle1 + angle2) / 2)
+        The period covers the days from start to end, wrapping around the
+        end of the year when the end is before the start, and on each of 
+        those days, the hours from the start hour to the end hour, both 
+        inclusive, wrapping around midnight in the same way. A period 
+        that wraps around the end of the year includes 31 December, 
+        which the filter before this one left out.
 
+        Parameters
+        ----------
+        month : np.array
+            The month of each hour, 1 to 12.
+        day : np.array
+            The day of the month of each hour.
+        minute : np.array
+            The minute of the day of each hour, 0 to 1439.
 
-# def minus_mid_angle(angle1, angle2):
-# return ((((angle1 - angle2))/2)%360
+        Returns
+        -------
+        np.array
+            True for the hours in the period.
 
-def angle_to_vectors(angle):
-    u = np.cos(np.radians(angle))
-    v = np.sin(np.radians(angle))
-    return u, v
+        '''
+        month_day = np.asarray(month) * 100 + np.asarray(day)
+        minute = np.asarray(minute)
+        
+        start_day = self.start.month * 100 + self.start.day
+        end_day = self.end.month * 100 + self.end.day
+        
+        if start_day <= end_day:
+            is_day = (month_day >= start_day) & (month_day <= end_day)
+        else:
+            # Bridges the end of the year
+            is_day = (month_day >= start_day) | (month_day <= end_day)
+        
+        start_minute = self.start.hour * 60
+        end_minute = self.end.hour * 60
+        
+        if start_minute <= end_minute:
+            is_time = (minute >= start_minute) & (minute <= end_minute)
+        else:
+            # Bridges midnight
+            is_time = (minute >= start_minute) | (minute <= end_minute)
+            
+        return is_day & is_time
 
 
-def return_quad(u, v):
-    if np.sign(u) > 0 and np.sign(v) > 0:
-        return 1
-    elif np.sign(u) > 0 and np.sign(v) < 0:
-        return 4
-    elif np.sign(u) < 0 and np.sign(v) < 0:
-        return 3
-    elif np.sign(u) < 0 and np.sign(v) > 0:
-        return 2
+def date_parts(index):
+    '''
+    Take a datetime index, return the month, day and minute of the day
+    
+    Minutes past the whole minute, i.e. seconds, are counted as a 
+    fraction of a minute.
+    '''
+    index = pd.DatetimeIndex(index)
+    
+    minute = (index.hour.to_numpy() * 60 + index.minute.to_numpy() 
+              + index.second.to_numpy() / 60)
+    
+    return index.month.to_numpy(), index.day.to_numpy(), minute
 
 
-def check_within_bounds(upper, lower, angle):
-    u_upper, v_upper = angle_to_vectors(upper)
-    u_lower, v_lower = angle_to_vectors(lower)
-    u, v = angle_to_vectors(angle)
+def add_mid_angle(angle1, angle2):
+    return ((angle1 + angle2) / 2)
 
-    q_upper = return_quad(u_upper, v_upper)
-    q_lower = return_quad(u_lower, v_lower)
 
-    if (q_lower > q_upper) and (((angle > lower) and (angle <= 360)) or ((angle <= upper) and (angle >= 0))):
-        return True
-    elif (angle <= upper) and (angle > lower):
-        return True
-    else:
-        return False
+# def minus_mid_angle(angle1, angle2):
+# return ((((angle1 - angle2))/2)%360
 
+def round_dir(df, directions):
+    '''
+    Take hourly data and sector directions, round each hour to its sector
+    
+    The sector edges are halfway between neighbouring directions, an 
+    hour on an edge goes to the anticlockwise sector, the original 
+    direction is kept in the "old_dir" column.
 
-check = check_within_bounds(270, 5, 0)
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Hourly data with a "direction" column in compass degrees.
+    directions : list
+        The centre of each sector in compass degrees.
 
+    Returns
+    -------
+    df : pd.DataFrame
+        The hourly data with the direction of each hour's sector.
+    upper_lim : list
+        The upper bound of each sector.
+    lower_lim : list
+        The lower bound of each sector.
 
-def round_dir(df, directions):
-    number_directions = len(directions)
-    upper_lim = []
-    lower_lim = []
-    for i in range(number_directions):
-
-        angle1 = (directions[i] + 180) % 360 - 180
-        angle2 = (directions[i - 1] + 180) % 360 - 180
-        if angle2 != 0 and angle2 / angle2 > 0 and angle1 == -180:
-            angle1 = 180
-        elif angle2 != 0 and angle2 / angle2 < 0 and angle1 == 180:
-            angle1 = -180
-        dif = add_mid_angle(angle1, angle2)
-        angle = dif
-        lower_lim.append(angle % 360)
-
-    for i in range(number_directions):
-        upper_lim.append(lower_lim[i - (number_directions - 1)])
+    '''
+    lower_lim, upper_lim = ab.sector_bounds(directions)
 
     df["old_dir"] = df["direction"]
 
-    for upper, lower, value in zip(upper_lim, lower_lim, directions):
-        mask = df["direction"].apply(
-            lambda x: check_within_bounds(upper, lower, x))
-        df["direction"] = df["direction"].mask(mask, value)
-    return df, upper_lim, lower_lim
+    angles = df["direction"].to_numpy(dtype=float)
+    index = ab.sector_index(directions, angles, right=True)
+
+    # Hours without a direction are left as they are
+    rounded = pd.Series(np.asarray(directions)[index], index=df.index)
+    df["direction"] = rounded.where(~np.isnan(angles), df["direction"])
+
+    return df, upper_lim.tolist(), lower_lim.tolist()
 
 
 def round_speed(df, speeds):
@@ -253,18 +354,113 @@ def round_speed(df, speeds):
 
 
 def get_weibull(group):
-    ws = group["speed"]
-    drop_zero = (ws != 0)
-    ws = ws.loc[drop_zero]
-    shape, loc, scale = weibull_min.fit(ws, floc=0)
+    ws = np.asarray(group["speed"], dtype=float)
+    ws = ws[ws != 0]
+    
+    shape, scale = fit_weibull_sectors(np.sort(ws), [0, len(ws)])
+    return shape[0], scale[0]
+
+
+def fit_weibull_sectors(speeds, offsets, tolerance=1e-10, max_iterations=100):
+    '''
+    Take the speeds of many sectors, return the Weibull fit of each
+    
+    A maximum likelihood fit, with the location fixed at 0, the same as
+    weibull_min.fit(speeds, floc=0), but for every sector at once. The
+    shape k solves
+    
+        sum(x^k ln x) / sum(x^k) - 1/k - mean(ln x) = 0
+    
+    by Newton iteration, run on an array of a shape per sector, with
+    the sums of all sectors taken by np.add.reduceat over the one speed
+    array. The scale is then mean(x^k)^(1/k).
+
+    Parameters
+    ----------
+    speeds : np.array
+        The speeds of every sector, one sector after the other, all 
+        above 0. Each sector sorted ascending is fastest, as its 
+        maximum is then its last speed, but it is not required.
+    offsets : np.array
+        The position in speeds of the first speed of each sector, and 
+        finally the number of speeds, i.e. sector i is 
+        speeds[offsets[i]:offsets[i + 1]].
+    tolerance : float, optional
+        The relative change in shape to stop at. The default is 1e-10.
+    max_iterations : int, optional
+        The most Newton iterations. The default is 100.
+
+    Returns
+    -------
+    shape : np.array
+        The Weibull shape parameter of each sector, nan if it is empty.
+    scale : np.array
+        The Weibull scale parameter of each sector, nan if it is empty.
+
+    '''
+    speeds = np.asarray(speeds, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    
+    counts = np.diff(offsets)
+    shape = np.full(len(counts), np.nan)
+    scale = np.full(len(counts), np.nan)
+    
+    # reduceat needs non-empty segments
+    is_filled = counts > 0
+    starts = offsets[:-1][is_filled]
+    counts = counts[is_filled]
+    if len(counts) == 0:
+        return shape, scale
+    
+    speeds = speeds[starts[0]:offsets[-1]]
+    starts = starts - starts[0]
+    sector = np.repeat(np.arange(len(counts)), counts)
+    
+    # Speeds relative to the sector maximum, so x^k never overflows, the
+    # shape does not depend on the units
+    maximum = np.maximum.reduceat(speeds, starts)
+    log_x = np.log(speeds / maximum[sector])
+    
+    mean_log = np.add.reduceat(log_x, starts) / counts
+    variance_log = np.add.reduceat(log_x ** 2, starts) / counts - mean_log ** 2
+    
+    # The standard deviation of ln x is pi / (k sqrt(6)) for a Weibull
+    with np.errstate(divide='ignore'):
+        k = np.pi / np.sqrt(6 * np.maximum(variance_log, 0))
+    k = np.where(np.isfinite(k), k, 1.0)
+    
+    log_x_squared = log_x ** 2
+    for _ in range(max_iterations):
+        x_k = np.exp(k[sector] * log_x)
+        
+        b = np.add.reduceat(x_k, starts)
+        a = np.add.reduceat(x_k * log_x, starts) / b
+        c = np.add.reduceat(x_k * log_x_squared, starts) / b
+        
+        residual = a - 1 / k - mean_log
+        slope = c - a ** 2 + 1 / k ** 2
+        
+        step = residual / slope
+        k_next = k - step
+        
+        # Newton can overshoot past 0 from far above the root
+        k_next = np.where(k_next > 0, k_next, k / 2)
+        
+        is_converged = np.abs(k_next - k) <= tolerance * k
+        k = k_next
+        if np.all(is_converged):
+            break
+    
+    x_k = np.exp(k[sector] * log_x)
+    
+    shape[is_filled] = k
+    scale[is_filled] = maximum * (np.add.reduceat(x_k, starts) / counts) ** (1 / k)
+    
     return shape, scale
 
 
 def find_group(groups, direction):
-    for group in groups:
-        if group[0] == direction:
-            return group
-            break
+    return groups[direction]
 
 
 # Create a file format that is identical to the SimScale Stat file requirements
@@ -358,6 +554,8 @@ class WeatherStatistics():
 
         self.group_names = None
         self.groups = None
+        self.sorted_speeds = None
+        self.sector_offsets = None
         self.weibull_parameters = None
         self.total_probability = None
         self.maximum_values = None
@@ -419,19 +617,33 @@ class WeatherStatistics():
         self.set_standard_table()
 
     def sort_directions(self):
+        '''
+        Sorts the hourly speeds by direction, then speed
+        
+        The speeds of each direction are kept in one sorted array, 
+        sorted_speeds, with the start of each direction in 
+        sector_offsets, groups holds a view of it per direction.
+        '''
         df = self.hourly_continuous.hourly_continuous_df
         drop_zero = (df["speed"] != 0)
         
-        df = df.loc[drop_zero].copy()
-        _list = df.groupby(["direction"])
-        lis=_list
-        self.group_names = list(_list.groups)
+        directions = df["direction"].to_numpy()[drop_zero.to_numpy()]
+        speeds = df["speed"].to_numpy(dtype=float)[drop_zero.to_numpy()]
+        
+        group_names, sector = np.unique(directions, return_inverse=True)
+        sector = sector.reshape(-1)
         
-        group_dict = {}
-        for group_name in self.group_names:
-            group_dict[group_name] = _list.get_group(group_name)
+        order = np.lexsort((speeds, sector))
+        counts = np.bincount(sector, minlength=len(group_names))
         
-        self.groups = group_dict
+        self.group_names = group_names.tolist()
+        self.sorted_speeds = speeds[order]
+        self.sector_offsets = np.r_[0, np.cumsum(counts)]
+        
+        self.groups = {}
+        for i, group_name in enumerate(self.group_names):
+            self.groups[group_name] = self.sorted_speeds[
+                self.sector_offsets[i]:self.sector_offsets[i + 1]]
 
     def set_weibull_parameters(self):
         df = pd.DataFrame(
@@ -439,16 +651,19 @@ class WeatherStatistics():
             index=["shape", "scale", "probability"],
             columns=self.group_names
         )
-
-        for group in self.groups:
-            df.loc["shape", group], df.loc["scale", group] = get_weibull(self.groups[group])
-            
+        
+        shape, scale = fit_weibull_sectors(self.sorted_speeds, self.sector_offsets)
+        
+        df.loc["shape", :] = shape
+        df.loc["scale", :] = scale
         df.loc["probability", :] = self.get_directional_occurances().values
         self.weibull_parameters = df
 
     def plot_weibull(self, direction):
-        group = find_group(self.groups, direction)
-        ws = group[1]["speed"]
+        import matplotlib.pyplot as plt
+        from scipy.stats import weibull_min
+
+        ws = find_group(self.groups, direction)
         plt.hist(ws, density=True, alpha=0.5)
         support = np.linspace(ws.min(), ws.max(), 100)
 
@@ -460,6 +675,8 @@ class WeatherStatistics():
         plt.show()
 
     def set_standard_table(self):
+        from scipy.stats import weibull_min
+
         df = pd.DataFrame(
             np.zeros((len(self.speeds), len(self.directions))),
             index=self.speeds,
@@ -479,11 +696,13 @@ class WeatherStatistics():
             probability_next[0] = 0
 
             range_probability = cum_probability - probability_next
-            df[direction] = range_probability * float(directional_occurances[direction])
+            df[direction] = range_probability * float(directional_occurances.loc["size", direction])
 
         self.standard_table = df.transpose()
         
     def standard_table_from_weibull(self):
+        from scipy.stats import weibull_min
+
         df = pd.DataFrame(
             np.zeros((len(self.speeds), len(self.directions))),
             index=self.speeds,
@@ -529,24 +748,40 @@ class WeatherStatistics():
             index=["size"],
             columns=self.group_names
         )
-        peried_size = 0
-        for group in self.groups:
-            size = self.groups[group].shape[0]
-            df[group] = size
-            peried_size += size
-
-        df = df / peried_size
+        sizes = np.diff(self.sector_offsets)
+        df.loc["size", :] = sizes / sizes.sum()
+        
         return df
 
-    def to_stat(self):
+    def to_stat(self, file=None):
+        '''
+        Exports the standard table as a SimScale .stat file
+
+        Parameters
+        ----------
+        file : pathlib.Path, optional
+            The file to write, if None, <period name>.stat in the 
+            current working directory.
+
+        Returns
+        -------
+        bool
+            True if the file was written.
+
+        '''
         df = self.standard_table
         if self.period_name == None:
             self.period_name = "annual"
-        name = self.period_name + ".stat"
-        file = pathlib.Path.cwd() / name
-        exportSTAT(df, file)
+        if file is None:
+            name = self.period_name + ".stat"
+            file = pathlib.Path.cwd() / name
+        return exportSTAT(df, file)
 
     def plot_cumulative_distributions(self, max_speed=10):
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+        from scipy.stats import weibull_min
+
         weibull = self.weibull_parameters
         speeds = np.arange(0, max_speed, 0.1)
 
@@ -596,6 +831,10 @@ class WeatherStatistics():
         plt.show()
 
     def plot_probability_distributions(self, max_speed=10):
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+        from scipy.stats import weibull_min
+
         weibull = self.weibull_parameters
         speeds = np.arange(0, max_speed, 0.1)
 
@@ -704,6 +943,8 @@ class WeatherStatistics():
                                * (-np.log(-np.log(1 - 1 / (in_years * self.gumbel_block_period)))))
 
     def plot_gumbel_correlation(self):
+        import matplotlib.pyplot as plt
+
         gumbel_reduced_variate = self.gumbel_data["Reduced Variate"]
 
         plt.figure(num=3, figsize=(8, 6))
@@ -723,6 +964,9 @@ class WeatherStatistics():
         plt.grid(True)
 
     def plot_windrose(self):
+        import matplotlib.pyplot as plt
+        from matplotlib import cm
+
         table = self.standard_table.T
         cum_table = np.cumsum(table.to_numpy(), axis=0)
 
@@ -796,7 +1040,7 @@ if __name__ == "__main__":
     
     if run_test_2:
         import csv
-        
+
         source_path = pathlib.Path("/Users/darrenlynch/Downloads/Boston-radiance1")
         
         def read_data(path):
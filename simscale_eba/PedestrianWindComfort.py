@@ -1,18 +1,23 @@
 import json
+import multiprocessing
 import pathlib
 import shutil
-import zipfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from itertools import groupby
 
 import numpy as np
 import pandas as pd
-from scipy.stats import weibull_min
-from sklearn.cluster import DBSCAN
 
+import simscale_eba.AngleBounds as ab
+import simscale_eba.DirectionCache as dc
+import simscale_eba.ResultStore as rs
 import simscale_eba.SimulationCore as sc
 import simscale_eba.TestConditions as tc
+import simscale_eba.post_processing.ComfortFrequencies as cf
 import simscale_eba.post_processing.NonDimensionalQuantities as nd
+import simscale_eba.post_processing.PointCloud as pc
 import simscale_eba.pwc_status as stat
+from simscale_eba.post_processing.HourlyStatistics import HoursAbove
 
 
 class pedestrian_wind_comfort_setup():
@@ -175,9 +180,15 @@ class pedestrian_wind_comfort_results():
         self.dimensional_results = {}
         self.dimensionless_results = {}
         self.hourly_continuous_results = {}
+        self.hourly_continuous_paths = {}
         self.coordinates = None
         self.reduced_coordinates = None
+        self.reduced_index = None
         self.comfort_maps = {}
+        self.criteria_comfort_maps = {}
+        
+        # Parsed directional tables, shared by every processing stage
+        self.direction_cache = dc.DirectionCache()
 
         # Weather objects
         self.weather_statistics = None
@@ -195,7 +206,8 @@ class pedestrian_wind_comfort_results():
             
             sc.create_api(self)
 
-    def get_pedestrian_wind_comfort(self, project, simulation, run, path=pathlib.Path.cwd()):
+    def get_pedestrian_wind_comfort(self, project, simulation, run, path=pathlib.Path.cwd(),
+                                    max_workers=None):
         '''
         Take names, return path to downloaded results.
         
@@ -212,6 +224,9 @@ class pedestrian_wind_comfort_results():
             SimScale UI.
         output_folder : TYPE
             DESCRIPTION.
+        max_workers : int, optional
+            The number of directions downloaded and converted at the same
+            time, see pull_run_results.
         Returns
         -------
         pathlib.Path
@@ -246,11 +261,13 @@ class pedestrian_wind_comfort_results():
         '''
         sc.find_run(self, run)
 
-        self.pull_run_results(output_folder=self.result_directory)
+        self.pull_run_results(output_folder=self.result_directory,
+                              max_workers=max_workers)
 
     def pull_run_results(self, 
                          output_folder=pathlib.Path.cwd(), 
-                         cleanup=True):
+                         cleanup=True,
+                         max_workers=None):
         '''
         
 
@@ -258,6 +275,12 @@ class pedestrian_wind_comfort_results():
         ----------
         output_folder : TYPE, optional
             DESCRIPTION. The default is pathlib.Path.cwd().
+        max_workers : int, optional
+            The number of directions that are downloaded, and the number 
+            that are converted from .case, at the same time. 
+            
+            The default is None, which lets concurrent.futures choose 
+            based upon the number of CPU's.
 
         Returns
         -------
@@ -271,41 +294,21 @@ class pedestrian_wind_comfort_results():
         dict_ = self.url_dictionary_results
 
         csv_list = {}
-        for key in dict_:
-            #Only download new results if they are new or different
-            if not self.status.check_simulation_status():
-                case_file_path = self.download_average_direction_result(
-                    direction=key, path=self.result_directory)
-                
-                sc.case_to_csv(
-                    output.joinpath(key, case_file_path.name).as_posix(),
-                    output.joinpath(f'{key}.csv').as_posix())
-
-                csv_list[key] = output.joinpath(f'{key}.csv')
-                #shutil.rmtree(output.joinpath(key).as_posix(), ignore_errors=True)
-
-                self.status.update_download_path(
-                    key, output.joinpath(f'{key}.csv').as_posix())
-            else:
-                if self.status.download_paths is None:
-                    self.status.read_simulation_status()
-                else:
-                    csv_list[key] = pathlib.Path(
-                        self.status.download_paths[key])
-        
-        #Just export the first file, caveate is that floor geom changes
-        #per direction
-        first_key = list(dict_.keys())[0]
-        stl_input_file = output.joinpath(key, 
-                                         self.download_average_direction_result(
-                                             direction=first_key, 
-                                             path=self.result_directory
-                                        ).name).as_posix()
-        
-        #Only export the STL again if its new or different
+        #Only download new results if they are new or different
         if not self.status.check_simulation_status():
-            stl_dict = sc.case_to_stl(stl_input_file, output)
-            self.status.output_stl_paths = stl_dict
+            #Just export the first direction's STL, caveate is that floor 
+            #geom changes per direction
+            csv_list = self._download_directions(list(dict_.keys()),
+                                                 output,
+                                                 max_workers=max_workers,
+                                                 stl_direction=list(dict_.keys())[0])
+        else:
+            if self.status.download_paths is None:
+                self.status.read_simulation_status()
+                
+            for key in dict_:
+                csv_list[key] = pathlib.Path(
+                    self.status.download_paths[key])
         
         #After all processes remove original data
         if cleanup:
@@ -314,12 +317,119 @@ class pedestrian_wind_comfort_results():
                               ignore_errors=True)
                 
         self.directional_csv_dict = csv_list
+        self.reduced_index = None
         self.status.write_simulation_status(boolean=True)
 
         # number of directions should come from PWC setup
         self.number_of_directions = len(csv_list.keys())
         self._check_valid_comfort_plots()
 
+    def _download_directions(self, directions, output, max_workers=None,
+                             stl_direction=None):
+        '''
+        Take directions, download and convert each, return the table paths
+        
+        The downloads are network bound, so they run in a thread pool, 
+        as each download finishes its .case file is converted in a 
+        process pool, as this is bound by a single VTK core. A failure 
+        in one direction does not stop the others, all failures are 
+        raised together once every direction has finished.
+
+        Parameters
+        ----------
+        directions : list
+            The directions to download, as keys of 
+            url_dictionary_results.
+        output : pathlib.Path
+            The directory to write the directional tables to.
+        max_workers : int, optional
+            The maximum number of threads and processes in each pool.
+            
+            The default is None.
+        stl_direction : str, optional
+            The direction whose .case file is also exported to STL, from
+            the same read as its table, the STL paths are stored in the 
+            status. If None, no STL files are exported.
+            
+            The default is None.
+
+        Raises
+        ------
+        Exception
+            If one or more directions failed to download or convert.
+
+        Returns
+        -------
+        table_paths : dict
+            A dictionary with direction as the key, and the path to the 
+            directional table as the value.
+
+        '''
+        errors = {}
+        converted = {}
+        
+        # Spawn, as forking while the download threads run is unsafe
+        context = multiprocessing.get_context("spawn")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as download_pool, \
+                ProcessPoolExecutor(max_workers=max_workers, 
+                                    mp_context=context) as convert_pool:
+                    
+            downloads = {}
+            for key in directions:
+                future = download_pool.submit(
+                    self.download_average_direction_result,
+                    direction=key, 
+                    path=self.result_directory)
+                downloads[future] = key
+            
+            conversions = {}
+            for future in as_completed(downloads):
+                key = downloads[future]
+                try:
+                    case_file_path = future.result()
+                except Exception as e:
+                    errors[key] = e
+                    continue
+                
+                table_path = output.joinpath(f'{key}.feather')
+                stl_output_path = output if key == stl_direction else None
+                future = convert_pool.submit(
+                    sc.convert_case,
+                    output.joinpath(key, case_file_path.name).as_posix(),
+                    table_path.as_posix(),
+                    stl_output_path)
+                conversions[future] = (key, table_path)
+            
+            for future in as_completed(conversions):
+                key, table_path = conversions[future]
+                try:
+                    stl_dict = future.result()
+                except Exception as e:
+                    errors[key] = e
+                    continue
+                
+                if stl_dict is not None:
+                    self.status.output_stl_paths = stl_dict
+                
+                converted[key] = table_path
+        
+        if len(errors) > 0:
+            messages = []
+            for key in directions:
+                if key in errors:
+                    messages.append("{}: {}".format(key, errors[key]))
+                    
+            raise Exception("Results for {} of {} directions failed:\n{}".format(
+                len(errors), len(directions), "\n".join(messages)))
+        
+        table_paths = {}
+        for key in directions:
+            table_paths[key] = converted[key]
+            self.status.update_download_path(key, converted[key].as_posix())
+        
+        return table_paths
+
     def _check_valid_comfort_plots(self):
         '''
         Checks number of points for all directions, exception if not all the same
@@ -339,8 +449,8 @@ class pedestrian_wind_comfort_results():
         no_points_list = []
 
         for key in self.directional_csv_dict.keys():
-            df = pd.read_csv(self.directional_csv_dict[key])
-            no_points = df.shape[0]
+            no_points = self.direction_cache.number_of_rows(
+                self.directional_csv_dict[key])
             no_points_list.append(no_points)
 
         is_equal = all_equal(no_points_list)
@@ -459,76 +569,113 @@ class pedestrian_wind_comfort_results():
         is_sucessful : boolean
         '''
 
-        api_client = self.api_client
-        api_key_header = self.api_key_header
-        api_key = self.api_key
         download_obj = self.url_dictionary_results[str(direction)]
 
         url = download_obj.url
 
         print(f'Downloading results for direction: {direction}')
         try:
-            averaged_solution_response = api_client.rest_client.GET(
-                url=url,
-                headers={api_key_header: api_key},
-                _preload_content=False
-            )
-
             out_file = path.joinpath(f'{direction}averaged_solution.zip_')
-            with out_file.open('wb') as zip__file:
-                zip__file.write(averaged_solution_response.data)
+            sc.download_file(self, url, out_file)
 
-            # extract data
-            zip_ = zipfile.ZipFile(out_file.as_posix())
+            # extract only the .case file and the data it references
             extract_subdirectory = path.joinpath(str(direction))
-            zip_.extractall(extract_subdirectory)
-            zip_.close()
+            case_file_path = sc.extract_case(
+                out_file, 
+                extract_subdirectory,
+                case_directory='Directions/{}/export'.format(direction))
 
             # delete the file
             out_file.unlink()
-
-            result_path = extract_subdirectory.joinpath('Directions', str(direction), 'export')
-
-            case_file_path = ''
-            for file in result_path.iterdir():
-                shutil.move(file.as_posix(), extract_subdirectory.joinpath(file.name))
-                if file.suffix == '.case':
-                    case_file_path = file
-
-            delete_path = extract_subdirectory.joinpath('Directions')
-            shutil.rmtree(delete_path.as_posix(), ignore_errors=True)
         except:
             raise Exception('results for direction {} failed to download'.format(direction))
 
         return case_file_path
 
-    def _create_point_file(self):
+    def _read_direction(self, direction):
+        '''
+        Take a direction, return its parsed directional result table
+        
+        The table is read through the direction cache, so each stage of 
+        the processing shares a single parse of each file.
+
+        '''
+        return self.direction_cache.read(self.directional_csv_dict[direction])
+
+    def _get_reduced_index(self):
+        '''
+        Return the index of the points kept after reducing the resolution
+        
+        The reduction is computed once, and reused until new results are 
+        pulled or the resolution changes.
+
+        '''
+        if self.reduced_index is not None:
+            return self.reduced_index
+        
         csv_file_key = list(self.directional_csv_dict.keys())[0]
-        csv_file = self.directional_csv_dict[csv_file_key]
+        table = self._read_direction(csv_file_key)
 
-        table = pd.read_csv(pathlib.Path(csv_file.as_posix()))
+        self.coordinates = table[["Points:0", "Points:1", "Points:2"]].copy()
+        self.coordinates.columns = ["X", "Y", "Z"]
 
-        self.coordinates = table[["Points:0", "Points:1", "Points:2"]]
+        if self._check_is_reduce_needed():
+            self.reduced_index = self._reduce_resolution_idx()
+        else:
+            self.reduced_index = self.coordinates.index
+        
+        return self.reduced_index
 
-        columns = ["X", "Y", "Z"]
+    def _create_point_file(self):
+        csv_file_key = list(self.directional_csv_dict.keys())[0]
 
-        self.coordinates.columns = columns
+        columns = ["X", "Y", "Z"]
 
         path = self.directional_csv_dict[csv_file_key].with_name(
             "points").with_suffix(".feather")
 
-        if self._check_is_reduce_needed():
-            idx = self._reduce_resolution_idx()
-        else:
-            idx = self.coordinates.index
-
+        idx = self._get_reduced_index()
         
         self.reduced_coordinates = self.coordinates.loc[idx].reset_index()
+        
+        # The comfort surface of each point, if the table came from blocks,
+        # SurfaceName is only categorical when read from feather
+        table = self._read_direction(csv_file_key)
+        if "SurfaceName" in table.columns:
+            self.reduced_coordinates["surface"] = (
+                pd.Categorical(table["SurfaceName"]).codes[np.asarray(idx)])
+            
         self.reduced_coordinates.to_feather(path)
         
+        store = self._get_store()
+        store.set_points(self.reduced_coordinates[columns].to_numpy(),
+                         self.reduced_coordinates["index"].to_numpy())
+        
         self.status.points_path = path.as_posix()
+        self.status.store_path = store.path.as_posix()
         self.status.write_simulation_status()
 
+    def _get_store(self):
+        '''
+        Return the result store of the result directory
+
+        Returns
+        -------
+        ResultStore
+            The store, with its manifest read if it already exists.
+
+        '''
+        result_directory = self.result_directory
+        if result_directory is None:
+            result_directory = pathlib.Path(
+                list(self.directional_csv_dict.values())[0]).parent
+            
+        store = rs.ResultStore(pathlib.Path(result_directory) / "result_store")
+        if store.exists():
+            store.read_manifest()
+
+        return store
+
     def _create_dimensional_quantities(self, variables=['UMag', 'GEM']):
         '''
         Take csv files, return variables in standard format.
@@ -565,41 +712,7 @@ class pedestrian_wind_comfort_results():
         None.
 
         '''
-        no_points = self._get_no_points()
-        csv_list = self.directional_csv_dict
-
-        result_dict = {}
-        for variable in variables:
-            result_dict[variable] = pd.DataFrame(
-                np.zeros((no_points, self.number_of_directions)),
-                columns=csv_list.keys())
-
-        for i, direction in enumerate(csv_list):
-            table = pd.read_csv(pathlib.Path(csv_list[direction]).as_posix())
-            df = nd.csv_to_dimensionall_df(self, table, variables)
-            for column in df.columns:
-                result_dict[column][direction] = df[column]
-
-        self._create_point_file()
-
-        key = list(self.directional_csv_dict.keys())[0]
-        for variable in variables:
-            path = self.directional_csv_dict[key].with_name(
-                "dimensional_{}".format(variable)).with_suffix(".feather")
-
-            self.dimensional_results[variable] = path
-            self.status.update_field_path(variable,
-                                          path.as_posix(),
-                                          is_dimensional=True)
-
-            if self._check_is_reduce_needed():
-                idx = self._reduce_resolution_idx()
-            else:
-                idx = result_dict[variable].index
-
-            result_dict[variable].loc[idx].reset_index().to_feather(path)
-            
-        self.status.write_simulation_status()
+        self._create_quantities(dimensional_variables=variables)
 
     def _create_dimensionless_quantities(self, variables=['UMag', 'GEM']):
         '''
@@ -637,43 +750,102 @@ class pedestrian_wind_comfort_results():
         None.
 
         '''
+        self._create_quantities(dimensionless_variables=variables)
+
+    def _create_quantities(self, 
+                           dimensional_variables=None, 
+                           dimensionless_variables=None):
+        '''
+        Take csv files, return dimensional and dimensionless variables.
+        
+        The same as _create_dimensional_quantities and 
+        _create_dimensionless_quantities, but both are created from a 
+        single pass over the directional tables, so each is read once.
+        The points file and the result store points are written once, 
+        with a resolution reduction that is computed once.
+
+        Parameters
+        ----------
+        dimensional_variables : list[string], optional
+            The dimensional variables to return, see 
+            _create_dimensional_quantities. The default is None, which
+            returns none.
+        dimensionless_variables : list[string], optional
+            The dimensionless variables to return, see 
+            _create_dimensionless_quantities. The default is None, which
+            returns none.
+
+        Returns
+        -------
+        None.
+
+        '''
+        if dimensional_variables is None:
+            dimensional_variables = []
+        if dimensionless_variables is None:
+            dimensionless_variables = []
+        
         no_points = self._get_no_points()
         csv_list = self.directional_csv_dict
 
-        result_dict = {}
-        for variable in variables:
-            result_dict[variable] = pd.DataFrame(
+        dimensional_dict = {}
+        for variable in dimensional_variables:
+            dimensional_dict[variable] = pd.DataFrame(
+                np.zeros((no_points, self.number_of_directions)),
+                columns=csv_list.keys())
+            
+        dimensionless_dict = {}
+        for variable in dimensionless_variables:
+            dimensionless_dict[variable] = pd.DataFrame(
                 np.zeros((no_points, self.number_of_directions)),
                 columns=csv_list.keys())
 
         for i, direction in enumerate(csv_list):
-            table = pd.read_csv(pathlib.Path(csv_list[direction]).as_posix())
-            df = nd.csv_to_dimensionless_df(self, table, variables, direction)
-            for column in df.columns:
-                result_dict[column][direction] = df[column]
+            table = self._read_direction(direction)
+            
+            if dimensional_variables:
+                df = nd.csv_to_dimensionall_df(self, table, dimensional_variables)
+                for column in df.columns:
+                    dimensional_dict[column][direction] = df[column]
+                    
+            if dimensionless_variables:
+                df = nd.csv_to_dimensionless_df(self, table, dimensionless_variables, direction)
+                for column in df.columns:
+                    dimensionless_dict[column][direction] = df[column]
 
         self._create_point_file()
+        store = self._get_store()
+        idx = self._get_reduced_index()
 
         key = list(self.directional_csv_dict.keys())[0]
-        for variable in variables:
-            path = self.directional_csv_dict[key].with_name(
-                "dimensionless_{}".format(variable)).with_suffix(".feather")
-
-            self.dimensionless_results[variable] = path
-            self.status.update_field_path(variable,
-                                          path.as_posix(),
-                                          is_dimensional=False)
-
-            if self._check_is_reduce_needed():
-                idx = self._reduce_resolution_idx()
-            else:
-                idx = result_dict[variable].index
-
-            result_dict[variable].loc[idx].reset_index().to_feather(path)
+        for is_dimensional, result_dict in [(True, dimensional_dict), 
+                                            (False, dimensionless_dict)]:
+            prefix = "dimensional" if is_dimensional else "dimensionless"
+            
+            for variable in result_dict.keys():
+                path = self.directional_csv_dict[key].with_name(
+                    "{}_{}".format(prefix, variable)).with_suffix(".feather")
+    
+                if is_dimensional:
+                    self.dimensional_results[variable] = path
+                else:
+                    self.dimensionless_results[variable] = path
+                    
+                self.status.update_field_path(variable,
+                                              path.as_posix(),
+                                              is_dimensional=is_dimensional)
+    
+                result_dict[variable].loc[idx].reset_index().to_feather(path)
+                
+                store.set_field("{}_{}".format(prefix, variable),
+                                result_dict[variable].loc[idx],
+                                result_dict[variable].columns)
 
         self.status.write_simulation_status()
         
-    def _create_hourly_continuous_windspeed(self, output_file='feather'):
+    def _create_hourly_continuous_windspeed(self, output_file='feather', 
+                                            dtype=np.float64, chunk_size=None,
+                                            memory_budget=cf.DEFAULT_MEMORY_BUDGET):
         '''
         Take houly continuous (HC) and dimensionless speed, return HC spatial.
 
@@ -681,78 +853,152 @@ class pedestrian_wind_comfort_results():
         directions.
         
         Use _create_dimensionless_quantities()
-        '''
         
-        epw_directions = self.weather_statistics.hourly_continuous._original_df['direction'].to_numpy().astype(float)
+        When the matrices are saved, they are calculated and written a 
+        chunk of points at a time, so a map with more points than fit in 
+        memory can be processed, and only the file paths are kept, in 
+        hourly_continuous_paths. Use read_hourly_speed_matrix to read a 
+        range of points and hours back.
         
-        epw_speeds = self.weather_statistics.hourly_continuous._original_df['speed'].to_numpy().astype(float)
-        
-        field_paths = self.status.field_paths["dimensionless_UMag"]
-        
-        def get_speeds(direction, reference_speed, keys):
-            '''
-            Take direction, speed and a clustered map key, return speed
-            
-            Based upon meteo data, return a wind speed result from the
-            closed solved wind direction and scaled to the defined speed.
-            
-            A PWC result here may have multiple maps, so we need to 
-            specify which also.
-
-            Parameters
-            ----------
-            direction : float
-                Wind direction as a float in compass angles.
-            reference_speed : float
-                The wind speed at the meteological station.
-            keys : str
-                The comfort map.
-
-            '''
-            
-            field_path = pathlib.Path(field_paths[keys])
+        Parameters
+        ----------
+        output_file : str or None, optional
+            The format to save the matrices in, 'feather', 'csv' or 'npy', 
+            if None they are not saved, only kept in memory in 
+            hourly_continuous_results.
             
-            rounded_direction = round_direction(field_path, direction)
+            The default is 'feather'.
+        dtype : np.dtype, optional
+            The type to store the speeds as, np.float32 halves the size.
             
-            field = pd.read_feather(field_path)[str(rounded_direction)]
-            speed = (field * reference_speed).values
+            The default is np.float64.
+        chunk_size : int, optional
+            The number of points calculated at a time, if None, as many as
+            fit in the memory budget.
+        memory_budget : int, optional
+            The maximum number of bytes used by a chunk.
             
-            return np.reshape(speed, (-1, 1))
+            The default is 256MB.
+
+        Returns
+        -------
+        names : list
+            The names of the speed matrices, one per cluster.
+        '''
         
-        mySpeedFunc = np.frompyfunc(get_speeds, 3, 1)
+        epw_directions, epw_speeds = self._hourly_wind()
         
+        store = rs.read_store(self.status)
         
         #Iterate the clustered maps
         names = []
-        for key in field_paths.keys():
-            keys = np.repeat(key, len(epw_directions))
-            
-            hc_speeds = np.concatenate(mySpeedFunc(epw_directions, epw_speeds, keys), axis=1)
-            
-            self.hourly_continuous_results[key] = hc_speeds
-            
+        for key in self.status.field_paths["dimensionless_UMag"].keys():
             #we should really also add this to status, including, period.
-            field_path = pathlib.Path(field_paths[key])
-            
-            field = pd.read_feather(field_path)
-            index = field.index
+            field = self._read_dimensionless_field(key, store)
             
-            df = pd.DataFrame(hc_speeds, index=index)
-            df.columns = df.columns.astype("string")
-            self.hourly_continuous_results[key] = df
+            speed_matric_path = self.result_directory / "speed_matrix_{}".format(key)
             
-            if output_file =='feather':
-                speed_matric_path = self.result_directory / "speed_matrix_{}.feather".format(key)
-                df.reset_index().to_feather(speed_matric_path)
-            else: 
-                speed_matric_path = self.result_directory / "speed_matrix_{}.csv".format(key)
-                df.reset_index(drop=True).to_csv(speed_matric_path, 
-                                                 header=False, index=False)
+            if output_file is None:
+                # Kept in hourly_continuous_results only
+                hc_speeds = hourly_speed_matrix(
+                    field, 
+                    epw_directions, 
+                    epw_speeds).astype(dtype, copy=False)
+                
+                df = pd.DataFrame(hc_speeds, index=pd.RangeIndex(field.shape[0]))
+                df.columns = df.columns.astype("string")
+                self.hourly_continuous_results[key] = df
+            else:
+                self.hourly_continuous_paths[key] = write_hourly_speed_matrix(
+                    field, 
+                    epw_directions, 
+                    epw_speeds,
+                    speed_matric_path,
+                    output_file=output_file,
+                    dtype=dtype,
+                    chunk_size=chunk_size,
+                    memory_budget=memory_budget)
             
             names.append(speed_matric_path.stem)
             
         return names
 
+    def _read_dimensionless_field(self, key, store=None):
+        '''
+        Take a cluster key, return its dimensionless speed field
+        
+        The field is read from the result store when the clusters are 
+        stored there, otherwise from the cluster's feather file.
+        '''
+        if store is not None and store.clusters is not None:
+            return store.get_dataframe("dimensionless_UMag", cluster=key)
+        
+        field_path = pathlib.Path(self.status.field_paths["dimensionless_UMag"][key])
+        return pd.read_feather(field_path).set_index("index", drop=True)
+
+    def hourly_statistics(self, reducers, clusters=None,
+                          memory_budget=cf.DEFAULT_MEMORY_BUDGET,
+                          hour_block_size=744):
+        '''
+        Take hourly statistic reducers, return their result per cluster
+        
+        The per point statistics of the hourly continuous local speeds, 
+        e.g. the hours above a threshold, percentiles, the maximum or the 
+        mean per period, are evaluated while walking the hourly weather 
+        data in blocks, the hourly speed matrix is never held in full, so 
+        the memory used is that of the results, a few values per point.
+        
+        Use _create_dimensionless_quantities() first, and set the weather
+        statistics for its hourly continuous data, every hour of which is
+        used, see _hourly_wind.
+
+        Parameters
+        ----------
+        reducers : list
+            Reducers from post_processing.HourlyStatistics, e.g. 
+            [HoursAbove([5, 10]), Percentile(95), Maximum()], each name 
+            should be unique.
+        clusters : list, optional
+            The cluster keys to evaluate, if None, all clusters.
+        memory_budget : int, optional
+            The maximum number of bytes used by a block of the matrix.
+            
+            The default is 256MB.
+        hour_block_size : int, optional
+            The number of hours in a block. The default is 744, a month.
+
+        Returns
+        -------
+        results : dict
+            A dictionary per cluster key, of each reducer's result, keyed 
+            by the reducer's name.
+
+        '''
+        names = [reducer.name for reducer in reducers]
+        if len(set(names)) != len(names):
+            raise Exception("Each reducer needs a unique name, got {}".format(names))
+        
+        epw_directions, epw_speeds = self._hourly_wind()
+        
+        store = rs.read_store(self.status)
+        
+        if clusters is None:
+            clusters = self.status.field_paths["dimensionless_UMag"].keys()
+        
+        results = {}
+        for key in clusters:
+            field = self._read_dimensionless_field(str(key), store)
+            
+            results[str(key)] = reduce_hourly_speed_matrix(
+                field, 
+                epw_directions, 
+                epw_speeds, 
+                reducers,
+                memory_budget=memory_budget,
+                hour_block_size=hour_block_size)
+            
+        return results
+
     def _get_no_points(self):
         '''
         Takes a csv and returns the number of points in the comfort map
@@ -764,8 +1010,8 @@ class pedestrian_wind_comfort_results():
 
         '''
         key = list(self.directional_csv_dict.keys())[0]
-        df = pd.read_csv(pathlib.Path(self.directional_csv_dict[key]).as_posix())
-        self.number_of_points = df.shape[0]
+        self.number_of_points = self.direction_cache.number_of_rows(
+            self.directional_csv_dict[key])
         return self.number_of_points
 
     def set_weather_statistics(self, weather_statistics):
@@ -791,8 +1037,9 @@ class pedestrian_wind_comfort_results():
 
         Parameters
         ----------
-        comfort_criteria : comfort criteria object
-            The object repressenting the comfort critria.
+        comfort_criteria : comfort criteria object or list
+            The object repressenting the comfort critria, or a list of 
+            them, e.g. one per VDI frequency bin, to evaluate together.
 
         Returns
         -------
@@ -801,18 +1048,54 @@ class pedestrian_wind_comfort_results():
         '''
         self.comfort_criteria = comfort_criteria
 
-    def calculate_wind_comfort(self):
+    def calculate_wind_comfort(self, memory_budget=cf.DEFAULT_MEMORY_BUDGET,
+                               method='weibull'):
         '''
         Calulates and saves the local comfort criteria
+        
+        When a list of comfort criteria is set, the exceedance of every
+        distinct criteria speed is evaluated once, and shared by all the
+        criteria. The maps of each criteria are kept in 
+        criteria_comfort_maps and saved as before, comfort_maps holds the
+        worst category of any criteria, which is also saved as 
+        comfort_map_worst_case.feather.
+
+        Parameters
+        ----------
+        memory_budget : int, optional
+            The maximum number of bytes used to evaluate the exceedance 
+            of the points at once, larger budgets use fewer, larger 
+            chunks.
+            
+            The default is 256MB.
+        method : str, optional
+            'weibull', the exceedance of the Weibull fit of each direction,
+            or 'hourly', the fraction of hours that exceed, evaluated on 
+            the histogram of their distinct direction and speed pairs. 
+            The hours, the denominator of the fraction, are every hour of
+            the imported weather data, _original_df, calm hours included 
+            and no period applied, the same hours as the hourly speed 
+            matrix and hourly_statistics. The first points are checked
+            against the hours of the speed matrix, see 
+            _check_hourly_exceedance.
+            
+            The default is 'weibull'.
 
         Returns
         -------
         None.
 
         '''
+        if method not in ('weibull', 'hourly'):
+            raise Exception("method should be 'weibull' or 'hourly'")
+        
         variables = ['UMag']
         self._create_dimensionless_quantities(variables=variables)
-        self._create_point_file()
+
+        criteria = cf.as_criteria_list(self.comfort_criteria)
+        
+        # The exceedance of every distinct speed, shared by all criteria
+        speeds, positions = cf.shared_criteria_speeds(criteria)
 
         variable_results = {}
 
@@ -821,80 +1104,152 @@ class pedestrian_wind_comfort_results():
             result_file = self.dimensionless_results[variable]
 
             gamma = pd.read_feather(result_file)
-            weibull_parameters = self.weather_statistics.weibull_parameters
-            comfort_criteria = self.comfort_criteria
+            gamma = gamma.set_index("index", drop=True)
 
-            shape = weibull_parameters.loc["shape", :].values
-            P = weibull_parameters.loc["probability", :].values
-            scale = weibull_parameters.loc["scale", :].values
-
-            speeds = []
-            for i in range(0, len(comfort_criteria.comfort_dict)):
-                speeds.append(comfort_criteria.comfort_dict[str(i)]["speed"])
+            if method == 'hourly':
+                pair_columns, pair_speeds, weights = self._hourly_histogram(gamma.columns)
+                
+                point_total = cf.hourly_exceedance(gamma.to_numpy(), speeds,
+                                                   pair_columns, pair_speeds, 
+                                                   weights, 
+                                                   memory_budget=memory_budget)
+                
+                self._check_hourly_exceedance(gamma, speeds, point_total, 
+                                              weights.max())
+            else:
+                scale, shape, P = cf.align_weibull_parameters(
+                    gamma.columns, self.weather_statistics.weibull_parameters)
+                
+                point_total = cf.total_exceedance(gamma.to_numpy(), speeds,
+                                                  scale, shape, P,
+                                                  memory_budget=memory_budget)
 
-            gamma_shape = gamma.shape
-            X = gamma_shape[0]
-            Y = gamma_shape[1]
-            Z = len(comfort_criteria.comfort_dict)
-            frequency_table = np.ones([X, Y, Z])
-            iter_table = gamma.values
+            variable_results[variable], _ = cf.criteria_comfort_maps(
+                point_total, positions, criteria)
 
-            # need to iterate gamma now
-            it = np.nditer(iter_table, flags=['multi_index'], op_flags=['readwrite'])
-            while not it.finished:
-                freq = frequencies(speeds, params=[scale[it.multi_index[1]],
-                                                   shape[it.multi_index[1]],
-                                                   P[it.multi_index[1]],
-                                                   it[0]])
+        self.criteria_comfort_maps = {}
+        
+        for criterion in criteria:
+            combined_array = np.zeros((point_total.shape[0], len(variables)))
+            for i in range(0, len(variables)):
+                combined_array[:, i] = variable_results[variables[i]][criterion.name]
 
-                frequency_table[it.multi_index[0],
-                it.multi_index[1],
-                :] = freq
+            comfort_maps = {"worst_case": combined_array.max(axis=1)}
 
-                it.iternext()
+            for variable in variables:
+                comfort_maps[variable] = variable_results[variable][criterion.name]
+            
+            self.criteria_comfort_maps[criterion.name] = comfort_maps
 
-            point_total = frequency_table.sum(axis=1)
-            comfort_map = np.zeros(X)
+            for key in comfort_maps.keys():
+                df = pd.DataFrame(
+                    data=comfort_maps[key],
+                    columns=["comfort"])
 
-            for i in (list(range(0, len(comfort_criteria.comfort_dict)))):
-                if comfort_criteria.comfort_dict[str(i)]["frequency"][0] == "less":
+                df.to_feather("comfort_map_{}_{}.feather".format(
+                    key, criterion.name))
 
-                    criteria = (comfort_criteria.comfort_dict[str(i)]["frequency"][1]) / 100
-                    is_exceeding = point_total[:, i] > criteria
-                    print(np.nanmax(point_total[:, i]),
-                          np.nanmin(point_total[:, i]),
-                          criteria)
-                    comfort_map[is_exceeding] = i + 1
+        # The worst category of any criteria
+        self.comfort_maps = {}
+        for key in ["worst_case"] + variables:
+            self.comfort_maps[key] = np.max(np.stack(
+                [maps[key] for maps in self.criteria_comfort_maps.values()], 
+                axis=1), axis=1)
+        
+        if len(criteria) > 1:
+            df = pd.DataFrame(
+                data=self.comfort_maps["worst_case"],
+                columns=["comfort"])
+            
+            df.to_feather("comfort_map_worst_case.feather")
 
-                elif comfort_criteria.comfort_dict[str(i)]["frequency"][0] == "greater":
-                    pass
+    def _hourly_wind(self):
+        '''
+        Return the direction and speed of every hour of the weather data
+        
+        The hours of the hourly speed matrix, hourly_statistics and the
+        hourly comfort method, all hours of the weather statistics' 
+        imported data, _original_df, calm hours included and without its
+        period applied, so that the three agree.
+        '''
+        hourly_df = self.weather_statistics.hourly_continuous._original_df
+        
+        return (hourly_df['direction'].to_numpy(dtype=float), 
+                hourly_df['speed'].to_numpy(dtype=float))
 
-            variable_results[variable] = comfort_map
+    def _hourly_histogram(self, field_directions):
+        '''
+        Take the field directions, return the hourly direction speed pairs
+        
+        The hours of _hourly_wind, every hour of the weather data, the 
+        same hours as the hourly speed matrix, are matched to the 
+        closest field direction, and collapsed to their distinct 
+        direction and speed pairs.
 
-        combined_array = np.zeros((X, len(variables)))
-        for i in range(0, len(variables)):
-            combined_array[:, i] = variable_results[variables[i]]
+        Returns
+        -------
+        pair_columns, pair_speeds, weights : np.array
+            See ComfortFrequencies.hourly_histogram.
 
-        worst_case = combined_array.max(axis=0)
+        '''
+        directions, speeds = self._hourly_wind()
+        
+        columns = np.asarray(field_directions, dtype=float)
+        order = np.argsort(columns)
+        
+        column_index = order[round_direction_index(columns[order], directions)]
+        
+        return cf.hourly_histogram(column_index, speeds)
 
-        self.comfort_maps = {"worst_case": worst_case}
+    def _check_hourly_exceedance(self, gamma, speeds, point_total, 
+                                 tolerance_hours, no_points=100):
+        '''
+        Take histogram exceedance, check it against the speed matrix
+        
+        The hours above each criteria speed of the first points are 
+        counted on their rows of the hourly speed matrix, and compared
+        with the exceedance of the histogram.
 
-        for variable in variables:
-            self.comfort_maps[variable] = variable_results[variable]
+        Parameters
+        ----------
+        gamma : pd.DataFrame
+            The dimensionless speed, points x directions.
+        speeds : np.array
+            The criteria speeds.
+        point_total : np.array
+            The histogram exceedance, points x criteria.
+        tolerance_hours : int
+            The hours the two may differ by, the hours of one direction 
+            and speed pair, which a speed exactly on a criteria can put 
+            on either side in floating point.
+        no_points : int, optional
+            The number of points to check. The default is 100.
 
-        for key in self.comfort_maps.keys():
-            df = pd.DataFrame(
-                data=self.comfort_maps[key],
-                columns=["comfort"])
+        Raises
+        ------
+        Exception
+            If the histogram and the speed matrix disagree.
 
-            df.to_feather("comfort_map_{}_{}.feather".format(
-                key, self.comfort_criteria.name))
+        '''
+        directions, reference_speeds = self._hourly_wind()
+        
+        sample = gamma.iloc[:no_points]
+        hours = reduce_hourly_speed_matrix(
+            sample, directions, reference_speeds, 
+            [HoursAbove(speeds, name="hours_above")])["hours_above"]
+        
+        difference = np.abs(hours - point_total[:no_points] * len(directions))
+        if np.any(difference > tolerance_hours):
+            raise Exception("The hourly comfort histogram and the hourly speed "
+                            "matrix disagree by up to {} hours".format(
+                                np.max(difference)))
 
     def set_resolution(self, resolution):
         if type(resolution) != float:
             raise Exception("resolution should be a float in meters")
         self.minimum_resolution = resolution
         self.status.minimum_resolution = resolution
+        self.reduced_index = None
 
     def _check_is_reduce_needed(self):
         if self.minimum_resolution > 0:
@@ -919,68 +1274,32 @@ class pedestrian_wind_comfort_results():
 
         Returns
         -------
-        grid_candidate_center_id : list
+        grid_candidate_center_id : np.array
             The ID's of the points in the original points list to KEEP, 
             i.e. if we reduce the resolution from 0.5m to 5m, which points 
             closest represent an evenly spaced grid with spaces of 5m, the 
             resulting grid will not be structured.
 
         '''
-        points = self.coordinates.to_numpy()
-
-        voxel_size = self.minimum_resolution
-
-        non_empty_voxel_keys, inverse, nb_pts_per_voxel = np.unique(
-            ((points - np.min(points, axis=0)) // voxel_size).astype(int),
-            axis=0,
-            return_inverse=True,
-            return_counts=True)
-
-        idx_pts_vox_sorted = np.argsort(inverse)
-
-        voxel_grid = {}
-        ids_grid = {}
-
-        grid_barycenter = []
-        grid_candidate_center = []
-        grid_candidate_center_id = []
-        last_seen = 0
-
-        for idx, vox in enumerate(non_empty_voxel_keys):
-            voxel_grid[tuple(vox)] = points[
-                idx_pts_vox_sorted[last_seen:last_seen + nb_pts_per_voxel[idx]]]
-
-            ids_grid[tuple(vox)] = idx_pts_vox_sorted[
-                                   last_seen:last_seen + nb_pts_per_voxel[idx]]
-
-            # The geometric centre of a grid space
-            grid_barycenter.append(np.mean(voxel_grid[tuple(vox)], axis=0))
-
-            # The point closest to the centre of a grid space
-            grid_candidate_center.append(
-                voxel_grid[tuple(vox)][np.linalg.norm(voxel_grid[tuple(vox)]
-                                                      - np.mean(voxel_grid[tuple(vox)], axis=0), axis=1).argmin()])
-
-            # The ID of the same point
-            grid_candidate_center_id.append(
-                ids_grid[tuple(vox)][np.linalg.norm(voxel_grid[tuple(vox)]
-                                                    - np.mean(voxel_grid[tuple(vox)], axis=0), axis=1).argmin()])
-
-            last_seen += nb_pts_per_voxel[idx]
-            
-        
-        return grid_candidate_center_id
+        return pc.reduce_resolution_index(self.coordinates.to_numpy(),
+                                          self.minimum_resolution)
 
     def _cluster_points(self):
         '''
         Take point ordinates, and split results into seperate point clouds
         
-        This uses a clustering analysis to seperate the points list into
-        seperate point clouds that can represent different comfort plots.
+        Each comfort plot is a seperate surface of the EnSight results, 
+        the surface of each point is kept in the points file, and the 
+        points are grouped by it. Results without surfaces, e.g. from .csv
+        tables, are split into the connected groups of points, where 
+        points are connected within 1.5 times the resolution.
         
         Returns
         -------
-        None.
+        cluster_index_groups : list
+            A list of (label, dataframe) tuples, the index of each 
+            dataframe is the position of the cluster's points in the 
+            points file.
 
         '''
         points_path = self.status.points_path
@@ -989,9 +1308,18 @@ class pedestrian_wind_comfort_results():
         points = pd.read_feather(points_path)
         points = points.set_index("index", drop=True)
 
-        clustering = DBSCAN(eps=self.minimum_resolution * 1.5, min_samples=5).fit(points.values)
+        if "surface" in points.columns:
+            labels = points.pop("surface").to_numpy()
+        else:
+            labels = pc.grid_connected_components(
+                points[["X", "Y", "Z"]].to_numpy(), 
+                self._get_cluster_distance(points))
+        
+        store = rs.read_store(self.status)
+        if store is not None:
+            store.set_clusters(labels)
 
-        cluster_index = pd.DataFrame(clustering.labels_, columns=["cluster"])
+        cluster_index = pd.DataFrame(labels, columns=["cluster"])
         cluster_index_groups = list(cluster_index.groupby("cluster"))
 
         cluster_index_lists = []
@@ -1012,17 +1340,34 @@ class pedestrian_wind_comfort_results():
 
         return cluster_index_groups
 
+    def _get_cluster_distance(self, points):
+        '''
+        Take points, return the distance within which they are connected
+        
+        This is 1.5 times the resolution, or if the resolution was not 
+        reduced, 1.5 times the mean spacing of the points on the area 
+        they span.
+
+        '''
+        resolution = self.minimum_resolution
+        if resolution <= 0:
+            extent = np.ptp(points[["X", "Y"]].to_numpy(), axis=0)
+            resolution = np.sqrt(max(np.prod(extent), 1e-6) / max(points.shape[0], 1))
+            
+        return resolution * 1.5
+
     def _cluster_fields(self, cluster_index_groups):
         field_paths = self.status.field_paths
 
         for key in field_paths.keys():
             field_path_dict = {}
-            for group in cluster_index_groups:
-                field_path = pathlib.Path(field_paths[key])
-
-                field = pd.read_feather(field_path)
-                field = field.set_index("index", drop=True)
+            
+            field_path = pathlib.Path(field_paths[key])
 
+            field = pd.read_feather(field_path)
+            field = field.set_index("index", drop=True)
+            
+            for group in cluster_index_groups:
                 field_cluster_path = (field_path.parent
                                       / (field_path.stem
                                          + str(group[0])
@@ -1059,8 +1404,7 @@ class comfort_criteria():
 
 def frequencies(speeds, params):
     scale, shape, P, gamma = params
-    bins = speeds / gamma
-    probabilities = (weibull_min.sf(bins, shape, 0, scale)) * P
+    probabilities = cf.weibull_exceedance(speeds, gamma, scale, shape, P)
     return probabilities
 
 
@@ -1088,28 +1432,387 @@ def round_direction(path, direction):
     columns = df.columns.astype(float).to_numpy()
 
     columns.sort()
-    columns = np.append(columns, columns[0] + 360)
-
-    interval = []
-    for i in range(0, len(columns) - 1):
-        interval.append((columns[i] + columns[i + 1]) / 2)
-
-    direction_bin = None
-    for i in range(0, len(interval)):
-        if i == 0:
-            if direction < interval[i] or direction >= interval[-1]:
-                direction_bin = i
-                break
-        else:
-            if direction >= interval[i - 1] and direction < interval[i]:
-                direction_bin = i
-                break
 
-    rounded_direction = columns[direction_bin]
+    rounded_direction = columns[round_direction_index(columns, direction)]
 
     return rounded_direction
 
 
+def round_direction_index(columns, directions):
+    '''
+    Take solved directions and wind directions, return the nearest column
+    
+    Each wind direction is placed in the bin of the closest solved 
+    direction, the bin edges are halfway between neighbouring solved 
+    directions, and the last bin wraps around north to the first.
+
+    Parameters
+    ----------
+    columns : np.array
+        The solved directions in compass angles, in any order.
+    directions : float or np.array
+        One or many wind directions in compass angles, 0 to 360.
+
+    Returns
+    -------
+    int or np.array
+        The position in columns of the closest solved direction, for 
+        each direction.
+
+    '''
+    return ab.sector_index(columns, directions)
+
+
+def hourly_speed_matrix(field, directions, reference_speeds):
+    '''
+    Take a dimensionless field and hourly meteo data, return speeds
+    
+    For every hour, the column of the closest solved direction is picked
+    from the field and scaled by the meteological speed of that hour.
+
+    Parameters
+    ----------
+    field : pd.DataFrame
+        A dimensionless field, the number of rows is the number of points
+        and a column for each solved direction.
+    directions : np.array
+        The hourly wind direction at the meteological station.
+    reference_speeds : np.array
+        The hourly wind speed at the meteological station.
+
+    Returns
+    -------
+    hc_speeds : np.array
+        An array of local wind speeds, the number of rows is the number 
+        of points, and a column for each hour.
+
+    '''
+    columns = field.columns.astype(float).to_numpy()
+    order = np.argsort(columns)
+
+    column_index = round_direction_index(columns[order], directions)
+
+    values = field.to_numpy(dtype=float)[:, order]
+
+    hc_speeds = np.take(values, column_index, axis=1)
+    hc_speeds *= np.asarray(reference_speeds, dtype=float)
+
+    return hc_speeds
+
+
+def hourly_speed_matrix_chunks(field, directions, reference_speeds, 
+                               chunk_size, dtype=np.float64):
+    '''
+    Take a dimensionless field and hourly meteo data, yield speed chunks
+    
+    The same as hourly_speed_matrix, but the matrix is yielded a chunk 
+    of points at a time, so only one chunk is held in memory.
+
+    Parameters
+    ----------
+    field : pd.DataFrame
+        A dimensionless field, the number of rows is the number of points
+        and a column for each solved direction.
+    directions : np.array
+        The hourly wind direction at the meteological station.
+    reference_speeds : np.array
+        The hourly wind speed at the meteological station.
+    chunk_size : int
+        The number of points in each chunk.
+    dtype : np.dtype, optional
+        The type of the speeds yielded, they are calculated in float64.
+        
+        The default is np.float64.
+
+    Yields
+    ------
+    start : int
+        The position of the first point of the chunk.
+    hc_speeds : np.array
+        The local wind speeds of the chunk, points x hours.
+
+    '''
+    columns = field.columns.astype(float).to_numpy()
+    order = np.argsort(columns)
+
+    column_index = round_direction_index(columns[order], directions)
+    reference_speeds = np.asarray(reference_speeds, dtype=float)
+
+    values = field.to_numpy(dtype=float)[:, order]
+
+    for start in range(0, values.shape[0], chunk_size):
+        hc_speeds = np.take(values[start:start + chunk_size], column_index, axis=1)
+        hc_speeds *= reference_speeds
+
+        yield start, hc_speeds.astype(dtype, copy=False)
+
+
+def reduce_hourly_speed_matrix(field, directions, reference_speeds, reducers,
+                               memory_budget=cf.DEFAULT_MEMORY_BUDGET,
+                               hour_block_size=744):
+    '''
+    Take a dimensionless field and hourly meteo data, return statistics
+    
+    The hourly speed matrix is walked a chunk of points and a block of
+    hours at a time, and each block is given to every reducer, so many
+    statistics are evaluated in one pass, and the working memory is set
+    by the memory budget, not the number of points or hours.
+
+    Parameters
+    ----------
+    field : pd.DataFrame
+        A dimensionless field, the number of rows is the number of points
+        and a column for each solved direction.
+    directions : np.array
+        The hourly wind direction at the meteological station.
+    reference_speeds : np.array
+        The hourly wind speed at the meteological station.
+    reducers : list
+        HourlyStatistics reducers, e.g. HoursAbove(5), Percentile(95).
+    memory_budget : int, optional
+        The maximum number of bytes used by a block. 
+        
+        The default is 256MB.
+    hour_block_size : int, optional
+        The number of hours in a block. The default is 744, a month.
+
+    Returns
+    -------
+    dict
+        The result of each reducer, keyed by its name.
+
+    '''
+    columns = field.columns.astype(float).to_numpy()
+    order = np.argsort(columns)
+
+    column_index = round_direction_index(columns[order], directions)
+    reference_speeds = np.asarray(reference_speeds, dtype=float)
+
+    values = field.to_numpy(dtype=float)[:, order]
+
+    no_points = values.shape[0]
+    no_hours = len(column_index)
+    hour_block_size = max(1, min(hour_block_size, no_hours))
+
+    # The largest speed, 0 if there are none, e.g. a cluster of NaN
+    upper_speed = 0.0
+    if values.size > 0 and no_hours > 0:
+        upper_speed = float(np.nan_to_num(np.fmax.reduce(values, axis=None)
+                                          * np.fmax.reduce(reference_speeds), 
+                                          nan=0.0))
+
+    for reducer in reducers:
+        reducer.allocate(no_points, no_hours, upper_speed)
+
+    # The block of speeds, a temporary, and what the reducers keep
+    bytes_per_point = hour_block_size * 8 * 2 + sum(
+        reducer.bytes_per_point(hour_block_size) for reducer in reducers)
+    chunk_size = max(1, int(memory_budget // bytes_per_point))
+
+    for start in range(0, no_points, chunk_size):
+        points = slice(start, min(start + chunk_size, no_points))
+        chunk_values = values[points]
+
+        for hour in range(0, no_hours, hour_block_size):
+            hours = slice(hour, min(hour + hour_block_size, no_hours))
+
+            hc_speeds = np.take(chunk_values, column_index[hours], axis=1)
+            hc_speeds *= reference_speeds[hours]
+
+            for reducer in reducers:
+                reducer.update(points, hours, hc_speeds)
+
+        for reducer in reducers:
+            reducer.finish(points)
+
+    return {reducer.name: reducer.result() for reducer in reducers}
+
+
+# The memory pandas uses to write a value as csv text, measured on
+# float32 and float64 speeds
+CSV_BYTES_PER_VALUE = 32
+
+
+def get_hourly_chunk_size(no_hours, dtype=np.float64, 
+                          memory_budget=cf.DEFAULT_MEMORY_BUDGET,
+                          output_file='npy'):
+    '''
+    Take the number of hours and a memory budget, return points per chunk
+    
+    A chunk holds the float64 speeds, and a copy in the output type. A 
+    feather chunk also holds a Fortran ordered copy and its record 
+    batch, and a csv chunk the text of its values.
+    '''
+    itemsize = np.dtype(dtype).itemsize
+    bytes_per_value = 8 + itemsize
+    if output_file == 'feather':
+        bytes_per_value += 2 * itemsize
+    elif output_file == 'csv':
+        bytes_per_value += CSV_BYTES_PER_VALUE
+
+    bytes_per_point = max(no_hours, 1) * bytes_per_value
+
+    return max(1, int(memory_budget // bytes_per_point))
+
+
+def write_hourly_speed_matrix(field, directions, reference_speeds, path,
+                              output_file='npy', dtype=np.float64,
+                              chunk_size=None,
+                              memory_budget=cf.DEFAULT_MEMORY_BUDGET):
+    '''
+    Take a dimensionless field and hourly meteo data, write the speeds
+    
+    The matrix is calculated and written a chunk of points at a time, so
+    the memory used is bounded by the chunk size, not the number of
+    points. A .npy file is written through a memory map, a .feather file 
+    as one Arrow record batch per chunk, and a .csv is appended to.
+
+    Parameters
+    ----------
+    field : pd.DataFrame
+        A dimensionless field, the number of rows is the number of points
+        and a column for each solved direction.
+    directions : np.array
+        The hourly wind direction at the meteological station.
+    reference_speeds : np.array
+        The hourly wind speed at the meteological station.
+    path : pathlib.Path
+        The file to write, without suffix.
+    output_file : str, optional
+        The format, 'npy', 'feather' or 'csv'. The default is 'npy'.
+    dtype : np.dtype, optional
+        The type to store the speeds as, np.float32 halves the size.
+        
+        The default is np.float64.
+    chunk_size : int, optional
+        The number of points per chunk, if None, it is taken from the
+        memory budget.
+    memory_budget : int, optional
+        The maximum number of bytes a chunk may use. 
+        
+        The default is 256MB.
+
+    Raises
+    ------
+    Exception
+        If the output format is not known.
+
+    Returns
+    -------
+    path : pathlib.Path
+        The path of the written file.
+
+    '''
+    no_points = field.shape[0]
+    no_hours = len(directions)
+
+    if chunk_size is None:
+        chunk_size = get_hourly_chunk_size(no_hours, dtype, memory_budget,
+                                           output_file)
+
+    chunks = hourly_speed_matrix_chunks(field, directions, reference_speeds,
+                                        chunk_size, dtype=dtype)
+
+    path = pathlib.Path(path)
+    path = path.with_name(path.name + "." + output_file)
+
+    if output_file == 'npy':
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                           shape=(no_points, no_hours))
+        for start, hc_speeds in chunks:
+            matrix[start:start + hc_speeds.shape[0]] = hc_speeds
+        matrix.flush()
+        del matrix
+
+    elif output_file == 'feather':
+        import pyarrow as pa
+
+        names = ["index"] + [str(hour) for hour in range(no_hours)]
+        arrow_type = pa.from_numpy_dtype(np.dtype(dtype))
+        schema = pa.schema([pa.field("index", pa.int64())] 
+                           + [pa.field(name, arrow_type) for name in names[1:]])
+
+        with pa.OSFile(path.as_posix(), 'wb') as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                for start, hc_speeds in chunks:
+                    # Columns of a Fortran ordered array are contiguous
+                    hc_speeds = np.asfortranarray(hc_speeds)
+                    index = np.arange(start, start + hc_speeds.shape[0], dtype=np.int64)
+
+                    arrays = [pa.array(index)] + [pa.array(hc_speeds[:, hour]) 
+                                                  for hour in range(no_hours)]
+                    writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+    elif output_file == 'csv':
+        with open(path, 'w', newline='') as outfile:
+            for start, hc_speeds in chunks:
+                pd.DataFrame(hc_speeds).to_csv(outfile, header=False, index=False)
+
+    else:
+        raise Exception("output_file should be one of 'npy', 'feather' or 'csv'")
+
+    return path
+
+
+def read_hourly_speed_matrix(path, points=None, hours=None):
+    '''
+    Take a speed matrix file, return a range of its points and hours
+    
+    Only the requested part is read, a .npy file through a memory map, a
+    .feather file by its columns, and a .csv by its rows and columns.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        A .npy, .feather or .csv written by write_hourly_speed_matrix or
+        _create_hourly_continuous_windspeed.
+    points : slice, optional
+        The points to read, if None, all points.
+    hours : slice or list, optional
+        The hours to read, if None, all hours.
+
+    Returns
+    -------
+    np.array
+        The local wind speeds, points x hours.
+
+    '''
+    path = pathlib.Path(path)
+    if points is None:
+        points = slice(None)
+    if hours is None:
+        hours = slice(None)
+
+    if path.suffix == '.npy':
+        matrix = np.load(path, mmap_mode='r')
+        return np.array(matrix[points][:, hours])
+
+    if path.suffix == '.feather':
+        import pyarrow.feather as feather
+        
+        names = feather.read_table(path, columns=[], memory_map=True).schema.names
+        no_hours = len(names) - 1 if "index" in names else len(names)
+        columns = [str(hour) for hour in np.arange(no_hours)[hours]]
+
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        start, stop, step = points.indices(table.num_rows)
+        table = table.slice(start, max(stop - start, 0))
+
+        return table.to_pandas().to_numpy()[::step]
+
+    no_hours = len(pd.read_csv(path, header=None, nrows=1).columns)
+    columns = list(np.arange(no_hours)[hours])
+
+    with open(path) as infile:
+        no_points = sum(1 for _ in infile)
+    start, stop, step = points.indices(no_points)
+
+    df = pd.read_csv(path, header=None, usecols=columns, skiprows=start,
+                     nrows=max(stop - start, 0))
+
+    return df[columns].to_numpy()[::step]
+
+
 def reduce_resolution(points, resolution):
     '''
     Take a fine point cloud, return a coarser one.
@@ -1127,56 +1830,14 @@ def reduce_resolution(points, resolution):
 
     Returns
     -------
-    grid_candidate_center_id : list
+    grid_candidate_center_id : np.array
         The ID's of the points in the original points list to KEEP, 
         i.e. if we reduce the resolution from 0.5m to 5m, which points 
         closest represent an evenly spaced grid with spaces of 5m, the 
         resulting grid will not be structured.
 
     '''
-    points = points.to_numpy()
-
-    voxel_size = resolution
-
-    non_empty_voxel_keys, inverse, nb_pts_per_voxel = np.unique(
-        ((points - np.min(points, axis=0)) // voxel_size).astype(int),
-        axis=0,
-        return_inverse=True,
-        return_counts=True)
-
-    idx_pts_vox_sorted = np.argsort(inverse)
-
-    voxel_grid = {}
-    ids_grid = {}
-
-    grid_barycenter = []
-    grid_candidate_center = []
-    grid_candidate_center_id = []
-    last_seen = 0
-
-    for idx, vox in enumerate(non_empty_voxel_keys):
-        voxel_grid[tuple(vox)] = points[
-            idx_pts_vox_sorted[last_seen:last_seen + nb_pts_per_voxel[idx]]]
-
-        ids_grid[tuple(vox)] = idx_pts_vox_sorted[
-                               last_seen:last_seen + nb_pts_per_voxel[idx]]
-
-        # The geometric centre of a grid space
-        grid_barycenter.append(np.mean(voxel_grid[tuple(vox)], axis=0))
-
-        # The point closest to the centre of a grid space
-        grid_candidate_center.append(
-            voxel_grid[tuple(vox)][np.linalg.norm(voxel_grid[tuple(vox)]
-                                                  - np.mean(voxel_grid[tuple(vox)], axis=0), axis=1).argmin()])
-
-        # The ID of the same point
-        grid_candidate_center_id.append(
-            ids_grid[tuple(vox)][np.linalg.norm(voxel_grid[tuple(vox)]
-                                                - np.mean(voxel_grid[tuple(vox)], axis=0), axis=1).argmin()])
-
-        last_seen += nb_pts_per_voxel[idx]
-
-    return grid_candidate_center_id
+    return pc.reduce_resolution_index(points, resolution)
 
 
 def reduce_field(data, idx):
@@ -1204,7 +1865,19 @@ class dimensionaliser():
     def __init__(self, status):
         self.status = status
 
-    def return_dimensional_speed(self, direction, reference_speed):
+    def return_dimensional_speed(self, direction, reference_speed, cluster=None):
+        store = rs.read_store(self.status)
+        if store is not None:
+            directions = np.sort(np.asarray(store.directions, dtype=float))
+            direction = directions[round_direction_index(directions, direction)]
+            
+            field = store.get_field("dimensionless_UMag", 
+                                    direction=direction, 
+                                    cluster=cluster)
+            
+            return pd.Series(field * float(reference_speed), 
+                             name=str(float(direction)))
+        
         path = pathlib.Path(
             self.status.field_paths["dimensionless_UMag"])
 
@@ -1216,7 +1889,15 @@ class dimensionaliser():
 
         return speed
 
-    def return_points(self):
+    def return_points(self, cluster=None):
+        store = rs.read_store(self.status)
+        if store is not None:
+            df = pd.DataFrame(store.get_points(cluster=cluster), 
+                              columns=["X", "Y", "Z"])
+            df.insert(0, "index", store.get_index(cluster=cluster))
+            
+            return df
+        
         path = pathlib.Path(
             self.status.points_path)
 
@@ -1,14 +1,15 @@
 import logging
 import pathlib
 import shutil
-import zipfile
 
 import numpy as np
 import pandas as pd
-import vtk
-from scipy.stats import weibull_min
 
 import simscale_eba.SimulationCore as sc
+import simscale_eba.post_processing.ComfortFrequencies as cf
+from simscale_eba.lazy_import import lazy_import
+
+vtk = lazy_import("vtk")
 
 _logger = logging.getLogger(__name__)
 
@@ -362,20 +363,11 @@ class directional_result():
 
         for item in items:
             url = item.download.url
-            data_responce = self.api_client.rest_client.GET(
-                url=url,
-                headers={self.api_key_header: self.api_key},
-                _preload_content=False
-            )
-
-            probe_point_plot_statistical_data_csv = data_responce.data.decode('utf-8')
             output_path = path / "{}_{}_{}.csv".format(category, name, self.name)
 
             download_dict[category][name][quantity] = output_path
 
-            with open(output_path, 'w', newline="") as file:
-                file.write(probe_point_plot_statistical_data_csv)
-            file.close()
+            sc.download_file(self, url, output_path)
 
         self.download_dict = download_dict
 
@@ -396,6 +388,8 @@ class multi_directional_result():
         self.reference_speeds = {}
 
         self.comfort_criteria = None
+        self.comfort_map = None
+        self.comfort_maps = {}
 
         self.project_api = None
         self.simulation_api = None
@@ -531,43 +525,24 @@ class multi_directional_result():
         is_sucessful : boolean
         '''
 
-        api_client = self.api_client
-        api_key_header = self.api_key_header
-        api_key = self.api_key
         download_obj = self.case_download_dict[str(direction)]
 
         url = download_obj.url
 
         print(f'Downloading results for direction: {direction}')
         try:
-            averaged_solution_response = api_client.rest_client.GET(
-                url=url,
-                headers={api_key_header: api_key},
-                _preload_content=False
-            )
             out_file = path.joinpath(f'{direction}averaged_solution.zip_')
-            with out_file.open('wb') as zip__file:
-                zip__file.write(averaged_solution_response.data)
+            sc.download_file(self, url, out_file)
 
-            # extract data
-            zip_ = zipfile.ZipFile(out_file.as_posix())
+            # extract only the .case file and the data it references
             extract_subdirectory = path.joinpath(str(direction))
-            zip_.extractall(extract_subdirectory)
-            zip_.close()
+            case_file_path = sc.extract_case(
+                out_file, 
+                extract_subdirectory,
+                case_directory='Directions/{}/export'.format(direction))
 
             # delete the file
             out_file.unlink()
-
-            result_path = extract_subdirectory.joinpath('Directions', str(direction), 'export')
-
-            case_file_path = ''
-            for file in result_path.iterdir():
-                shutil.move(file.as_posix(), extract_subdirectory.joinpath(file.name))
-                if file.suffix == '.case':
-                    case_file_path = file
-
-            delete_path = extract_subdirectory.joinpath('Directions')
-            shutil.rmtree(delete_path.as_posix(), ignore_errors=True)
         except:
             raise Exception('results for direction {} failed to download'.format(direction))
 
@@ -900,8 +875,9 @@ class multi_directional_result():
 
         Parameters
         ----------
-        comfort_criteria : comfort criteria object
-            The object repressenting the comfort critria.
+        comfort_criteria : comfort criteria object or list
+            The object repressenting the comfort critria, or a list of 
+            them, e.g. one per VDI frequency bin, to evaluate together.
 
         Returns
         -------
@@ -910,9 +886,23 @@ class multi_directional_result():
         '''
         self.comfort_criteria = comfort_criteria
 
-    def calculate_wind_comfort(self):
+    def calculate_wind_comfort(self, memory_budget=cf.DEFAULT_MEMORY_BUDGET):
         '''
         Calulates and saves the local comfort criteria
+        
+        When a list of comfort criteria is set, the exceedance of every
+        distinct criteria speed is evaluated once, and shared by all the
+        criteria. A map is saved per criteria, and the worst category 
+        of any criteria is saved as comfort_map_worst_case.result.
+
+        Parameters
+        ----------
+        memory_budget : int, optional
+            The maximum number of bytes used to evaluate the exceedance 
+            of the points at once, larger budgets use fewer, larger 
+            chunks.
+            
+            The default is 256MB.
 
         Returns
         -------
@@ -920,61 +910,29 @@ class multi_directional_result():
 
         '''
         gamma = pd.read_feather("gamma.result")
-        weibull_parameters = self.weather_statistics.weibull_parameters
-        comfort_criteria = self.comfort_criteria
-
-        shape = weibull_parameters.loc["shape", :].values
-        P = weibull_parameters.loc["probability", :].values
-        scale = weibull_parameters.loc["scale", :].values
-
-        speeds = []
-        for i in range(0, len(comfort_criteria.comfort_dict)):
-            speeds.append(comfort_criteria.comfort_dict[str(i)]["speed"])
-
-        gamma_shape = gamma.shape
-        X = gamma_shape[0]
-        Y = gamma_shape[1]
-        Z = len(comfort_criteria.comfort_dict)
-        frequency_table = np.ones([X, Y, Z])
-        iter_table = gamma.values
-
-        # need to iterate gamma now
-        it = np.nditer(iter_table, flags=['multi_index'], op_flags=['readwrite'])
-        while not it.finished:
-            freq = frequencies(speeds, params=[scale[it.multi_index[1]],
-                                               shape[it.multi_index[1]],
-                                               P[it.multi_index[1]],
-                                               it[0]])
-
-            frequency_table[it.multi_index[0],
-            it.multi_index[1],
-            :] = freq
-
-            it.iternext()
-
-        point_total = frequency_table.sum(axis=1)
-        comfort_map = np.zeros(X)
-        # return frequency_table
-        for i in (list(range(0, len(comfort_criteria.comfort_dict)))):
-            if comfort_criteria.comfort_dict[str(i)]["frequency"][0] == "less":
-
-                criteria = (comfort_criteria.comfort_dict[str(i)]["frequency"][1]) / 100
-                is_exceeding = point_total[:, i] > criteria
-                print(np.nanmax(point_total[:, i]), np.nanmin(point_total[:, i]), criteria)
-                comfort_map[is_exceeding] = i + 1
-
-            elif comfort_criteria.comfort_dict[str(i)]["frequency"][0] == "greater":
-                pass
-                '''
-                criteria = (comfort_criteria.comfort_dict[str(i)]["frequency"][1])/100
-                is_exceeding = point_total[:, i] > criteria
-                print(np.nanmax(point_total[:, i]), np.nanmin(point_total[:, i]), criteria)
-                '''
+        criteria = cf.as_criteria_list(self.comfort_criteria)
+
+        scale, shape, P = cf.align_weibull_parameters(
+            gamma.columns, self.weather_statistics.weibull_parameters)
+
+        speeds, positions = cf.shared_criteria_speeds(criteria)
+
+        point_total = cf.total_exceedance(gamma.to_numpy(), speeds,
+                                          scale, shape, P,
+                                          memory_budget=memory_budget)
+
+        self.comfort_maps, comfort_map = cf.criteria_comfort_maps(
+            point_total, positions, criteria)
 
         self.comfort_map = comfort_map
 
-        df = pd.DataFrame(data=comfort_map, columns=["comfort"])
-        df.to_feather("comfort_map_{}.result".format(self.comfort_criteria.name))
+        for name, criteria_map in self.comfort_maps.items():
+            df = pd.DataFrame(data=criteria_map, columns=["comfort"])
+            df.to_feather("comfort_map_{}.result".format(name))
+
+        if len(criteria) > 1:
+            df = pd.DataFrame(data=comfort_map, columns=["comfort"])
+            df.to_feather("comfort_map_worst_case.result")
 
     def set_weather_statistics(self, weather_statistics):
         '''
@@ -1023,8 +981,7 @@ def make_dimensionless(df, _type, reference_velocity):
 
 def frequencies(speeds, params):
     scale, shape, P, gamma = params
-    bins = speeds / gamma
-    probabilities = (weibull_min.sf(bins, shape, 0, scale)) * P
+    probabilities = cf.weibull_exceedance(speeds, gamma, scale, shape, P)
     return probabilities
 
 
@@ -0,0 +1,483 @@
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import threading
+
+import numpy as np
+import pandas as pd
+
+import simscale_eba.PedestrianWindComfort as pwc
+import simscale_eba.ResultStore as rs
+import simscale_eba.pwc_status as stat
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 50123
+
+
+class LoadedResult():
+    '''
+    A downloaded PWC result held in memory.
+
+    The status and the points of every cluster are read once, and reused
+    for every query until the simulation.json of the result directory
+    changes. Fields, including the dimensionless speed, are read the
+    first time they are asked for, so queries of points or ordinates
+    never read a field.
+    '''
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.status = None
+        self.status_mtime = None
+        self.store = None
+
+        self.keys = []
+        self.points = {}
+
+        self.directions = None
+        self._sorted_directions = None
+        self._direction_order = None
+        self._fields = {}
+        # Queries are answered on a thread each, a field is read by one
+        self.lock = threading.Lock()
+
+        self.load()
+
+    def _status_mtime(self):
+        return os.stat(self.path / "simulation.json").st_mtime_ns
+
+    def is_current(self):
+        return self._status_mtime() == self.status_mtime
+
+    def load(self):
+        status = stat.simulation_status()
+        status.set_result_directory(self.path)
+        status.read_simulation_status()
+
+        self.status_mtime = self._status_mtime()
+        self.status = status
+
+        points_paths = status.points_path
+
+        self.keys = list(status.field_paths["dimensionless_UMag"].keys())
+        self.points = {}
+        self._fields = {}
+        self.directions = None
+
+        store = rs.read_store(status)
+        if store is not None and store.clusters is None:
+            store = None
+        self.store = store
+
+        for key in self.keys:
+            if store is not None:
+                self.points[key] = np.array(store.get_points(cluster=key))
+            else:
+                points = pd.read_feather(points_paths[key])
+                self.points[key] = points[["X", "Y", "Z"]].to_numpy()
+
+    @property
+    def fields(self):
+        '''
+        The dimensionless speed of each cluster, read on first use
+        '''
+        return self.get_field("dimensionless_UMag")
+
+    def get_field(self, name):
+        '''
+        Take a field name, return the field of each cluster
+
+        Parameters
+        ----------
+        name : str
+            A field of the status, e.g. dimensionless_UMag or 
+            dimensional_GEM.
+
+        Returns
+        -------
+        dict
+            A points x directions array per cluster key, the columns are 
+            in the order of self.directions.
+
+        '''
+        if name in self._fields:
+            return self._fields[name]
+
+        with self.lock:
+            if name not in self._fields:
+                self._fields[name] = self._read_field(name)
+
+        return self._fields[name]
+
+    def _read_field(self, name):
+        '''
+        Take a field name, read the field of each cluster
+        
+        Use get_field, which holds the lock while this is read.
+        '''
+        if name not in self.status.field_paths:
+            raise Exception("Field {} was not found, the result has: {}".format(
+                name, list(self.status.field_paths.keys())))
+
+        fields = {}
+        if self.store is not None and name in self.store.fields:
+            for key in self.keys:
+                fields[key] = np.array(self.store.get_field(name, cluster=key))
+
+            directions = self.store.directions
+        else:
+            field_paths = self.status.field_paths[name]
+            for key in self.keys:
+                field = pd.read_feather(field_paths[key])
+                field = field.set_index("index", drop=True)
+                fields[key] = field.to_numpy()
+
+            directions = field.columns
+
+        directions = np.asarray(directions, dtype=float)
+        if self.directions is None:
+            # The directions last, they are read without the lock
+            self._direction_order = np.argsort(directions)
+            self._sorted_directions = directions[self._direction_order]
+            self.directions = directions
+        elif not np.array_equal(directions, self.directions):
+            # Keep every field in the column order of the first
+            order = [np.flatnonzero(directions == d)[0] for d in self.directions]
+            for key in self.keys:
+                fields[key] = fields[key][:, order]
+
+        return fields
+
+    def direction_position(self, direction):
+        '''
+        Take wind directions, return the field column of the closest ones
+        '''
+        if self.directions is None:
+            # The directions are those of the first field read
+            self.get_field("dimensionless_UMag")
+
+        position = pwc.round_direction_index(self._sorted_directions,
+                                             np.asarray(direction, dtype=float))
+        return self._direction_order[position]
+
+    def cast_speed(self, direction, reference_speed):
+        '''
+        Take a direction and speed, return the speed of each cluster
+
+        The same as the cast-speed command.
+        '''
+        column = self.direction_position(direction)
+
+        speeds = []
+        for key in self.keys:
+            speed = self.fields[key][:, column] * float(reference_speed)
+            speeds.append(speed.tolist())
+
+        return speeds
+
+    def cast_ordinate(self, ordinate):
+        '''
+        Take an ordinate X, Y or Z, return the ordinate of each cluster
+
+        The same as the cast-ordinate command.
+        '''
+        column = ["X", "Y", "Z"].index(ordinate)
+
+        return [self.points[key][:, column].tolist() for key in self.keys]
+
+    def query(self, requests):
+        '''
+        Take a batch of requests, return the answer of each per cluster
+
+        Every field is read once, however many requests use it, and each
+        request is answered for all of its directions at once.
+
+        Parameters
+        ----------
+        requests : list
+            A list of request dictionaries, each with a "type" of:
+                
+            - ordinate: "ordinates", a list of X, Y and Z, or "ordinate",
+              a single one.
+            - speed: "directions" and "speeds", lists of the same length,
+              or a single "direction" and "speed", and optionally 
+              "field", the default is dimensionless_UMag.
+            - field: "field", and optionally "directions", the default is
+              all directions in the order of self.directions.
+              
+            Any request can have "clusters", a list of cluster keys, the 
+            default is all clusters.
+
+        Raises
+        ------
+        Exception
+            If a request type is not known.
+
+        Returns
+        -------
+        answers : list
+            A dictionary per request and cluster, with the keys "request",
+            the position of the request in the batch, "cluster" and 
+            "values", a points x values array, or a 1D array if the 
+            request asked for a single value.
+
+        '''
+        answers = []
+        for i, request in enumerate(requests):
+            request_type = request.get("type")
+            keys = [str(key) for key in request.get("clusters", self.keys)]
+
+            if request_type == "ordinate":
+                is_single = "ordinate" in request
+                ordinates = ([request["ordinate"]] if is_single 
+                             else request.get("ordinates", ["X", "Y", "Z"]))
+                columns = [["X", "Y", "Z"].index(o) for o in ordinates]
+                
+                fields = self.points
+                factors = None
+
+            elif request_type in ("speed", "field"):
+                fields = self.get_field(request.get("field", "dimensionless_UMag"))
+
+                if request_type == "speed":
+                    is_single = "direction" in request
+                    directions = ([request["direction"]] if is_single 
+                                  else request["directions"])
+                    factors = np.asarray([request["speed"]] if is_single 
+                                         else request["speeds"], dtype=float)
+                    
+                    if len(factors) != len(directions):
+                        raise Exception("Request {} has {} directions, but {} "
+                                        "speeds".format(i, len(directions), len(factors)))
+                else:
+                    is_single = "direction" in request
+                    directions = ([request["direction"]] if is_single 
+                                  else request.get("directions", self.directions))
+                    factors = None
+
+                columns = self.direction_position(np.asarray(directions, dtype=float))
+
+            else:
+                raise Exception("Request {} has an unknown type {}, the types are: "
+                                "ordinate, speed, field".format(i, request_type))
+
+            for key in keys:
+                values = np.take(fields[key], columns, axis=1)
+                if factors is not None:
+                    values *= factors
+                if is_single:
+                    values = values[:, 0]
+
+                answers.append({"request": i, "cluster": key, "values": values})
+
+        return answers
+
+    def speed_matrix(self, speeds, directions, output_file='csv'):
+        '''
+        Take hourly speeds and directions, write the hourly speed matrix
+
+        The same as the create-speed-matrix command, the matrices are
+        written to the result directory, one per cluster, as csv, feather
+        or npy.
+
+        Raises
+        ------
+        Exception
+            If output_file is not csv, feather or npy.
+
+        Returns
+        -------
+        names : list
+            The file names, without suffix, of the speed matrices.
+
+        '''
+        if output_file not in ('csv', 'feather', 'npy'):
+            raise Exception("output_file should be one of 'npy', 'feather' or 'csv'")
+
+        speeds = np.asarray(speeds, dtype=float)
+        directions = np.asarray(directions, dtype=float)
+
+        names = []
+        for key in self.keys:
+            field = pd.DataFrame(self.fields[key],
+                                 columns=[str(d) for d in self.directions])
+
+            speed_matric_path = pwc.write_hourly_speed_matrix(
+                field, directions, speeds,
+                self.path / "speed_matrix_{}".format(key),
+                output_file=output_file)
+
+            names.append(speed_matric_path.stem)
+
+        return names
+
+
+class ResultCache():
+    '''
+    The results loaded by a server, keyed by result directory.
+    '''
+
+    def __init__(self):
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        key = pathlib.Path(path).resolve().as_posix()
+
+        with self.lock:
+            result = self.results.get(key)
+            if result is None or not result.is_current():
+                result = LoadedResult(key)
+                self.results[key] = result
+
+        return result
+
+    def handle(self, request):
+        '''
+        Take a request dictionary, return the result of the command
+
+        Raises
+        ------
+        Exception
+            If the command is not known.
+
+        '''
+        command = request.get("command")
+
+        if command == "ping":
+            return "pong"
+
+        result = self.get(request["path"])
+
+        if command == "cast-speed":
+            return result.cast_speed(request["direction"],
+                                     request["reference_speed"])
+        elif command == "cast-ordinate":
+            return result.cast_ordinate(request["ordinate"])
+        elif command == "query":
+            answers = result.query(request["requests"])
+            for answer in answers:
+                answer["values"] = answer["values"].tolist()
+            return answers
+        elif command == "speed-matrix":
+            return result.speed_matrix(request["speeds"],
+                                       request["directions"],
+                                       request.get("output_file", "csv"))
+        else:
+            raise Exception("Unknown command {}, the server accepts: ping, "
+                            "cast-speed, cast-ordinate, query, speed-matrix".format(command))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    '''
+    Answers newline delimited JSON requests, one JSON response per line
+    '''
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+                if request.get("command") == "shutdown":
+                    self._respond({"result": "shutting down"})
+                    threading.Thread(target=self.server.shutdown).start()
+                    return
+
+                response = {"result": self.server.cache.handle(request)}
+            except Exception as error:
+                response = {"error": "{}: {}".format(type(error).__name__, error)}
+
+            self._respond(response)
+
+    def _respond(self, response):
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class ResultServer(socketserver.ThreadingTCPServer):
+    '''
+    A long lived local server that answers queries on PWC results.
+
+    Starting Python, importing the package and reading the results for
+    each query is slower than the query itself, the server does this
+    once, so that repeated queries, e.g. from a Grasshopper slider, are
+    answered from memory. It only listens on the loopback interface.
+    '''
+    daemon_threads = True
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        super().__init__((host, port), _RequestHandler)
+        self.cache = ResultCache()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    '''
+    Take a host and port, answer queries until shutdown
+
+    Parameters
+    ----------
+    host : str, optional
+        The interface to listen on. The default is 127.0.0.1.
+    port : int, optional
+        The port to listen on. The default is 50123.
+
+    Returns
+    -------
+    None.
+
+    '''
+    with ResultServer(host, port) as server:
+        print("Serving results on {}:{}".format(host, port))
+        server.serve_forever()
+
+
+def query(command, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None,
+          **arguments):
+    '''
+    Take a command and its arguments, return the answer of a server
+
+    Parameters
+    ----------
+    command : str
+        One of ping, cast-speed, cast-ordinate, speed-matrix or shutdown.
+    host : str, optional
+        The host of the server. The default is 127.0.0.1.
+    port : int, optional
+        The port of the server. The default is 50123.
+    timeout : float, optional
+        Seconds to wait for the server, None waits indefinitely.
+    **arguments
+        The arguments of the command, e.g. path, direction and
+        reference_speed for cast-speed.
+
+    Raises
+    ------
+    Exception
+        If the server answered with an error.
+
+    Returns
+    -------
+    The result of the command, e.g. a list of speeds per cluster.
+
+    '''
+    request = dict(arguments)
+    request["command"] = command
+
+    for key, value in request.items():
+        if isinstance(value, pathlib.PurePath):
+            request[key] = value.as_posix()
+
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+
+        with connection.makefile("rb") as response_file:
+            response = json.loads(response_file.readline())
+
+    if "error" in response:
+        raise Exception(response["error"])
+
+    return response["result"]
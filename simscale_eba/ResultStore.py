@@ -0,0 +1,284 @@
+import json
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+
+class ResultStore():
+    '''
+    A directory of memory mapped arrays holding a PWC result.
+
+    The store holds the point coordinates, the original index of each
+    point, an optional cluster label for each point and any number of
+    fields. Each field is a single .npy file of shape directions x points,
+    so one direction is a contiguous row of the file, and reading it, or
+    the points of one cluster within it, only touches that row.
+
+    A manifest.json describes the directions, the fields and the
+    clusters, everything else is read lazily with np.load(mmap_mode='r').
+    '''
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.manifest_name = "manifest.json"
+
+        self.no_points = None
+        self.directions = []
+        self.fields = {}
+        self.clusters = None
+
+        self._cluster_labels = None
+
+    def exists(self):
+        return (self.path / self.manifest_name).exists()
+
+    def read_manifest(self):
+        with open(self.path / self.manifest_name, "r") as read_file:
+            manifest = json.load(read_file)
+
+        self.no_points = manifest["no_points"]
+        self.directions = manifest["directions"]
+        self.fields = manifest["fields"]
+        self.clusters = manifest["clusters"]
+        self._cluster_labels = None
+
+        return self
+
+    def write_manifest(self):
+        manifest = {
+            "no_points": self.no_points,
+            "directions": self.directions,
+            "fields": self.fields,
+            "clusters": self.clusters,
+        }
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / self.manifest_name, "w") as outfile:
+            outfile.write(json.dumps(manifest, indent=4))
+
+    def set_points(self, points, index=None):
+        '''
+        Take point coordinates, save them to the store
+
+        Fields and clusters already in the store are kept if they have 
+        the same number of points, otherwise they are dropped.
+
+        Parameters
+        ----------
+        points : np.array or pd.DataFrame
+            The coordinates, the number of rows is the number of points,
+            and 3 columns, X, Y and Z.
+        index : np.array, optional
+            The index of each point in the unreduced comfort plot. If
+            None, the points are numbered from 0.
+
+        Returns
+        -------
+        None.
+
+        '''
+        points = np.ascontiguousarray(points, dtype=float)
+        if index is None:
+            index = np.arange(points.shape[0])
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        if self.no_points != points.shape[0]:
+            self.fields = {}
+            self.clusters = None
+            self._cluster_labels = None
+
+        self.no_points = points.shape[0]
+
+        np.save(self.path / "points.npy", points)
+        np.save(self.path / "index.npy", np.asarray(index, dtype=np.int64))
+
+        self.write_manifest()
+
+    def set_field(self, name, values, directions):
+        '''
+        Take a field, save it to the store
+
+        Parameters
+        ----------
+        name : str
+            The name of the field, for example dimensionless_UMag.
+        values : np.array or pd.DataFrame
+            The field, the number of rows is the number of points, the
+            number of columns is the number of directions.
+        directions : list
+            The direction of each column.
+
+        Returns
+        -------
+        None.
+
+        '''
+        values = np.asarray(values, dtype=float)
+        directions = [str(direction) for direction in directions]
+
+        if values.shape[0] != self.no_points:
+            raise Exception("Field {} has {} points, the store has {}".format(
+                name, values.shape[0], self.no_points))
+
+        # Fields with other directions are from an older result
+        if directions != self.directions:
+            self.fields = {}
+            self.directions = directions
+
+        file_name = "{}.npy".format(name)
+        np.save(self.path / file_name, np.ascontiguousarray(values.T))
+
+        self.fields[name] = file_name
+        self.write_manifest()
+
+    def set_clusters(self, labels):
+        '''
+        Take a cluster label for each point, save them to the store
+
+        Parameters
+        ----------
+        labels : np.array
+            An integer label for each point.
+
+        Returns
+        -------
+        None.
+
+        '''
+        labels = np.asarray(labels, dtype=np.int64)
+
+        if labels.shape[0] != self.no_points:
+            raise Exception("{} cluster labels were given, the store has {}"
+                            " points".format(labels.shape[0], self.no_points))
+
+        np.save(self.path / "clusters.npy", labels)
+
+        self.clusters = [str(label) for label in np.unique(labels)]
+        self._cluster_labels = None
+        self.write_manifest()
+
+    def get_cluster_index(self, cluster):
+        '''
+        Take a cluster key, return the positions of its points in the store
+        '''
+        if self.clusters is None:
+            raise Exception("The store has no clusters")
+
+        if self._cluster_labels is None:
+            self._cluster_labels = np.load(self.path / "clusters.npy",
+                                           mmap_mode="r")
+
+        return np.flatnonzero(self._cluster_labels == int(cluster))
+
+    def get_points(self, cluster=None):
+        '''
+        Take an optional cluster, return the point coordinates
+
+        Returns
+        -------
+        np.array
+            The coordinates, a row per point, and 3 columns X, Y and Z.
+
+        '''
+        points = np.load(self.path / "points.npy", mmap_mode="r")
+        if cluster is None:
+            return points
+
+        return points[self.get_cluster_index(cluster)]
+
+    def get_index(self, cluster=None):
+        '''
+        Take an optional cluster, return the original index of each point
+        '''
+        index = np.load(self.path / "index.npy", mmap_mode="r")
+        if cluster is None:
+            return index
+
+        return index[self.get_cluster_index(cluster)]
+
+    def get_field(self, name, direction=None, cluster=None):
+        '''
+        Take a field name, return the field, for a direction or cluster
+
+        Parameters
+        ----------
+        name : str
+            The name of the field, for example dimensionless_UMag.
+        direction : float or str, optional
+            A direction to return, this must be one of the directions of
+            the store. If None, all directions are returned.
+
+            The default is None.
+        cluster : str, optional
+            A cluster whose points to return, if None all points are
+            returned.
+
+            The default is None.
+
+        Returns
+        -------
+        np.array
+            If a direction is given, a 1D array with a value per point.
+            Otherwise a 2D array, points x directions.
+
+        '''
+        if name not in self.fields:
+            raise Exception("Field {} is not in the store, it contains: {}".format(
+                name, list(self.fields.keys())))
+
+        field = np.load(self.path / self.fields[name], mmap_mode="r")
+
+        if direction is not None:
+            field = field[self.get_direction_position(direction)]
+            if cluster is not None:
+                field = field[self.get_cluster_index(cluster)]
+            return field
+
+        if cluster is not None:
+            field = field[:, self.get_cluster_index(cluster)]
+
+        return field.T
+
+    def get_dataframe(self, name, cluster=None):
+        '''
+        Take a field name, return it as a dataframe, columns as directions
+        '''
+        return pd.DataFrame(self.get_field(name, cluster=cluster),
+                            columns=self.directions)
+
+    def get_direction_position(self, direction):
+        directions = np.asarray(self.directions, dtype=float)
+        position = np.flatnonzero(directions == float(direction))
+
+        if len(position) == 0:
+            raise Exception("Direction {} is not in the store, it contains: {}".format(
+                direction, self.directions))
+
+        return position[0]
+
+
+def read_store(status):
+    '''
+    Take a simulation status, return its result store or None
+
+    Parameters
+    ----------
+    status : simulation_status object
+        The status of the downloaded results.
+
+    Returns
+    -------
+    ResultStore or None
+        The store, if the status has one and it exists on disk.
+
+    '''
+    if getattr(status, "store_path", None) is None:
+        return None
+
+    store = ResultStore(status.store_path)
+    if not store.exists():
+        return None
+
+    return store.read_manifest()
@@ -1,11 +1,30 @@
+import base64
+import hashlib
+import json
 import os
 import pathlib
+import posixpath
+import re
+import shutil
+import zipfile
 
+import numpy as np
 import pandas as pd
-import simscale_sdk as sim
-import vtk
 
 import simscale_eba.api_variables as api
+from simscale_eba.lazy_import import lazy_import
+
+sim = lazy_import("simscale_sdk")
+vtk = lazy_import("vtk")
+
+# Number of bytes read from the network, or disk, at a time
+DOWNLOAD_CHUNK_SIZE = 1024 ** 2
+
+#Mapping of user names, to .case file block names
+STL_EXPORTS = {'Geometry' : "group-all-volumes", 
+               'Tree' : "Tree",
+               'Floor' : 'noSlipBoxVolume-ZMIN',
+               'Pedestrian Level' : 'data - wind_comfort_surface'}
 
 
 def check_api(self):
@@ -297,80 +316,590 @@ def import_ladybug_grid(self, path, name):
     self.grid[name] = {}
     self.grid[name]['data'] = df    
 
-def case_to_csv(inputPath, output_file=pathlib.Path.cwd()):
-    """
-    Take Ensight Gold .case file, return .csv file
+def download_file(self, url, output_file, checksum=None, 
+                  chunk_size=DOWNLOAD_CHUNK_SIZE, retries=3):
+    '''
+    Take a result URL, stream it to a file, resuming if interrupted
+
+    The body is written to disk in chunks, so memory use does not grow 
+    with the size of the result. Data is first written to a .part file, 
+    if a download is interrupted the next attempt, or the next call, 
+    requests only the missing bytes with an HTTP range request. The 
+    .part file is only renamed to output_file once its size, and 
+    checksum if known, have been verified.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the result to download.
+    output_file : pathlib.Path
+        The path to write the result to.
+    checksum : str, optional
+        The expected MD5 hex digest of the file. If None, the 
+        Content-MD5 header is used if the server sends one. 
+        
+        The default is None.
+    chunk_size : int, optional
+        The number of bytes read from the network at a time. 
+        
+        The default is DOWNLOAD_CHUNK_SIZE, 1MB.
+    retries : int, optional
+        The number of times an interrupted download is resumed before 
+        giving up. 
+        
+        The default is 3.
+
+    Raises
+    ------
+    Exception
+        If the download fails after all retries, or if the downloaded
+        file does not match the expected size or checksum.
+
+    Returns
+    -------
+    output_file : pathlib.Path
+        The path to the downloaded file.
+
+    '''
+    output_file = pathlib.Path(output_file)
+    partial_file = output_file.with_name(output_file.name + ".part")
+    partial_info_file = output_file.with_name(output_file.name + ".part.json")
     
-    An ensight gold format is used for most result outputs from PWC and 
-    LBM solvers. It is an open source file format that can be opened 
-    by many 3rd part post processing applications. For programatic reading
-    of results however, we find VTK a good paser to get the results into
-    tabulated form.
+    source = url.split("?")[0]
+    partial_info = _read_partial_info(partial_info_file)
+    if partial_info.get("source") != source:
+        _remove_partial(partial_file, partial_info_file)
+        partial_info = {"source": source}
+
+    last_error = None
+    for attempt in range(retries + 1):
+        offset = partial_file.stat().st_size if partial_file.exists() else 0
+
+        headers = {self.api_key_header: self.api_key}
+        if offset > 0:
+            headers["Range"] = "bytes={}-".format(offset)
+            if partial_info.get("etag") is not None:
+                headers["If-Range"] = partial_info["etag"]
+
+        try:
+            response = self.api_client.rest_client.GET(
+                url=url,
+                headers=headers,
+                _preload_content=False
+            )
+        except Exception as e:
+            last_error = e
+            # Range not satisfiable, the partial file is not usable
+            if getattr(e, "status", None) == 416:
+                _remove_partial(partial_file, partial_info_file)
+                partial_info = {"source": source}
+            continue
+
+        # The server ignored the range, or the file changed, start again
+        if response.status != 206:
+            offset = 0
+
+        expected_size = _expected_size(response, offset)
+        partial_info["etag"] = response.headers.get("ETag")
+        # The Content-MD5 of a 206 covers only the range, keep the md5 of
+        # the whole file from the response that started the download
+        if checksum is None and response.status == 200:
+            partial_info["md5"] = _content_md5(response)
+        _write_partial_info(partial_info_file, partial_info)
+
+        try:
+            with partial_file.open("ab" if offset > 0 else "wb") as file:
+                for chunk in response.stream(chunk_size):
+                    file.write(chunk)
+        except Exception as e:
+            last_error = e
+            continue
+        finally:
+            response.release_conn()
+
+        size = partial_file.stat().st_size
+        if expected_size is not None and size < expected_size:
+            last_error = Exception("Download of {} stopped at {} of {} bytes".format(
+                output_file.name, size, expected_size))
+            continue
+        
+        break
+    else:
+        raise Exception("Download of {} failed after {} attempts".format(
+            output_file.name, retries + 1)) from last_error
+
+    size = partial_file.stat().st_size
+    if expected_size is not None and size != expected_size:
+        _remove_partial(partial_file, partial_info_file)
+        raise Exception("Download of {} has {} bytes, expected {}".format(
+            output_file.name, size, expected_size))
+
+    expected_md5 = checksum if checksum is not None else partial_info.get("md5")
+    if expected_md5 is not None:
+        md5 = file_md5(partial_file, chunk_size)
+        if md5 != expected_md5.lower():
+            _remove_partial(partial_file, partial_info_file)
+            raise Exception("Download of {} has checksum {}, expected {}".format(
+                output_file.name, md5, expected_md5))
+
+    partial_file.replace(output_file)
+    _remove_partial(partial_file, partial_info_file)
+
+    return output_file
+
+
+def file_md5(path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    '''
+    Take a path, return the MD5 hex digest of the file read in chunks
+    '''
+    md5 = hashlib.md5()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            md5.update(chunk)
+
+    return md5.hexdigest()
+
+
+def _expected_size(response, offset):
+    content_range = response.headers.get("Content-Range")
+    if content_range is not None and "/" in content_range:
+        total = content_range.split("/")[-1].strip()
+        if total.isdigit():
+            return int(total)
+
+    content_length = response.headers.get("Content-Length")
+    if content_length is not None and content_length.isdigit():
+        return offset + int(content_length)
+
+    return None
+
+
+def _content_md5(response):
+    content_md5 = response.headers.get("Content-MD5")
+    if content_md5 is None:
+        return None
+
+    try:
+        return base64.b64decode(content_md5).hex()
+    except ValueError:
+        return None
+
+
+def _read_partial_info(path):
+    try:
+        with open(path, "r") as read_file:
+            return json.load(read_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_partial_info(path, partial_info):
+    with open(path, "w") as outfile:
+        json.dump(partial_info, outfile)
+
+
+def _remove_partial(partial_file, partial_info_file):
+    for path in [partial_file, partial_info_file]:
+        if path.exists():
+            path.unlink()
+
+
+def extract_case(archive_path, output_directory, case_directory=None):
+    '''
+    Take a result archive, extract only the .case file and its data
+
+    The central directory of the archive is read to find the .case file,
+    the .case file is then read from the archive to find the geometry 
+    and variable files it references, only these are extracted, 
+    straight into the output directory. Anything else in the archive is
+    never written to disk.
 
     Parameters
     ----------
-    inputPath : pathlib.Path
-        A path to the .case file.
-    outputPath : pathlib.Path, optional
-        A path to the directory in which the .csv should be saved. 
+    archive_path : pathlib.Path
+        A path to the .zip archive of results.
+    output_directory : pathlib.Path
+        The directory to extract the .case file and its data into.
+    case_directory : str, optional
+        The folder inside the archive in which to look for the .case 
+        file first, for example "Directions/0.0/export". If None, or no 
+        .case file is in this folder, the first .case file is used.
         
-        The default is pathlib.Path.cwd(), the current working directory.
+        The default is None.
+
+    Raises
+    ------
+    Exception
+        If the archive contains no .case file.
 
     Returns
     -------
-    None.
+    case_file_path : pathlib.Path
+        The path to the extracted .case file.
 
-    """
+    '''
+    output_directory = pathlib.Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [member for member in archive.namelist()
+                   if not member.endswith("/")]
+
+        case_members = [member for member in members if member.endswith(".case")]
+        if len(case_members) == 0:
+            raise Exception("No .case file was found in {}".format(
+                pathlib.Path(archive_path).name))
+
+        case_member = case_members[0]
+        if case_directory is not None:
+            for member in case_members:
+                if posixpath.dirname(member) == case_directory.strip("/"):
+                    case_member = member
+                    break
+
+        case_folder = posixpath.dirname(case_member)
+        folder_members = {}
+        for member in members:
+            if case_folder == "" or member.startswith(case_folder + "/"):
+                relative = member[len(case_folder):].lstrip("/")
+                folder_members[relative] = member
+
+        case_text = archive.read(case_member).decode("utf-8", errors="replace")
+
+        extract = {posixpath.basename(case_member): case_member}
+        for reference in case_file_references(case_text):
+            pattern = re.compile(re.escape(reference).replace(r"\*", r"\d"))
+            matches = [relative for relative in folder_members
+                       if pattern.fullmatch(relative)]
+
+            # If we cannot resolve a file, take everything next to the case
+            if len(matches) == 0:
+                extract = folder_members
+                break
 
-    """Convert an ensight .case file to a CSV file."""
-    output_file = pathlib.Path(output_file)
-    outputPath = output_file.parent
+            for relative in matches:
+                extract[relative] = folder_members[relative]
 
-    inputPath = pathlib.Path(inputPath)
+        root = output_directory.resolve()
+        for relative, member in extract.items():
+            target = output_directory.joinpath(*relative.split("/"))
 
-    case = vtk.vtkEnSightGoldBinaryReader()
-    case.SetCaseFileName(inputPath.as_posix())
-    case.Update()
+            # A member named with .. or an absolute path would be written
+            # outside of the output directory, skip it as extractall would
+            try:
+                target.resolve().relative_to(root)
+            except ValueError:
+                print("Skipped {}, it is outside of the output directory".format(member))
+                continue
 
-    data = case.GetOutput()
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with archive.open(member) as source, target.open("wb") as destination:
+                shutil.copyfileobj(source, destination, DOWNLOAD_CHUNK_SIZE)
+
+    return output_directory / posixpath.basename(case_member)
+
+
+def case_file_references(case_text):
+    '''
+    Take the text of an EnSight Gold .case file, return referenced files
 
-    exported_blocks = []
+    Parameters
+    ----------
+    case_text : str
+        The contents of the .case file.
+
+    Returns
+    -------
+    references : list
+        The geometry and variable file names, relative to the .case file,
+        these may contain * wildcards for time step numbers.
+
+    '''
+    sections = ["FORMAT", "GEOMETRY", "VARIABLE", "TIME", "FILE",
+                "MATERIAL", "BLOCK_CONTINUATION", "SCRIPTS"]
+
+    references = []
+    section = None
+    for line in case_text.splitlines():
+        line = line.split("#")[0].strip()
+        if line == "":
+            continue
+
+        if line.upper() in sections:
+            section = line.upper()
+            continue
+
+        if ":" not in line:
+            continue
+
+        key, value = line.split(":", 1)
+        key = key.strip().lower()
+        tokens = [token.strip('"') for token in value.split()]
+        if len(tokens) == 0:
+            continue
+
+        if section == "GEOMETRY":
+            if "change_coords_only" in tokens:
+                tokens = tokens[:tokens.index("change_coords_only")]
+            references.append(tokens[-1])
+
+        elif section == "VARIABLE":
+            if key.startswith("constant per case") and not key.endswith("file"):
+                continue
+            elif key.startswith("complex"):
+                references.extend(tokens[-3:-1])
+            else:
+                references.append(tokens[-1])
+
+    return references
+
+
+def blocks_to_arrays(data, block_name_keyword="data - wind_comfort_surface"):
+    '''
+    Take a VTK multiblock data set, return its point data as numpy arrays
+
+    Every block whose name contains the keyword is read, the coordinates
+    and point data arrays are wrapped with vtk.util.numpy_support, so a
+    single block is returned without copying. Multiple blocks are 
+    concatenated in block order, a field missing from a block is filled 
+    with NaN.
+    
+    The keys are named as the VTK table writer names the columns, i.e.
+    multi-component arrays are split into "Name:0", "Name:1" etc, the 
+    coordinates are "Points:0", "Points:1" and "Points:2".
+    
+    Each point also keeps the surface it came from, "SurfaceName" is a 
+    categorical of the block name, whose codes number the surfaces in 
+    block order, and "SurfaceIndex" is the index of the point within its
+    block.
+
+    Parameters
+    ----------
+    data : vtkMultiBlockDataSet
+        The output of an EnSight reader.
+    block_name_keyword : str, optional
+        A string that is contained in the names of the blocks to read.
+        
+        The default is "data - wind_comfort_surface".
+
+    Raises
+    ------
+    Exception
+        If no block names contain the keyword.
+
+    Returns
+    -------
+    arrays : dict
+        A dictionary of 1D numpy arrays, one per column, the length of 
+        each is the total number of points. SurfaceName is a 
+        pd.Categorical.
+
+    '''
+    block_arrays = []
+    block_names = []
     number_of_blocks = data.GetNumberOfBlocks()
     for i in range(number_of_blocks):
         block_name = data.GetMetaData(i).Get(vtk.vtkCompositeDataSet.NAME())
-        if "data - wind_comfort_surface" in block_name:
-            pedestrian_path = data.GetBlock(i)
-            point = pedestrian_path.GetPoints()
+        if block_name_keyword in block_name:
+            block = data.GetBlock(i)
+            block_arrays.append(_block_to_arrays(block))
+            block_names.append(block_name)
 
-            table = vtk.vtkDataObjectToTable()
-            table.SetInputData(pedestrian_path)
-            table.Update()
-            table.GetOutput().AddColumn(point.GetData())
-            table.Update()
+    if len(block_arrays) == 0:
+        raise Exception('No Wind Comfort Surfaces were found, cannot proceed')
 
-            writer = vtk.vtkDelimitedTextWriter()
-            writer.SetInputConnection(table.GetOutputPort())
+    # Blocks can share a name, they share its code
+    surface_names = list(dict.fromkeys(block_names))
+
+    surface_codes = []
+    for block_name, arrays in zip(block_names, block_arrays):
+        code = surface_names.index(block_name)
+        no_points = len(arrays["Points:0"])
+        arrays["SurfaceIndex"] = np.arange(no_points, dtype=np.int64)
+        surface_codes.append(np.full(no_points, code, dtype=np.int32))
+
+    if len(block_arrays) == 1:
+        block_arrays[0]["SurfaceName"] = pd.Categorical.from_codes(
+            surface_codes[0], surface_names)
+        return block_arrays[0]
+
+    names = []
+    for arrays in block_arrays:
+        for name in arrays.keys():
+            if name not in names:
+                names.append(name)
+
+    concatenated = {}
+    for name in names:
+        columns = []
+        for arrays in block_arrays:
+            if name in arrays:
+                columns.append(arrays[name])
+            else:
+                no_points = len(arrays["Points:0"])
+                columns.append(np.full(no_points, np.nan))
+        concatenated[name] = np.concatenate(columns)
+
+    concatenated["SurfaceName"] = pd.Categorical.from_codes(
+        np.concatenate(surface_codes), surface_names)
+
+    return concatenated
+
+
+def _block_to_arrays(block):
+    '''
+    Take a single VTK data set, return a dictionary of numpy arrays
+    '''
+    arrays = {}
 
-            block_output_path = outputPath / "{}.csv".format(block_name)
+    point_data = block.GetPointData()
+    for i in range(point_data.GetNumberOfArrays()):
+        vtk_array = point_data.GetAbstractArray(i)
+        if not isinstance(vtk_array, vtk.vtkDataArray):
+            continue
+        _add_vtk_array(arrays, vtk_array.GetName(), vtk_array)
 
-            writer.SetFileName(block_output_path.as_posix())
-            writer.Update()
-            writer.Write()
+    _add_vtk_array(arrays, "Points", block.GetPoints().GetData())
 
-            exported_blocks.append(block_output_path)
+    return arrays
 
-    if len(exported_blocks) == 0:
-        raise Exception('No Wind Comfort Surfaces were found, cannot proceed')
 
-    dataframes = []
-    for path in exported_blocks:
-        df = pd.read_csv(path)
-        dataframes.append(df)
+def _add_vtk_array(arrays, name, vtk_array):
+    from vtk.util import numpy_support
+
+    values = numpy_support.vtk_to_numpy(vtk_array)
+    if values.ndim == 1:
+        arrays[name] = values
+    else:
+        for component in range(values.shape[1]):
+            arrays["{}:{}".format(name, component)] = values[:, component]
+
+
+def read_case(input_path):
+    '''
+    Take an Ensight Gold .case file, return the VTK multiblock data set
+
+    Parameters
+    ----------
+    input_path : pathlib.Path
+        A path to the .case file.
+
+    Returns
+    -------
+    vtkMultiBlockDataSet
+        The data read from the case file.
+
+    '''
+    input_path = pathlib.Path(input_path)
+
+    case = vtk.vtkEnSightGoldBinaryReader()
+    case.SetCaseFileName(input_path.as_posix())
+    case.Update()
+
+    return case.GetOutput()
+
+
+def case_to_dataframe(input_path):
+    '''
+    Take Ensight Gold .case file, return the wind comfort surfaces
+
+    The point coordinates and fields are taken directly from the VTK 
+    data, there is no intermediate text file. The columns match the 
+    columns of the .csv from case_to_csv.
+
+    Parameters
+    ----------
+    input_path : pathlib.Path
+        A path to the .case file.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a row per point, and a column per field 
+        component.
+
+    '''
+    data = read_case(input_path)
+
+    return pd.DataFrame(blocks_to_arrays(data), copy=False)
+
+
+def case_to_feather(input_path, output_file=pathlib.Path.cwd()):
+    '''
+    Take Ensight Gold .case file, return .feather file
+
+    Same as case_to_csv, but the table is stored in a binary columnar
+    format, so it can be read again without parsing text.
+
+    Parameters
+    ----------
+    input_path : pathlib.Path
+        A path to the .case file.
+    output_file : pathlib.Path, optional
+        The path of the .feather file to write.
+
+    Returns
+    -------
+    None.
+
+    '''
+    case_to_dataframe(input_path).to_feather(pathlib.Path(output_file))
+
+
+def read_direction_table(path):
+    '''
+    Take a path to a directional result table, return a dataframe
+
+    The directional tables were historically .csv, and are now .feather,
+    both are read so that existing result directories still work.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        A path to a .csv or .feather file written from a .case file.
+
+    Returns
+    -------
+    pd.DataFrame
+        A dataframe with a row per point, and a column per field 
+        component.
+
+    '''
+    path = pathlib.Path(path)
+
+    if path.suffix == ".feather":
+        return pd.read_feather(path)
+    else:
+        return pd.read_csv(path.as_posix())
+
+
+def case_to_csv(inputPath, output_file=pathlib.Path.cwd()):
+    """
+    Take Ensight Gold .case file, return .csv file
+    
+    An ensight gold format is used for most result outputs from PWC and 
+    LBM solvers. It is an open source file format that can be opened 
+    by many 3rd part post processing applications. For programatic reading
+    of results however, we find VTK a good paser to get the results into
+    tabulated form.
+
+    Parameters
+    ----------
+    inputPath : pathlib.Path
+        A path to the .case file.
+    outputPath : pathlib.Path, optional
+        A path to the directory in which the .csv should be saved. 
+        
+        The default is pathlib.Path.cwd(), the current working directory.
+
+    Returns
+    -------
+    None.
 
-    export_df = pd.concat(dataframes)
-    export_df = export_df.reset_index(drop=True)
+    """
+    export_df = case_to_dataframe(inputPath)
 
-    export_df.to_csv(output_file)
+    export_df.to_csv(pathlib.Path(output_file))
 
 def case_to_stl(input_path, output_path=pathlib.Path.cwd()):
     '''
@@ -394,55 +923,106 @@ def case_to_stl(input_path, output_path=pathlib.Path.cwd()):
 
     Returns
     -------
-    None.
+    stl_path_dict : dict
+        A dictionary with the export names as keys, and the path to the
+        STL file as values.
 
     '''
-    #Mapping of user names, to .case file block names
-    export_dict = {'Geometry' : "group-all-volumes", 
-                  'Tree' : "Tree",
-                  'Floor' : 'noSlipBoxVolume-ZMIN',
-                  'Pedestrian Level' : 'data - wind_comfort_surface'}
+    return blocks_to_stl(read_case(input_path), output_path)
+
+
+def blocks_to_stl(data, output_path=pathlib.Path.cwd()):
+    '''
+    Take a VTK multiblock data set, exports .STL files
     
-    output_path = pathlib.Path(output_path)
+    The same as case_to_stl, but from data that is already read, the 
+    blocks are visited once, and each is checked against every export.
 
-    input_path = pathlib.Path(input_path)
+    Parameters
+    ----------
+    data : vtkMultiBlockDataSet
+        The output of an EnSight reader.
+    output_path : str, optional
+        The path to export the STL files to. 
+        
+        The default is pathlib.Path.cwd().
 
-    case = vtk.vtkEnSightGoldBinaryReader()
-    case.SetCaseFileName(input_path.as_posix())
-    case.Update()
+    Returns
+    -------
+    stl_path_dict : dict
+        A dictionary with the export names as keys, and the path to the
+        STL file as values.
 
-    data = case.GetOutput()
-    
+    '''
+    output_path = pathlib.Path(output_path)
+
+    exported = set()
     number_of_blocks = data.GetNumberOfBlocks()
-    
-    def get_block(block_name_keyword, export_name, output_path):
-        filename = output_path / '{}.stl'.format(export_name)
-        for i in range(number_of_blocks):
-            block_name = data.GetMetaData(i).Get(vtk.vtkCompositeDataSet.NAME())
-            if block_name_keyword in block_name:
-                
-                unstruct_grid = data.GetBlock(i)
-                
-                #Example here: https://gist.github.com/thewtex/8263132
-                #Take the unstructured data, create a surface filter, provide
-                #the unstructured grid
-                surface_filter = vtk.vtkDataSetSurfaceFilter()
-                surface_filter.SetInputData(unstruct_grid)
-                
-                triangle_filter = vtk.vtkTriangleFilter()
-                triangle_filter.SetInputConnection(surface_filter.GetOutputPort())
-                
-                writer = vtk.vtkSTLWriter()
-                writer.SetFileName(filename.as_posix())
-                writer.SetInputConnection(triangle_filter.GetOutputPort())
-                writer.Write()
-                break
-            
-        return filename
-            
+    for i in range(number_of_blocks):
+        block_name = data.GetMetaData(i).Get(vtk.vtkCompositeDataSet.NAME())
+        for export_name, block_name_keyword in STL_EXPORTS.items():
+            if export_name in exported or block_name_keyword not in block_name:
+                continue
+
+            filename = output_path / '{}.stl'.format(export_name)
+
+            unstruct_grid = data.GetBlock(i)
+
+            #Example here: https://gist.github.com/thewtex/8263132
+            #Take the unstructured data, create a surface filter, provide
+            #the unstructured grid
+            surface_filter = vtk.vtkDataSetSurfaceFilter()
+            surface_filter.SetInputData(unstruct_grid)
+
+            triangle_filter = vtk.vtkTriangleFilter()
+            triangle_filter.SetInputConnection(surface_filter.GetOutputPort())
+
+            writer = vtk.vtkSTLWriter()
+            writer.SetFileName(filename.as_posix())
+            writer.SetInputConnection(triangle_filter.GetOutputPort())
+            writer.Write()
+
+            exported.add(export_name)
+
     stl_path_dict = {}
-    for key in export_dict:
-        path = get_block(export_dict[key], key, output_path)
-        stl_path_dict[key] = path.as_posix()
+    for export_name in STL_EXPORTS:
+        path = output_path / '{}.stl'.format(export_name)
+        stl_path_dict[export_name] = path.as_posix()
+
+    return stl_path_dict
+
+
+def convert_case(input_path, output_file, stl_output_path=None):
+    '''
+    Take a .case file, write its table and optionally its STL files
+
+    The .case file is read once, and the same data is used for the 
+    wind comfort table and the STL export.
+
+    Parameters
+    ----------
+    input_path : pathlib.Path
+        A path to the .case file.
+    output_file : pathlib.Path
+        The path of the .feather file to write.
+    stl_output_path : pathlib.Path, optional
+        The path to export the STL files to, if None, no STL files are 
+        exported. 
         
-    return stl_path_dict
\ No newline at end of file
+        The default is None.
+
+    Returns
+    -------
+    stl_path_dict : dict or None
+        The STL paths from blocks_to_stl, None if not exported.
+
+    '''
+    data = read_case(input_path)
+
+    pd.DataFrame(blocks_to_arrays(data), copy=False).to_feather(
+        pathlib.Path(output_file))
+
+    if stl_output_path is None:
+        return None
+
+    return blocks_to_stl(data, stl_output_path)
@@ -1,9 +1,7 @@
 import pathlib
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import scipy.signal
 
 
 class frequency_analysis:
@@ -87,6 +85,8 @@ class frequency_analysis:
         f: frequency range of the spectrum
         S2: Power
         """
+        import scipy.signal
+
         if method == "welch":
             f, S2 = scipy.signal.welch(
                 self.signal,
@@ -135,6 +135,8 @@ class frequency_analysis:
 
 
 def test_integral_lenght_scale(show_plot=False):
+    import matplotlib.pyplot as plt
+
     # Here we test the integral length scale computation
     # Expected results:
     expected_ILS = 0.006431769932128274
@@ -191,6 +193,8 @@ def test_compute_spectrums(show_plot=False):
     """
     Test spectrum computation for accuracy.
     """
+    import matplotlib.pyplot as plt
+
     rng = np.random.default_rng()
 
     # Generate a 2 Vrms sine wave signal at 1234 Hz
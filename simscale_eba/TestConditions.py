@@ -4,13 +4,13 @@ Created on Fri Jul  2 17:52:11 2021
 
 @author: DarrenLynch
 """
-import ladybug.epw as epw
 import numpy as np
 
 import pathlib
 import copy
 
 import simscale_eba.BoundaryLayer as abl
+import simscale_eba.EpwWind as ew
 
 
 class WindData():
@@ -91,7 +91,7 @@ class WindData():
         self._directions = self._atmospheric_boundary_layers.keys()
         return self._directions
 
-    def import_epw(self, epw_file):
+    def import_epw(self, epw_file, cache=True):
         '''
         Take a path to an EPW, store the wind direction and speed
 
@@ -99,16 +99,20 @@ class WindData():
         ----------
         epw_file : pathlib.Path
             A path to the epw to read.
+        cache : bool, optional
+            Read and write the cache of the EPW, see 
+            EpwWind.read_epw_wind. The default is True.
 
         Returns
         -------
-        epw_data : EPW object
-            The EPW object from ladybug tools.
+        epw_data : EpwWind
+            The header, datetimes, wind direction and speed of the EPW.
 
         '''
-        epw_data = epw.EPW(epw_file)
+        epw_data = ew.read_epw_wind(epw_file, cache=cache)
         self._hourly_wind_speed = epw_data.wind_speed
         self._hourly_direction = epw_data.wind_direction
+        self._hourly_timestamp = epw_data.datetimes
         return epw_data
     
     def create_roi_for_dwt(self,
@@ -0,0 +1,286 @@
+import glob
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import simscale_eba.HourlyContinuous as hc
+
+# The HourlyContinuous import method of each weather file suffix
+IMPORTERS = {
+    "epw": "import_epw",
+    "excel": "import_hourly_wind_data_from_excel",
+    "city_of_london": "import_city_of_london_historic",
+}
+
+SUFFIX_IMPORTERS = {
+    ".epw": "epw",
+    ".xlsx": "excel",
+    ".xls": "excel",
+}
+
+
+def find_weather_files(inputs):
+    '''
+    Take files, directories or glob patterns, return the weather files
+
+    Parameters
+    ----------
+    inputs : str, pathlib.Path or list
+        Weather files, directories, whose weather files are all taken,
+        or glob patterns, e.g. "stations/**/*.epw".
+
+    Returns
+    -------
+    files : list
+        The unique weather files, as pathlib.Path, sorted.
+
+    '''
+    if isinstance(inputs, (str, pathlib.PurePath)):
+        inputs = [inputs]
+
+    files = set()
+    for item in inputs:
+        path = pathlib.Path(item)
+        if path.is_dir():
+            files.update(child for child in path.iterdir()
+                         if child.suffix.lower() in SUFFIX_IMPORTERS)
+        elif path.is_file():
+            files.add(path)
+        else:
+            files.update(pathlib.Path(match)
+                         for match in glob.glob(str(item), recursive=True)
+                         if os.path.isfile(match))
+
+    return sorted(files)
+
+
+def station_names(files):
+    '''
+    Take weather files, return a unique name for each
+
+    The name is the file name without suffix, unless another file has 
+    the same name, then it is the path from the folder the files with 
+    that name share, joined by underscores, e.g. london/st.epw and 
+    paris/st.epw are london_st and paris_st.
+
+    Parameters
+    ----------
+    files : list
+        The weather files, as pathlib.Path.
+
+    Returns
+    -------
+    names : dict
+        The name of each file, used in its .stat file names.
+
+    '''
+    stems = {}
+    for path in files:
+        stems.setdefault(path.stem, []).append(path)
+
+    names = {}
+    for stem, paths in stems.items():
+        if len(paths) == 1:
+            names[paths[0]] = stem
+            continue
+
+        root = pathlib.Path(os.path.commonpath([path.resolve().parent for path in paths]))
+        for path in paths:
+            relative = path.resolve().relative_to(root).with_suffix("")
+            names[path] = "_".join(relative.parts)
+
+    if len(set(names.values())) != len(names):
+        raise Exception("The weather files do not have unique names, {}".format(
+            sorted(names.values())))
+
+    return names
+
+
+def weather_period(name, start, end):
+    '''
+    Take a name, start and end, return a WeatherPeriod
+
+    Parameters
+    ----------
+    name : str
+        The name of the period, used in the .stat file name.
+    start : tuple
+        (month, day, hour) of the first hour of the period.
+    end : tuple
+        (month, day, hour) of the last hour of the period.
+
+    Returns
+    -------
+    period : WeatherPeriod
+
+    '''
+    start_month, start_day, start_hour = start
+    end_month, end_day, end_hour = end
+
+    period = hc.WeatherPeriod()
+    period.set_name(name)
+    period.set_start_datetime(start_hour, start_day, start_month)
+    period.set_end_datetime(end_hour, end_day, end_month)
+
+    return period
+
+
+def _process_file(path, station, periods, directions, speeds, output_directory,
+                  importer):
+    '''
+    Take a weather file and its unique name, write a .stat file per period
+
+    The work of one process of process_weather_files, it is a module
+    function so that it can be sent to the process pool.
+
+    Returns
+    -------
+    rows : list
+        A dictionary per period and direction, of the Weibull parameters.
+
+    '''
+    path = pathlib.Path(path)
+    if importer is None:
+        importer = SUFFIX_IMPORTERS.get(path.suffix.lower())
+        if importer is None:
+            raise Exception("Unknown weather file type {}, use one of {}, or give an "
+                            "importer".format(path.suffix, list(SUFFIX_IMPORTERS)))
+
+    weather = hc.HourlyContinuous()
+    getattr(weather, IMPORTERS[importer])(path)
+
+    if periods is None:
+        weather.period_name = "annual"
+        split = {"annual": weather}
+    else:
+        split = weather.split_periods(periods)
+
+    rows = []
+    for name, hourly_continuous in split.items():
+        statistics = hc.WeatherStatistics()
+        statistics.set_directions(directions)
+        statistics.set_speeds(speeds)
+        statistics.set_hourly_continuous(hourly_continuous)
+
+        file = pathlib.Path(output_directory) / "{}_{}.stat".format(station, name)
+        if not statistics.to_stat(file):
+            raise Exception("Could not write {}".format(file))
+
+        parameters = statistics.weibull_parameters
+        for direction in parameters.columns:
+            rows.append({"station": path.resolve().as_posix(),
+                         "name": station,
+                         "period": name,
+                         "direction": direction,
+                         "shape": parameters.loc["shape", direction],
+                         "scale": parameters.loc["scale", direction],
+                         "probability": parameters.loc["probability", direction]})
+
+    return rows
+
+
+def process_weather_files(inputs,
+                          periods=None,
+                          directions=np.arange(0, 360, 10),
+                          speeds=np.arange(0.5, 16, 1),
+                          output_directory=None,
+                          workers=None,
+                          importer=None):
+    '''
+    Take many weather files, write a .stat file per file and period
+
+    Each file is imported, split into its periods and fitted with
+    WeatherStatistics, the same as doing so one file at a time, with the
+    files shared between a pool of processes. A file that fails is
+    reported and skipped, it does not stop the others.
+
+    Parameters
+    ----------
+    inputs : str, pathlib.Path or list
+        Weather files, directories or glob patterns, see
+        find_weather_files.
+    periods : list, optional
+        A list of WeatherPeriod objects, each with a unique name. If
+        None, the whole year, named annual.
+    directions : np.array, optional
+        The direction bins. The default is every 10 degrees.
+    speeds : np.array, optional
+        The speed bins, without 0. The default is 0.5m/s to 15.5m/s in
+        1m/s increments.
+    output_directory : pathlib.Path, optional
+        Where to write the results, created if it does not exist. The
+        default is the current working directory.
+    workers : int, optional
+        The number of processes, if None, the number of CPUs.
+    importer : str, optional
+        One of epw, excel or city_of_london, the import method of every
+        file. If None, by the file suffix, .epw or .xlsx/.xls.
+
+    Raises
+    ------
+    Exception
+        If no weather files are found.
+
+    Returns
+    -------
+    parameters : pd.DataFrame
+        The Weibull parameters of every file, period and direction, also
+        written to weibull_parameters.csv in the output directory. The
+        station is the full path of the file, and the name is the unique
+        name of its .stat files, see station_names.
+    failures : dict
+        The error of each file that failed, keyed by file.
+
+    '''
+    files = find_weather_files(inputs)
+    if not files:
+        raise Exception("No weather files were found in {}".format(inputs))
+
+    if importer is not None and importer not in IMPORTERS:
+        raise Exception("Importer should be one of {}".format(list(IMPORTERS)))
+
+    if output_directory is None:
+        output_directory = pathlib.Path.cwd()
+    output_directory = pathlib.Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+
+    names = station_names(files)
+
+    # The failures of an earlier run are not this run's
+    failures_file = output_directory / "failures.csv"
+    if failures_file.exists():
+        failures_file.unlink()
+
+    rows = {}
+    failures = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_process_file, path, names[path], periods, directions,
+                                   speeds, output_directory, importer): path
+                   for path in files}
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                rows[path] = future.result()
+                print("Processed {}".format(path.name))
+            except Exception as error:
+                failures[path] = "{}: {}".format(type(error).__name__, error)
+                print("Failed to process {}, {}".format(path.name, failures[path]))
+
+    # In file order, however the processes finished
+    parameters = pd.DataFrame(
+        [row for path in files if path in rows for row in rows[path]],
+        columns=["station", "name", "period", "direction", "shape", "scale", "probability"])
+    parameters.to_csv(output_directory / "weibull_parameters.csv", index=False)
+
+    if failures:
+        pd.DataFrame({"file": [path.as_posix() for path in failures],
+                      "error": list(failures.values())}
+                     ).to_csv(failures_file, index=False)
+
+    print("Processed {} of {} weather files".format(len(rows), len(files)))
+
+    return parameters, failures
@@ -3,7 +3,9 @@ import pathlib
 
 import yaml
 
-import simscale_sdk as sim
+from simscale_eba.lazy_import import lazy_import
+
+sim = lazy_import("simscale_sdk")
 
 class SimscaleCredentials():
 
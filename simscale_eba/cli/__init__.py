@@ -1,21 +1,44 @@
+import importlib
+
 import click
 
-from .read_direction import return_list
-from .cast_ordinate import cast
-from .set_env_variables import set_variables
-from .download_pwc_results import download_pwc_results
-from .cast_data import cast_speed, cast_ordinate
-from .create_speed_matrix import create_speed_matrix
+# The module and function of each command, a command's module is only
+# imported when the command is run, or its help is shown. cast_ordinate.cast
+# shares its name with cast_data.cast_ordinate, which has always replaced it.
+COMMANDS = {
+    "get-direction": ("read_direction", "return_list"),
+    "set-api-variables": ("set_env_variables", "set_variables"),
+    "download-pwc-results": ("download_pwc_results", "download_pwc_results"),
+    "cast-speed": ("cast_data", "cast_speed"),
+    "cast-ordinate": ("cast_data", "cast_ordinate"),
+    "create-speed-matrix": ("create_speed_matrix", "create_speed_matrix"),
+    "serve": ("serve", "serve"),
+    "query": ("query", "query"),
+    "process-weather": ("process_weather", "process_weather"),
+}
 
-@click.group()
-def main():
-    pass
 
+class LazyGroup(click.Group):
+    '''
+    A click group that imports the module of a command only when needed
+    '''
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
 
-main.add_command(return_list)
-main.add_command(cast)
-main.add_command(set_variables)
-main.add_command(download_pwc_results)
-main.add_command(cast_speed)
-main.add_command(cast_ordinate)
-main.add_command(create_speed_matrix)
\ No newline at end of file
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands:
+            module_name, function_name = self.lazy_commands[cmd_name]
+            module = importlib.import_module("." + module_name, __name__)
+            return getattr(module, function_name)
+
+        return super().get_command(ctx, cmd_name)
+
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
+def main():
+    pass
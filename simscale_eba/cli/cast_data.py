@@ -1,10 +1,13 @@
 import pathlib
 
 import click
+import numpy as np
 import pandas as pd
 
 import simscale_eba.PedestrianWindComfort as pwc
+import simscale_eba.ResultStore as rs
 import simscale_eba.pwc_status as stat
+from .output_format import output_options, echo_arrays
 
 
 @click.command("cast-speed")
@@ -20,7 +23,9 @@ import simscale_eba.pwc_status as stat
     'reference_speed',
     type=float
 )
-def cast_speed(path: str, direction: str, reference_speed: str):
+@output_options
+def cast_speed(path: str, direction: str, reference_speed: str,
+               output_format: str, output: str):
     path = pathlib.Path(path)
 
     pwc_status = stat.simulation_status()
@@ -31,17 +36,32 @@ def cast_speed(path: str, direction: str, reference_speed: str):
 
     speeds = []
 
-    for key in field_paths.keys():
-        field_path = pathlib.Path(field_paths[key])
+    store = rs.read_store(pwc_status)
+    if store is not None and store.clusters is not None:
+        directions = np.sort(np.asarray(store.directions, dtype=float))
+        rounded_direction = directions[pwc.round_direction_index(directions, direction)]
 
-        rounded_direction = pwc.round_direction(field_path, direction)
+        for key in field_paths.keys():
+            field = store.get_field("dimensionless_UMag",
+                                    direction=rounded_direction,
+                                    cluster=key)
+            speeds.append(field * reference_speed)
 
-        field = pd.read_feather(field_path)[str(rounded_direction)]
-        speed = (field * reference_speed).values.T.tolist()
+    else:
+        for key in field_paths.keys():
+            field_path = pathlib.Path(field_paths[key])
 
-        speeds.append(speed)
+            rounded_direction = pwc.round_direction(field_path, direction)
 
-    click.echo(speeds)
+            field = pd.read_feather(field_path)[str(rounded_direction)]
+            speeds.append(field.to_numpy() * reference_speed)
+
+    if output_format == "list":
+        click.echo([speed.tolist() for speed in speeds])
+    else:
+        if output is None:
+            output = path / "cast_speed"
+        echo_arrays(speeds, output, output_format, keys=list(field_paths.keys()))
 
 
 @click.command("cast-ordinate")
@@ -53,7 +73,8 @@ def cast_speed(path: str, direction: str, reference_speed: str):
     'ordinate',
     type=str
 )
-def cast_ordinate(path: str, ordinate: str):
+@output_options
+def cast_ordinate(path: str, ordinate: str, output_format: str, output: str):
     path = pathlib.Path(path)
 
     pwc_status = stat.simulation_status()
@@ -64,17 +85,29 @@ def cast_ordinate(path: str, ordinate: str):
 
     ordinate_list = []
 
-    for key in points_paths.keys():
-        points_path = pathlib.Path(points_paths[key])
+    store = rs.read_store(pwc_status)
+    if store is not None and store.clusters is not None:
+        column = ["X", "Y", "Z"].index(ordinate)
+
+        for key in points_paths.keys():
+            points = store.get_points(cluster=key)
+            ordinate_list.append(np.array(points[:, column]))
 
-        points = pd.read_feather(points_path)
-        points = points.set_index("index", drop=True)
+    else:
+        for key in points_paths.keys():
+            points_path = pathlib.Path(points_paths[key])
 
-        ordinates = points[ordinate].values.T.tolist()
+            points = pd.read_feather(points_path)
+            points = points.set_index("index", drop=True)
 
-        ordinate_list.append(ordinates)
+            ordinate_list.append(points[ordinate].to_numpy())
 
-    click.echo(ordinate_list)
+    if output_format == "list":
+        click.echo([ordinates.tolist() for ordinates in ordinate_list])
+    else:
+        if output is None:
+            output = path / "cast_ordinate_{}".format(ordinate)
+        echo_arrays(ordinate_list, output, output_format, keys=list(points_paths.keys()))
 
 
 '''
@@ -1,3 +1,5 @@
+import json
+
 import click
 
 import numpy as np
@@ -8,14 +10,17 @@ import csv
 
 import simscale_eba.HourlyContinuous as hc
 import simscale_eba.PedestrianWindComfort as pwc
+import simscale_eba.ResultStore as rs
 import simscale_eba.pwc_status as stat
+from .output_format import output_options, write_array_chunks
 
 @click.command("create-speed-matrix")
 @click.argument(
     'path',
     type=str
 )
-def create_speed_matrix(path: str):
+@output_options
+def create_speed_matrix(path: str, output_format: str, output: str):
     
     def read_data(path):
         with open(path) as speeds:
@@ -29,8 +34,8 @@ def create_speed_matrix(path: str):
         return data
     path = pathlib.Path(path)
     
-    speeds = read_data(path.as_posix() + r'\speeds.csv')
-    directions = read_data(path.as_posix() + r'\directions.csv')
+    speeds = read_data(path / "speeds.csv")
+    directions = read_data(path / "directions.csv")
     
     array = np.array([speeds, directions]).astype(float)
     
@@ -55,6 +60,45 @@ def create_speed_matrix(path: str):
     sim.status = pwc_status
     sim.result_directory = path
     
-    names = sim._create_hourly_continuous_windspeed(output_file='csv')
-    
-    click.echo(names)
\ No newline at end of file
+    if output_format == "list":
+        names = sim._create_hourly_continuous_windspeed(output_file='csv')
+        
+        click.echo(names)
+    else:
+        # Written a chunk of points at a time, the matrix is never in memory
+        if output is None:
+            output = path / "speed_matrix"
+        output = pathlib.Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        
+        # The hours of _original_df, as _create_hourly_continuous_windspeed
+        directions = epw._original_df['direction'].to_numpy(dtype=float)
+        speeds = epw._original_df['speed'].to_numpy(dtype=float)
+        
+        store = rs.read_store(pwc_status)
+        keys = list(pwc_status.field_paths["dimensionless_UMag"].keys())
+        
+        written = []
+        for key in keys:
+            field = sim._read_dimensionless_field(key, store)
+            shape = (field.shape[0], len(directions))
+            
+            matrix_path = output
+            if len(keys) > 1:
+                matrix_path = output.with_name("{}_{}".format(output.name, key))
+            
+            if output_format == "npy":
+                matrix_path = pwc.write_hourly_speed_matrix(
+                    field, directions, speeds, matrix_path,
+                    output_file='npy', dtype=np.float32)
+                written.append({"path": matrix_path.as_posix(), "shape": list(shape)})
+            else:
+                file_type = 'feather' if output_format == "arrow" else 'npy'
+                chunk_size = pwc.get_hourly_chunk_size(len(directions), np.float32,
+                                                       output_file=file_type)
+                chunks = pwc.hourly_speed_matrix_chunks(field, directions, speeds,
+                                                        chunk_size, dtype=np.float32)
+                written.append(write_array_chunks(chunks, shape, matrix_path,
+                                                  output_format))
+        
+        click.echo(json.dumps(written))
@@ -24,13 +24,21 @@ import simscale_eba.PedestrianWindComfort as pwc
     'path',
     type=str
 )
-def download_pwc_results(project: str, simulation: str, run: str, resolution: float, path: str):
+@click.option(
+    '--workers',
+    type=int,
+    default=None,
+    help='Number of directions to download and convert at the same time.'
+)
+def download_pwc_results(project: str, simulation: str, run: str, resolution: float, path: str,
+                         workers: int):
     sim = pwc.pedestrian_wind_comfort_results()
 
     sim.set_resolution(resolution)
-    sim.get_pedestrian_wind_comfort(project, simulation, run, path=path)
+    sim.get_pedestrian_wind_comfort(project, simulation, run, path=path,
+                                    max_workers=workers)
 
-    sim._create_dimensional_quantities()
-    sim._create_dimensionless_quantities()
+    sim._create_quantities(dimensional_variables=['UMag', 'GEM'],
+                           dimensionless_variables=['UMag', 'GEM'])
 
     sim.cluster_outputs()
@@ -0,0 +1,183 @@
+import json
+import pathlib
+
+import click
+import numpy as np
+
+OUTPUT_FORMATS = ["list", "raw", "npy", "arrow"]
+
+_SUFFIXES = {
+    "raw": ".f32",
+    "npy": ".npy",
+    "arrow": ".arrow",
+}
+
+
+def output_options(command):
+    '''
+    Take a click command, add the --output-format and --output options
+    '''
+    command = click.option(
+        '--output',
+        type=str,
+        default=None,
+        help='The file to write to, without suffix, a suffix per cluster '
+             'is added where there is more than one array. The default is '
+             'next to the results.'
+    )(command)
+
+    command = click.option(
+        '--output-format',
+        type=click.Choice(OUTPUT_FORMATS),
+        default="list",
+        help='list prints the values as a Python list. raw writes '
+             'little-endian float32 with a .json header of the shape, npy '
+             'writes a .npy file and arrow an Arrow IPC file. The binary '
+             'formats print only the path and shape of each file.'
+    )(command)
+
+    return command
+
+
+def write_array(array, path, output_format):
+    '''
+    Take an array, write it as float32 in the output format
+
+    Parameters
+    ----------
+    array : np.array
+        A 1D or 2D array.
+    path : pathlib.Path
+        The path to write to, without suffix, the suffix of the format is
+        added.
+    output_format : str
+        One of raw, npy or arrow.
+
+    Returns
+    -------
+    dict
+        The path written and the shape of the array.
+
+    '''
+    array = np.ascontiguousarray(array, dtype="<f4")
+    path = pathlib.Path(path)
+    path = path.with_name(path.name + _SUFFIXES[output_format])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if output_format == "raw":
+        array.tofile(path)
+
+        header = {"dtype": "<f4", "shape": list(array.shape), "order": "C"}
+        with open(path.with_name(path.name + ".json"), "w") as outfile:
+            outfile.write(json.dumps(header))
+
+    elif output_format == "npy":
+        np.save(path, array)
+
+    elif output_format == "arrow":
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        columns = array.reshape(array.shape[0], -1)
+        table = pa.table({str(i): columns[:, i] for i in range(columns.shape[1])})
+        feather.write_feather(table, path, compression="uncompressed")
+
+    else:
+        raise Exception("Output format should be one of {}".format(OUTPUT_FORMATS))
+
+    return {"path": path.as_posix(), "shape": list(array.shape)}
+
+
+def echo_arrays(arrays, output, output_format, keys=None):
+    '''
+    Take arrays, write each to a file and print their paths and shapes
+
+    Parameters
+    ----------
+    arrays : list
+        A list of arrays, e.g. one per cluster.
+    output : pathlib.Path
+        The path to write to, without suffix.
+    output_format : str
+        One of raw, npy or arrow.
+    keys : list, optional
+        A name for each array, added to the file name when there is more
+        than one array. The default is the position in the list.
+
+    Returns
+    -------
+    None.
+
+    '''
+    output = pathlib.Path(output)
+    if keys is None:
+        keys = list(range(len(arrays)))
+
+    written = []
+    for key, array in zip(keys, arrays):
+        if len(arrays) == 1:
+            path = output
+        else:
+            path = output.with_name("{}_{}".format(output.name, key))
+
+        written.append(write_array(array, path, output_format))
+
+    click.echo(json.dumps(written))
+
+
+def write_array_chunks(chunks, shape, path, output_format):
+    '''
+    Take chunks of rows of an array, write them as float32 in a format
+
+    Only one chunk is held at a time, so the array can be larger than
+    memory, e.g. an hourly speed matrix.
+
+    Parameters
+    ----------
+    chunks : iterable
+        (start, rows) pairs, the position of the first row of each chunk
+        and a 2D array of its rows, in order.
+    shape : tuple
+        The shape of the whole array.
+    path : pathlib.Path
+        The path to write to, without suffix, the suffix of the format is
+        added.
+    output_format : str
+        raw or arrow, a .npy is written through a memory map by
+        PedestrianWindComfort.write_hourly_speed_matrix.
+
+    Returns
+    -------
+    dict
+        The path written and the shape of the array.
+
+    '''
+    path = pathlib.Path(path)
+    path = path.with_name(path.name + _SUFFIXES[output_format])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if output_format == "raw":
+        with open(path, "wb") as outfile:
+            for start, rows in chunks:
+                np.ascontiguousarray(rows, dtype="<f4").tofile(outfile)
+
+        header = {"dtype": "<f4", "shape": list(shape), "order": "C"}
+        with open(path.with_name(path.name + ".json"), "w") as outfile:
+            outfile.write(json.dumps(header))
+
+    elif output_format == "arrow":
+        import pyarrow as pa
+
+        schema = pa.schema([pa.field(str(i), pa.float32()) for i in range(shape[1])])
+        with pa.OSFile(path.as_posix(), "wb") as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                for start, rows in chunks:
+                    # Columns of a Fortran ordered array are contiguous
+                    rows = np.asfortranarray(rows, dtype="<f4")
+                    writer.write_batch(pa.RecordBatch.from_arrays(
+                        [pa.array(rows[:, i]) for i in range(shape[1])], schema=schema))
+
+    else:
+        raise Exception("Output format should be raw or arrow")
+
+    return {"path": path.as_posix(), "shape": list(shape)}
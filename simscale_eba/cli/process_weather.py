@@ -0,0 +1,105 @@
+import click
+import numpy as np
+
+import simscale_eba.WeatherBatch as wb
+
+
+def read_month_day_hour(text):
+    '''
+    Take a date as MM-DD or MM-DDTHH, return (month, day, hour)
+
+    Raises
+    ------
+    click.BadParameter
+        If the date is not MM-DD or MM-DDTHH.
+
+    '''
+    date, _, hour = text.partition("T")
+    try:
+        month, day = date.split("-")
+        return int(month), int(day), int(hour) if hour else None
+    except ValueError:
+        raise click.BadParameter("{} should be MM-DD or MM-DDTHH, e.g. "
+                                 "07-01T07".format(text), param_hint="--period")
+
+
+@click.command("process-weather")
+@click.argument(
+    'inputs',
+    type=str,
+    nargs=-1,
+    required=True
+)
+@click.option(
+    '--period',
+    type=(str, str, str),
+    multiple=True,
+    help='A period as NAME START END, with START and END as MM-DD or '
+         'MM-DDTHH, e.g. summer 07-01T07 09-30T18, can be given more than '
+         'once. The default is the whole year.'
+)
+@click.option(
+    '--directions',
+    type=int,
+    default=36,
+    help='The number of direction bins.'
+)
+@click.option(
+    '--speed-bins',
+    type=(float, float, float),
+    default=(0.5, 16, 1),
+    help='The speed bins as START STOP STEP in m/s.'
+)
+@click.option(
+    '--output',
+    type=str,
+    default=None,
+    help='The directory to write the .stat files and '
+         'weibull_parameters.csv to. The default is the current directory.'
+)
+@click.option(
+    '--workers',
+    type=int,
+    default=None,
+    help='Number of weather files to process at the same time.'
+)
+@click.option(
+    '--importer',
+    type=click.Choice(list(wb.IMPORTERS)),
+    default=None,
+    help='How to read every file, the default is by file suffix.'
+)
+def process_weather(inputs: tuple, period: tuple, directions: int, speed_bins: tuple,
+                    output: str, workers: int, importer: str):
+    '''
+    Write .stat files and Weibull parameters for many weather files
+
+    INPUTS are weather files, directories or glob patterns.
+    '''
+    periods = None
+    if period:
+        periods = []
+        for name, start, end in period:
+            start = read_month_day_hour(start)
+            end = read_month_day_hour(end)
+            # Without hours the period covers the whole of each day
+            start = start[:2] + (0 if start[2] is None else start[2],)
+            end = end[:2] + (23 if end[2] is None else end[2],)
+
+            try:
+                periods.append(wb.weather_period(name, start, end))
+            except ValueError as error:
+                raise click.BadParameter("{}, {}".format(name, error),
+                                         param_hint="--period")
+
+    _, failures = wb.process_weather_files(
+        list(inputs),
+        periods=periods,
+        directions=np.arange(0, 360, 360 / directions),
+        speeds=np.arange(*speed_bins),
+        output_directory=output,
+        workers=workers,
+        importer=importer)
+
+    if failures:
+        raise click.ClickException("{} weather files failed".format(len(failures)))
@@ -0,0 +1,144 @@
+import json
+import pathlib
+import sys
+
+import click
+import numpy as np
+
+import simscale_eba.ResultServer as server
+
+QUERY_FORMATS = ["raw", "npz", "json"]
+
+
+def read_requests(text):
+    '''
+    Take a JSON or NDJSON batch, return the list of requests
+
+    The batch is either a JSON list of requests, a JSON object with a
+    "requests" list, or one JSON request per line.
+    '''
+    try:
+        batch = json.loads(text)
+    except json.JSONDecodeError:
+        batch = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    if isinstance(batch, dict):
+        batch = batch.get("requests", [batch])
+
+    return batch
+
+
+def write_answers(answers, output, output_format):
+    '''
+    Take query answers, write them to a single file
+
+    Parameters
+    ----------
+    answers : list
+        The answers of LoadedResult.query.
+    output : pathlib.Path
+        The path to write to, without suffix.
+    output_format : str
+        raw, all values as one little-endian float32 file, with a .json
+        header of the offset and shape of each answer, or npz, a .npz
+        file with an array per answer named "<request>_<cluster>".
+
+    Returns
+    -------
+    dict
+        The path written, and the request, cluster and shape of each
+        answer.
+
+    '''
+    output = pathlib.Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for answer in answers:
+        results.append({"request": answer["request"],
+                        "cluster": answer["cluster"],
+                        "shape": list(answer["values"].shape)})
+
+    if output_format == "raw":
+        path = output.with_name(output.name + ".f32")
+
+        offset = 0
+        with open(path, "wb") as outfile:
+            for answer, result in zip(answers, results):
+                values = np.ascontiguousarray(answer["values"], dtype="<f4")
+                values.tofile(outfile)
+
+                result["offset"] = offset
+                offset += values.size
+
+        header = {"dtype": "<f4", "order": "C", "results": results}
+        with open(path.with_name(path.name + ".json"), "w") as outfile:
+            outfile.write(json.dumps(header))
+
+    elif output_format == "npz":
+        path = output.with_name(output.name + ".npz")
+
+        arrays = {}
+        for answer in answers:
+            name = "{}_{}".format(answer["request"], answer["cluster"])
+            arrays[name] = np.asarray(answer["values"], dtype="<f4")
+
+        np.savez(path, **arrays)
+
+    else:
+        raise Exception("Output format should be one of {}".format(QUERY_FORMATS))
+
+    return {"path": path.as_posix(), "results": results}
+
+
+@click.command("query")
+@click.argument(
+    'path',
+    type=str
+)
+@click.argument(
+    'requests',
+    type=str,
+    default="-"
+)
+@click.option(
+    '--output-format',
+    type=click.Choice(QUERY_FORMATS),
+    default="raw",
+    help='raw writes one little-endian float32 file with a .json header '
+         'of the offset and shape of each answer, npz writes one .npz '
+         'file, json prints the answers.'
+)
+@click.option(
+    '--output',
+    type=str,
+    default=None,
+    help='The file to write to, without suffix. The default is query in '
+         'the result directory.'
+)
+def query(path: str, requests: str, output_format: str, output: str):
+    '''
+    Answer a batch of requests on a result directory in one go
+
+    REQUESTS is a JSON or NDJSON file of requests, or - to read them
+    from stdin. A request has a type of ordinate, speed or field, see
+    ResultServer.LoadedResult.query.
+    '''
+    path = pathlib.Path(path)
+
+    if requests == "-":
+        text = sys.stdin.read()
+    else:
+        text = pathlib.Path(requests).read_text()
+
+    result = server.LoadedResult(path)
+    answers = result.query(read_requests(text))
+
+    if output_format == "json":
+        for answer in answers:
+            answer["values"] = answer["values"].tolist()
+        click.echo(json.dumps(answers))
+    else:
+        if output is None:
+            output = path / "query"
+        click.echo(json.dumps(write_answers(answers, output, output_format)))
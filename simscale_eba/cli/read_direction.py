@@ -4,6 +4,9 @@ import click
 import numpy as np
 import pandas as pd
 
+import simscale_eba.post_processing.PointCloud as pc
+from .output_format import output_options, echo_arrays
+
 '''
 path = pathlib.Path("E:\Current Cases\City of LondonThermal Comfort\Results\localSpeedFactor.csv")
 direction = 353.2
@@ -82,56 +85,14 @@ def reduce_resolution(points, resolution):
 
     Returns
     -------
-    grid_candidate_center_id : list
+    grid_candidate_center_id : np.array
         The ID's of the points in the original points list to KEEP, 
         i.e. if we reduce the resolution from 0.5m to 5m, which points 
         closest represent an evenly spaced grid with spaces of 5m, the 
         resulting grid will not be structured.
 
     '''
-    points = points.to_numpy()
-
-    voxel_size = resolution
-
-    non_empty_voxel_keys, inverse, nb_pts_per_voxel = np.unique(
-        ((points - np.min(points, axis=0)) // voxel_size).astype(int),
-        axis=0,
-        return_inverse=True,
-        return_counts=True)
-
-    idx_pts_vox_sorted = np.argsort(inverse)
-
-    voxel_grid = {}
-    ids_grid = {}
-
-    grid_barycenter = []
-    grid_candidate_center = []
-    grid_candidate_center_id = []
-    last_seen = 0
-
-    for idx, vox in enumerate(non_empty_voxel_keys):
-        voxel_grid[tuple(vox)] = points[
-            idx_pts_vox_sorted[last_seen:last_seen + nb_pts_per_voxel[idx]]]
-
-        ids_grid[tuple(vox)] = idx_pts_vox_sorted[
-                               last_seen:last_seen + nb_pts_per_voxel[idx]]
-
-        # The geometric centre of a grid space
-        grid_barycenter.append(np.mean(voxel_grid[tuple(vox)], axis=0))
-
-        # The point closest to the centre of a grid space
-        grid_candidate_center.append(
-            voxel_grid[tuple(vox)][np.linalg.norm(voxel_grid[tuple(vox)]
-                                                  - np.mean(voxel_grid[tuple(vox)], axis=0), axis=1).argmin()])
-
-        # The ID of the same point
-        grid_candidate_center_id.append(
-            ids_grid[tuple(vox)][np.linalg.norm(voxel_grid[tuple(vox)]
-                                                - np.mean(voxel_grid[tuple(vox)], axis=0), axis=1).argmin()])
-
-        last_seen += nb_pts_per_voxel[idx]
-
-    return grid_candidate_center_id
+    return pc.reduce_resolution_index(points, resolution)
 
 
 def reduce_field(data, idx):
@@ -175,7 +136,9 @@ def reduce_field(data, idx):
     'resolution',
     type=float
 )
-def return_list(field_path, point_path, direction, reference_speed, resolution):
+@output_options
+def return_list(field_path, point_path, direction, reference_speed, resolution,
+                output_format, output):
     if resolution > 0:
         reduce = True
     else:
@@ -196,5 +159,11 @@ def return_list(field_path, point_path, direction, reference_speed, resolution):
         save_path = save_path.with_name("reduced_points.csv")
         points.to_csv(save_path)
 
-    speed = (field * reference_speed).values.T.tolist()[0]
-    click.echo(speed)
+    speed = field.to_numpy()[:, 0] * reference_speed
+
+    if output_format == "list":
+        click.echo(speed.tolist())
+    else:
+        if output is None:
+            output = field_path.with_name("direction_{}".format(rounded_direction))
+        echo_arrays([speed], output, output_format)
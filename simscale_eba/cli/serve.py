@@ -0,0 +1,20 @@
+import click
+
+import simscale_eba.ResultServer as server
+
+
+@click.command("serve")
+@click.option(
+    '--host',
+    type=str,
+    default=server.DEFAULT_HOST,
+    help='The interface to listen on, keep this as localhost.'
+)
+@click.option(
+    '--port',
+    type=int,
+    default=server.DEFAULT_PORT,
+    help='The port to listen on.'
+)
+def serve(host: str, port: int):
+    server.serve(host=host, port=port)
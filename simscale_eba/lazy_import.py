@@ -0,0 +1,44 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    '''
+    Take a module name, return the module, loaded on first attribute use
+
+    Some dependencies, the SimScale SDK, VTK and ladybug, take longer to
+    import than most commands take to run. A module returned here is
+    found straight away, so a missing dependency still fails on import,
+    but it is only executed the first time one of its attributes is used.
+
+    Parameters
+    ----------
+    name : str
+        The name of the module, e.g. "vtk".
+
+    Raises
+    ------
+    ModuleNotFoundError
+        If the module is not installed.
+
+    Returns
+    -------
+    module
+        The lazily loaded module.
+
+    '''
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named '{}'".format(name), name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
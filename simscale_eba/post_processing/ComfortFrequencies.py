@@ -0,0 +1,648 @@
+import numpy as np
+
+# Default upper bound, in bytes, of the working arrays held per chunk
+DEFAULT_MEMORY_BUDGET = 256 * 1024 ** 2
+
+# The number of points x directions x criteria sized arrays alive at once
+# while a chunk is evaluated, the bins, the exceedance and a temporary.
+_ARRAYS_PER_CHUNK = 3
+
+
+def criteria_speeds(comfort_criteria):
+    '''
+    Take a comfort criteria object, return the threshold speeds in order
+
+    Parameters
+    ----------
+    comfort_criteria : comfort criteria object
+        The object repressenting the comfort critria, the comfort_dict
+        is keyed by "0", "1", ... "n".
+
+    Returns
+    -------
+    speeds : np.array
+        A 1D array of threshold speeds, one per comfort category.
+
+    '''
+    comfort_dict = comfort_criteria.comfort_dict
+
+    speeds = []
+    for i in range(0, len(comfort_dict)):
+        speeds.append(comfort_dict[str(i)]["speed"])
+
+    return np.asarray(speeds, dtype=float)
+
+
+def as_criteria_list(comfort_criteria):
+    '''
+    Take one or a list of comfort criteria objects, return a list
+
+    Raises
+    ------
+    Exception
+        If two of the comfort criteria have the same name.
+
+    '''
+    if isinstance(comfort_criteria, (list, tuple)):
+        criteria = list(comfort_criteria)
+    else:
+        criteria = [comfort_criteria]
+
+    names = [criterion.name for criterion in criteria]
+    if len(set(names)) != len(names):
+        raise Exception("Each comfort criteria needs a unique name, got {}".format(names))
+
+    return criteria
+
+
+def shared_criteria_speeds(criteria):
+    '''
+    Take a list of comfort criteria, return the speeds they share
+
+    Many criteria use the same threshold speeds, e.g. the frequency bins
+    of VDI, so the exceedance is evaluated once per distinct speed.
+
+    Parameters
+    ----------
+    criteria : list
+        A list of comfort criteria objects.
+
+    Returns
+    -------
+    speeds : np.array
+        The sorted distinct threshold speeds of all criteria.
+    positions : list
+        For each criteria, the position in speeds of its speeds.
+
+    '''
+    criteria_list = [criteria_speeds(criterion) for criterion in criteria]
+
+    speeds = np.unique(np.concatenate(criteria_list))
+    positions = [np.searchsorted(speeds, criterion_speeds)
+                 for criterion_speeds in criteria_list]
+
+    return speeds, positions
+
+
+def criteria_comfort_maps(point_total, positions, criteria):
+    '''
+    Take the exceedance of the shared speeds, return each comfort map
+
+    Parameters
+    ----------
+    point_total : np.array
+        A 2D array, points x shared speeds, of the total probability of
+        exceedance.
+    positions : list
+        For each criteria, the position of its speeds, from
+        shared_criteria_speeds.
+    criteria : list
+        A list of comfort criteria objects.
+
+    Returns
+    -------
+    comfort_maps : dict
+        The comfort map of each criteria, keyed by its name.
+    worst_case : np.array
+        The highest category of any criteria at each point.
+
+    '''
+    comfort_maps = {}
+    for criterion, position in zip(criteria, positions):
+        comfort_maps[criterion.name] = exceedance_to_comfort_map(
+            point_total[:, position], criterion.comfort_dict)
+
+    worst_case = np.max(np.stack(list(comfort_maps.values()), axis=1), axis=1)
+
+    return comfort_maps, worst_case
+
+
+def get_chunk_size(no_directions, no_criteria,
+                   memory_budget=DEFAULT_MEMORY_BUDGET,
+                   arrays_per_cell=_ARRAYS_PER_CHUNK):
+    '''
+    Take the tensor dimensions and a memory budget, return points per chunk
+
+    Parameters
+    ----------
+    no_directions : int
+        The number of wind directions.
+    no_criteria : int
+        The number of comfort criteria speeds.
+    memory_budget : int, optional
+        The maximum number of bytes the working arrays may occupy.
+
+        The default is DEFAULT_MEMORY_BUDGET, 256MB.
+    arrays_per_cell : int, optional
+        The number of points x directions x criteria sized float arrays
+        alive at once. The default is _ARRAYS_PER_CHUNK, 3.
+
+    Returns
+    -------
+    int
+        The number of points evaluated together, at least 1.
+
+    '''
+    bytes_per_point = (arrays_per_cell
+                       * max(no_directions, 1)
+                       * max(no_criteria, 1)
+                       * np.dtype(float).itemsize)
+
+    return max(1, int(memory_budget // bytes_per_point))
+
+
+def weibull_exceedance(speeds, gamma, scale, shape, probability):
+    '''
+    Take speeds, speed factors and Weibull parameters, return exceedance
+
+    The probability that the local speed, the meteological speed times
+    gamma, exceeds speeds, P·exp(-(s/(γ·c))^k), evaluated directly on
+    arrays. This is scipy's weibull_min.sf(s / γ, k, 0, c) · P, without
+    its per call argument checks, which cost more than the arithmetic.
+    All arguments are broadcast against each other.
+
+    Parameters
+    ----------
+    speeds : float or np.array
+        The local speeds in m/s.
+    gamma : float or np.array
+        The local speed factors, a gamma of 0 never exceeds.
+    scale : float or np.array
+        The Weibull scale parameter, c.
+    shape : float or np.array
+        The Weibull shape parameter, k.
+    probability : float or np.array
+        The probability of the direction occuring, P.
+
+    Returns
+    -------
+    np.array
+        The probability of exceedance.
+
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.asarray(speeds, dtype=float) / (np.asarray(gamma, dtype=float)
+                                                  * np.asarray(scale, dtype=float))
+
+    exceedance = np.asarray(np.power(ratio, shape))
+    np.negative(exceedance, out=exceedance)
+    np.exp(exceedance, out=exceedance)
+
+    return exceedance * probability
+
+
+def directional_exceedance(gamma, speeds, scale, shape, probability):
+    '''
+    Take local speed factors and Weibull parameters, return exceedance
+
+    The probability that the local speed exceeds each of the criteria
+    speeds, per point and direction. The local speed is the meteological
+    speed multiplied by gamma, so exceeding a local speed s is the same
+    as exceeding a meteological speed of s / gamma.
+
+    Parameters
+    ----------
+    gamma : np.array
+        A 2D array of local speed factors, the number of rows is the
+        number of points, the number of columns is the number of
+        directions.
+    speeds : np.array
+        A 1D array of criteria speeds in m/s.
+    scale : np.array
+        A 1D array of the Weibull scale parameter for each direction.
+    shape : np.array
+        A 1D array of the Weibull shape parameter for each direction.
+    probability : np.array
+        A 1D array of the probability of each direction occuring.
+
+    Returns
+    -------
+    np.array
+        A 3D array, points x directions x criteria, of the probability
+        of exceedance.
+
+    '''
+    gamma = np.asarray(gamma, dtype=float)[:, :, np.newaxis]
+    speeds = np.asarray(speeds, dtype=float)[np.newaxis, np.newaxis, :]
+
+    scale = np.asarray(scale, dtype=float)[np.newaxis, :, np.newaxis]
+    shape = np.asarray(shape, dtype=float)[np.newaxis, :, np.newaxis]
+    probability = np.asarray(probability, dtype=float)[np.newaxis, :, np.newaxis]
+
+    return weibull_exceedance(speeds, gamma, scale, shape, probability)
+
+
+def total_exceedance(gamma, speeds, scale, shape, probability,
+                     memory_budget=DEFAULT_MEMORY_BUDGET):
+    '''
+    Take local speed factors and Weibull parameters, return exceedance
+
+    Same as directional_exceedance, but summed over all directions, and
+    evaluated in chunks of points so that the working memory stays
+    within the memory budget regardless of the number of points.
+
+    Parameters
+    ----------
+    gamma : np.array
+        A 2D array of local speed factors, points x directions.
+    speeds : np.array
+        A 1D array of criteria speeds in m/s.
+    scale : np.array
+        A 1D array of the Weibull scale parameter for each direction.
+    shape : np.array
+        A 1D array of the Weibull shape parameter for each direction.
+    probability : np.array
+        A 1D array of the probability of each direction occuring.
+    memory_budget : int, optional
+        The maximum number of bytes the working arrays may occupy.
+
+        The default is DEFAULT_MEMORY_BUDGET, 256MB.
+
+    Returns
+    -------
+    point_total : np.array
+        A 2D array, points x criteria, of the total probability of
+        exceedance.
+
+    '''
+    gamma = np.asarray(gamma, dtype=float)
+    speeds = np.asarray(speeds, dtype=float)
+
+    no_points, no_directions = gamma.shape
+    if len(scale) != no_directions:
+        raise Exception("The local speed factors have {} directions, but the"
+                        " weather statistics have {}".format(no_directions,
+                                                             len(scale)))
+
+    scale = np.asarray(scale, dtype=float)
+    shape = np.asarray(shape, dtype=float)
+    probability = np.asarray(probability, dtype=float)
+
+    # (s/(γ·c))^k = exp(k·(log s - log c) - k·log γ), the first term is
+    # per direction and speed, the second per point and direction, so
+    # the only work per point, direction and speed is two exponentials.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed_terms = shape[:, np.newaxis] * (np.log(speeds)[np.newaxis, :]
+                                              - np.log(scale)[:, np.newaxis])
+
+    # Points x directions working arrays, the gamma terms, the 
+    # exceedance of one criteria speed and a temporary
+    chunk_size = get_chunk_size(no_directions, 1, memory_budget)
+
+    point_total = np.empty((no_points, len(speeds)))
+    for start in range(0, no_points, chunk_size):
+        chunk = slice(start, start + chunk_size)
+
+        # A gamma of 0 is a point that never sees wind, it never exceeds
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gamma_terms = np.log(gamma[chunk, :]) * shape
+
+            for i in range(len(speeds)):
+                exceedance = speed_terms[:, i] - gamma_terms
+                np.exp(exceedance, out=exceedance)
+                np.negative(exceedance, out=exceedance)
+                np.exp(exceedance, out=exceedance)
+
+                point_total[chunk, i] = exceedance @ probability
+
+    return point_total
+
+
+class ExceedanceTable():
+    '''
+    The exceedance of each direction and criteria speed over a grid of 
+    gamma.
+
+    For interactive use, where many gamma fields are evaluated against 
+    the same weather statistics and criteria, the exceedance is 
+    tabulated once per direction on an even grid of gamma, and looked up 
+    with linear interpolation. With the default 4096 steps up to a gamma 
+    of 4, the result is within 1e-5 of weibull_exceedance for typical 
+    meteological Weibull parameters, gammas outside the table are 
+    evaluated exactly.
+    
+    The lookups cost about as much as the exponentials they replace, on
+    the PWC example total_exceedance is the faster of the two, see 
+    examples/Weibull Kernel, the table is for where exponentials are
+    slower than memory, e.g. without a vectorised exp.
+
+    Parameters
+    ----------
+    speeds : np.array
+        A 1D array of criteria speeds in m/s.
+    scale : np.array
+        A 1D array of the Weibull scale parameter for each direction.
+    shape : np.array
+        A 1D array of the Weibull shape parameter for each direction.
+    probability : np.array
+        A 1D array of the probability of each direction occuring.
+    gamma_max : float, optional
+        The largest gamma in the table. The default is 4.
+    no_gamma : int, optional
+        The number of gammas in the table. The default is 4096.
+    '''
+
+    def __init__(self, speeds, scale, shape, probability, gamma_max=4.0,
+                 no_gamma=4096):
+        self.speeds = np.asarray(speeds, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.shape = np.asarray(shape, dtype=float)
+        self.probability = np.asarray(probability, dtype=float)
+
+        self.gamma = np.linspace(0, gamma_max, no_gamma)
+        self.step = self.gamma[1] - self.gamma[0]
+
+        # directions x gamma x criteria
+        self.table = weibull_exceedance(self.speeds[np.newaxis, np.newaxis, :],
+                                        self.gamma[np.newaxis, :, np.newaxis],
+                                        self.scale[:, np.newaxis, np.newaxis],
+                                        self.shape[:, np.newaxis, np.newaxis],
+                                        self.probability[:, np.newaxis, np.newaxis])
+
+        # The limit at a gamma of 0, only a speed of 0 is exceeded
+        self.table[:, 0, :] = np.where(self.speeds[np.newaxis, :] > 0, 0,
+                                       self.probability[:, np.newaxis])
+
+        # A flat directions x gamma lookup per criteria speed
+        self._criteria_tables = [np.ascontiguousarray(self.table[:, :, i]).reshape(-1)
+                                 for i in range(len(self.speeds))]
+
+    def _interpolation(self, gamma):
+        '''
+        Take local speed factors, return their table rows and fractions
+        '''
+        no_directions, no_gamma, _ = self.table.shape
+
+        position = gamma / self.step
+        is_outside = ~((position >= 0) & (position <= no_gamma - 1))
+
+        lower = np.clip(np.floor(np.nan_to_num(position)), 0, no_gamma - 2).astype(np.int64)
+        fraction = position - lower
+
+        # The row of the table of each point and direction
+        row = lower + (np.arange(no_directions) * no_gamma)[np.newaxis, :]
+
+        return row, fraction, is_outside
+
+    def _exact(self, gamma, is_outside):
+        points, directions = np.nonzero(is_outside)
+        exceedance = weibull_exceedance(self.speeds[np.newaxis, :],
+                                        gamma[points, directions][:, np.newaxis],
+                                        self.scale[directions][:, np.newaxis],
+                                        self.shape[directions][:, np.newaxis],
+                                        self.probability[directions][:, np.newaxis])
+
+        return points, directions, exceedance
+
+    def directional_exceedance(self, gamma):
+        '''
+        Take local speed factors, return the interpolated exceedance
+
+        Parameters
+        ----------
+        gamma : np.array
+            A 2D array of local speed factors, points x directions.
+
+        Returns
+        -------
+        np.array
+            A 3D array, points x directions x criteria, of the 
+            probability of exceedance.
+
+        '''
+        gamma = np.asarray(gamma, dtype=float)
+        row, fraction, is_outside = self._interpolation(gamma)
+
+        exceedance = np.empty(gamma.shape + (len(self.speeds),))
+        for i, table in enumerate(self._criteria_tables):
+            lower = np.take(table, row)
+            exceedance[:, :, i] = lower + fraction * (np.take(table, row + 1) - lower)
+
+        if np.any(is_outside):
+            points, directions, exact = self._exact(gamma, is_outside)
+            exceedance[points, directions, :] = exact
+
+        return exceedance
+
+    def total_exceedance(self, gamma, memory_budget=DEFAULT_MEMORY_BUDGET):
+        '''
+        Take local speed factors, return the interpolated total exceedance
+
+        The same as total_exceedance, with the exceedance looked up from
+        the table.
+        '''
+        gamma = np.asarray(gamma, dtype=float)
+
+        no_points, no_directions = gamma.shape
+        if len(self.scale) != no_directions:
+            raise Exception("The local speed factors have {} directions, but the"
+                            " table has {}".format(no_directions, len(self.scale)))
+
+        # Points x directions working arrays, the row, fraction and 
+        # outside mask, and the exceedance and lower value of one speed
+        chunk_size = get_chunk_size(no_directions, 1, memory_budget, 
+                                    arrays_per_cell=5)
+
+        point_total = np.empty((no_points, len(self.speeds)))
+        for start in range(0, no_points, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            row, fraction, is_outside = self._interpolation(gamma[chunk, :])
+            has_outside = np.any(is_outside)
+
+            for i, table in enumerate(self._criteria_tables):
+                exceedance = np.take(table, row + 1)
+                lower = np.take(table, row)
+                exceedance -= lower
+                exceedance *= fraction
+                exceedance += lower
+
+                if has_outside:
+                    exceedance[is_outside] = 0
+
+                point_total[chunk, i] = exceedance.sum(axis=1)
+
+            if has_outside:
+                # Gammas outside the table are added exactly
+                points, _, exact = self._exact(gamma[chunk, :], is_outside)
+                np.add.at(point_total[chunk, :], points, exact)
+
+        return point_total
+
+
+def hourly_histogram(column_index, speeds):
+    '''
+    Take the direction and speed of each hour, return their histogram
+
+    Hourly exceedance only depends on the direction and speed of an
+    hour, and a year of hours has far fewer distinct pairs than hours.
+
+    Parameters
+    ----------
+    column_index : np.array
+        A 1D array of the field column, i.e. direction, of each hour.
+    speeds : np.array
+        A 1D array of the meteological speed of each hour.
+
+    Returns
+    -------
+    pair_columns : np.array
+        The direction column of each distinct pair.
+    pair_speeds : np.array
+        The meteological speed of each distinct pair.
+    weights : np.array
+        The number of hours of each distinct pair.
+
+    '''
+    pairs = np.stack([np.asarray(column_index, dtype=float),
+                      np.asarray(speeds, dtype=float)], axis=1)
+
+    pairs, weights = np.unique(pairs, axis=0, return_counts=True)
+
+    return pairs[:, 0].astype(np.int64), pairs[:, 1], weights
+
+
+def hourly_exceedance(gamma, speeds, pair_columns, pair_speeds, weights,
+                      memory_budget=DEFAULT_MEMORY_BUDGET):
+    '''
+    Take local speed factors and an hourly histogram, return exceedance
+
+    The fraction of hours the local speed exceeds each of the criteria
+    speeds, the same as counting the hours of the hourly speed matrix,
+    but evaluated on the distinct direction and speed pairs of the
+    histogram. A local speed exceeds s when the meteological speed
+    exceeds s / gamma, so for each direction the pairs are sorted by
+    speed once, and the hours above s / gamma are a lookup in the
+    cumulative hours of the faster pairs.
+
+    Parameters
+    ----------
+    gamma : np.array
+        A 2D array of local speed factors, points x directions.
+    speeds : np.array
+        A 1D array of criteria speeds in m/s.
+    pair_columns : np.array
+        The direction column of each pair, from hourly_histogram.
+    pair_speeds : np.array
+        The meteological speed of each pair.
+    weights : np.array
+        The number of hours of each pair.
+    memory_budget : int, optional
+        The maximum number of bytes the working arrays may occupy.
+
+        The default is DEFAULT_MEMORY_BUDGET, 256MB.
+
+    Returns
+    -------
+    point_total : np.array
+        A 2D array, points x criteria, of the fraction of hours that
+        exceed each criteria speed.
+
+    '''
+    gamma = np.asarray(gamma, dtype=float)
+    speeds = np.asarray(speeds, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+
+    no_points, no_directions = gamma.shape
+    total_hours = weights.sum()
+
+    chunk_size = get_chunk_size(1, len(speeds), memory_budget)
+
+    point_total = np.zeros((no_points, len(speeds)))
+    for column in np.unique(pair_columns):
+        is_column = pair_columns == column
+        order = np.argsort(pair_speeds[is_column])
+        column_speeds = pair_speeds[is_column][order]
+
+        # The hours of the pairs at or above each position
+        hours_above = np.r_[np.cumsum(weights[is_column][order][::-1])[::-1], 0]
+
+        for start in range(0, no_points, chunk_size):
+            chunk = slice(start, start + chunk_size)
+
+            # A gamma of 0 is a point that never sees wind, it never exceeds
+            with np.errstate(divide='ignore'):
+                bins = speeds[np.newaxis, :] / gamma[chunk, column][:, np.newaxis]
+
+            position = np.searchsorted(column_speeds, bins, side='right')
+            point_total[chunk, :] += hours_above[position]
+
+    return point_total / total_hours
+
+
+def exceedance_to_comfort_map(point_total, comfort_dict):
+    '''
+    Take the total exceedance per point, return the comfort category
+
+    A point takes the category after the highest criteria it exceeds,
+    i.e. 0 if it exceeds none.
+
+    Parameters
+    ----------
+    point_total : np.array
+        A 2D array, points x criteria, of the total probability of
+        exceedance.
+    comfort_dict : dict
+        The comfort criteria dictionary, keyed by "0", "1", ... "n".
+
+    Returns
+    -------
+    comfort_map : np.array
+        A 1D array of the comfort category of each point.
+
+    '''
+    comfort_map = np.zeros(point_total.shape[0])
+
+    for i in range(0, len(comfort_dict)):
+        if comfort_dict[str(i)]["frequency"][0] == "less":
+
+            criteria = (comfort_dict[str(i)]["frequency"][1]) / 100
+            is_exceeding = point_total[:, i] > criteria
+            comfort_map[is_exceeding] = i + 1
+
+    return comfort_map
+
+
+def align_weibull_parameters(directions, weibull_parameters):
+    '''
+    Take field directions and Weibull parameters, return aligned arrays
+
+    The weibull parameters are matched to the directions of the field by
+    value.
+
+    Parameters
+    ----------
+    directions : list
+        The directions of the field columns, as strings or floats.
+    weibull_parameters : pd.DataFrame
+        The weibull parameters from the weather statistics, with the rows
+        shape, scale and probability, and a column per direction.
+
+    Raises
+    ------
+    Exception
+        If the field and the weibull parameters have different directions.
+
+    Returns
+    -------
+    scale : np.array
+    shape : np.array
+    probability : np.array
+
+    '''
+    field_directions = np.asarray(directions, dtype=float)
+    weibull_directions = weibull_parameters.columns.astype(float).to_numpy()
+
+    if (len(field_directions) != len(weibull_directions)
+            or set(field_directions) != set(weibull_directions)):
+        raise Exception("The field has the directions {}, but the weibull "
+                        "parameters have {}".format(field_directions.tolist(),
+                                                    weibull_directions.tolist()))
+
+    order = [np.flatnonzero(weibull_directions == direction)[0]
+             for direction in field_directions]
+
+    scale = weibull_parameters.loc["scale", :].to_numpy(dtype=float)[order]
+    shape = weibull_parameters.loc["shape", :].to_numpy(dtype=float)[order]
+    probability = weibull_parameters.loc["probability", :].to_numpy(dtype=float)[order]
+
+    return scale, shape, probability
@@ -0,0 +1,269 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class HourlyReducer(ABC):
+    '''
+    A per point statistic of the hourly local wind speeds.
+
+    A reducer is given the hourly speed matrix one block at a time, a
+    chunk of points by a block of hours, and keeps only what it needs
+    to give its statistic at the end, so the matrix is never held in
+    full. Reducers are passed to
+    pedestrian_wind_comfort_results.hourly_statistics, or
+    PedestrianWindComfort.reduce_hourly_speed_matrix, and several can be
+    evaluated in the same pass.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+
+    @abstractmethod
+    def allocate(self, no_points, no_hours, upper_speed):
+        '''
+        Take the matrix size and its largest speed, set up the result
+        '''
+
+    def bytes_per_point(self, chunk_hours):
+        '''
+        Take the hours in a block, return the working bytes per point
+        '''
+        return 0
+
+    @abstractmethod
+    def update(self, points, hours, speeds):
+        '''
+        Take a block of the speed matrix, add it to the statistic
+
+        Parameters
+        ----------
+        points : slice
+            The points of the block.
+        hours : slice
+            The hours of the block.
+        speeds : np.array
+            The local wind speeds of the block, points x hours.
+
+        '''
+
+    def finish(self, points):
+        '''
+        Take a chunk of points, whose hours have all been given
+        '''
+        pass
+
+    def result(self):
+        '''
+        Return the statistic, an array with a row per point
+        '''
+        return self._result
+
+
+class HoursAbove(HourlyReducer):
+    '''
+    The number of hours the local speed is above one or more thresholds.
+
+    Parameters
+    ----------
+    thresholds : float or list
+        The speeds in m/s, a list gives a column per threshold.
+    name : str, optional
+        The key of the result. The default is "hours_above".
+    '''
+
+    def __init__(self, thresholds, name="hours_above"):
+        super().__init__(name)
+        self.thresholds = np.asarray(thresholds, dtype=float)
+
+    def allocate(self, no_points, no_hours, upper_speed):
+        self._result = np.zeros((no_points,) + self.thresholds.shape, dtype=np.int32)
+
+    def update(self, points, hours, speeds):
+        for i, threshold in enumerate(self.thresholds.reshape(-1)):
+            count = np.count_nonzero(speeds > threshold, axis=1)
+            if self.thresholds.ndim == 0:
+                self._result[points] += count.astype(np.int32)
+            else:
+                self._result[points, i] += count.astype(np.int32)
+
+
+class Maximum(HourlyReducer):
+    '''
+    The maximum hourly local speed.
+    '''
+
+    def __init__(self, name="maximum"):
+        super().__init__(name)
+
+    def allocate(self, no_points, no_hours, upper_speed):
+        self._result = np.full(no_points, -np.inf)
+
+    def update(self, points, hours, speeds):
+        np.maximum(self._result[points], speeds.max(axis=1, initial=-np.inf),
+                   out=self._result[points])
+
+
+class Minimum(HourlyReducer):
+    '''
+    The minimum hourly local speed.
+    '''
+
+    def __init__(self, name="minimum"):
+        super().__init__(name)
+
+    def allocate(self, no_points, no_hours, upper_speed):
+        self._result = np.full(no_points, np.inf)
+
+    def update(self, points, hours, speeds):
+        np.minimum(self._result[points], speeds.min(axis=1, initial=np.inf),
+                   out=self._result[points])
+
+
+class Mean(HourlyReducer):
+    '''
+    The mean hourly local speed, over all hours, or per period.
+
+    Parameters
+    ----------
+    groups : list, optional
+        A label per hour, e.g. the month, or the name of a period. The
+        result has a column per unique label, in sorted order, kept in
+        self.labels. If None, the mean of all hours.
+    name : str, optional
+        The key of the result. The default is "mean".
+    '''
+
+    def __init__(self, groups=None, name="mean"):
+        super().__init__(name)
+        self.groups = groups
+        self.labels = None
+
+    def allocate(self, no_points, no_hours, upper_speed):
+        if self.groups is None:
+            inverse = np.zeros(no_hours, dtype=np.int64)
+            self.labels = None
+            no_groups = 1
+        else:
+            if len(self.groups) != no_hours:
+                raise Exception("There are {} group labels, but {} hours".format(
+                    len(self.groups), no_hours))
+            self.labels, inverse = np.unique(np.asarray(self.groups),
+                                             return_inverse=True)
+            no_groups = len(self.labels)
+
+        # An hours x groups matrix, a block of sums is one matrix product
+        self._indicator = np.zeros((no_hours, no_groups))
+        self._indicator[np.arange(no_hours), inverse.reshape(-1)] = 1
+        self._counts = self._indicator.sum(axis=0)
+
+        self._sums = np.zeros((no_points, no_groups))
+
+    def update(self, points, hours, speeds):
+        self._sums[points] += speeds @ self._indicator[hours]
+
+    def result(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self._sums / self._counts
+
+        if self.groups is None:
+            return mean[:, 0]
+        return mean
+
+
+class Percentile(HourlyReducer):
+    '''
+    Percentiles of the hourly local speed.
+
+    The hours of each point are counted into speed bins of width
+    resolution, and the percentiles are interpolated from the cumulative
+    counts, the same as np.nanpercentile(..., method="linear") to within
+    resolution. Hours without a speed, NaN, are left out, and a point
+    without any speeds has a NaN percentile. Only the bins of the current
+    chunk of points are kept.
+
+    Parameters
+    ----------
+    q : float or list
+        The percentiles, between 0 and 100, a list gives a column per
+        percentile.
+    resolution : float, optional
+        The width of the speed bins in m/s. The default is 0.05.
+    name : str, optional
+        The key of the result. The default is "percentile".
+    '''
+
+    def __init__(self, q, resolution=0.05, name="percentile"):
+        super().__init__(name)
+        self.q = np.asarray(q, dtype=float)
+        self.resolution = resolution
+
+    def allocate(self, no_points, no_hours, upper_speed):
+        self.no_hours = no_hours
+        self.no_bins = int(np.floor(max(upper_speed, 0) / self.resolution)) + 1
+        self._result = np.full((no_points,) + self.q.shape, np.nan)
+        self._counts = None
+
+    def bytes_per_point(self, chunk_hours):
+        # The bin counts, and the flat bin index of a block
+        return (self.no_bins + 1) * 8 * 2 + chunk_hours * 8
+
+    def update(self, points, hours, speeds):
+        no_points = speeds.shape[0]
+        # The last bin of each point counts its NaN hours
+        no_bins = self.no_bins + 1
+        if self._counts is None or self._counts.shape[0] != no_points:
+            self._counts = np.zeros((no_points, no_bins), dtype=np.int64)
+
+        is_nan = np.isnan(speeds)
+        bins = np.floor(np.where(is_nan, 0, speeds) / self.resolution).astype(np.int64)
+        np.clip(bins, 0, self.no_bins - 1, out=bins)
+        bins[is_nan] = self.no_bins
+        bins += (np.arange(no_points) * no_bins)[:, np.newaxis]
+
+        self._counts += np.bincount(bins.reshape(-1),
+                                    minlength=no_points * no_bins
+                                    ).reshape(no_points, no_bins)
+
+    def finish(self, points):
+        if self._counts is None:
+            return
+
+        counts = self._counts[:, :-1]
+        cumulative = np.cumsum(counts, axis=1)
+        rows = np.arange(cumulative.shape[0])
+
+        # The hours with a speed, a point without any has a NaN result
+        no_hours = cumulative[:, -1]
+        has_hours = no_hours > 0
+
+        def sorted_speed(position):
+            # The bin of the hour at a position in the sorted hours, the 
+            # hours are spread evenly through the width of their bin
+            position = np.minimum(position, np.maximum(no_hours - 1, 0))
+            bin_index = np.argmax(cumulative > position[:, np.newaxis], axis=1)
+            count = counts[rows, bin_index]
+            below = cumulative[rows, bin_index] - count
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                speed = (bin_index + (position - below + 0.5) / count) * self.resolution
+
+            return np.where(has_hours, speed, np.nan)
+
+        result = []
+        for q in self.q.reshape(-1):
+            # The position of the percentile in the sorted hours of each point
+            rank = q / 100 * np.maximum(no_hours - 1, 0)
+            lower = np.floor(rank)
+
+            speed = sorted_speed(lower)
+            upper = sorted_speed(lower + 1)
+            speed += (rank - lower) * (upper - speed)
+            result.append(speed)
+
+        result = np.stack(result, axis=1)
+        if self.q.ndim == 0:
+            result = result[:, 0]
+
+        self._result[points] = result
+        self._counts = None
@@ -121,8 +121,6 @@ def csv_to_dimensionless_df(self, df, variables, direction):
         for each variable.
 
     '''
-    df = df.copy()
-
     dimensional = csv_to_dimensionall_df(self, df, variables)
 
     output_df = pd.DataFrame(np.zeros((df.shape[0], len(variables))),
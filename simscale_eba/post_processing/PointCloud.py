@@ -0,0 +1,172 @@
+import numpy as np
+
+# The relative difference in distance to a barycentre that is a tie
+TIE_TOLERANCE = 1e-12
+
+
+def voxel_keys(points, voxel_size):
+    '''
+    Take points and a voxel size, return a single integer key per voxel
+
+    The voxel of a point is its offset from the minimum corner of the
+    cloud, floor divided by the voxel size. The three integer voxel
+    coordinates are combined into one int64 key, whose order is the
+    lexicographic order of the voxel coordinates, i.e. the order of
+    np.unique(..., axis=0).
+
+    Parameters
+    ----------
+    points : np.array
+        A 2D array of point locations, a row per point, 3 columns X, Y
+        and Z.
+    voxel_size : float
+        The edge length of a voxel in meters.
+
+    Returns
+    -------
+    np.array
+        A 1D int64 array of a voxel key per point.
+
+    '''
+    voxels = ((points - np.min(points, axis=0)) // voxel_size).astype(np.int64)
+
+    dimensions = voxels.max(axis=0) + 1
+    if np.prod(dimensions.astype(float)) >= np.iinfo(np.int64).max:
+        # Too many voxels to combine, number them by their unique rows
+        return np.unique(voxels, axis=0, return_inverse=True)[1].reshape(-1)
+
+    return (voxels[:, 0] * dimensions[1] + voxels[:, 1]) * dimensions[2] + voxels[:, 2]
+
+
+def reduce_resolution_index(points, resolution):
+    '''
+    Take a fine point cloud, return the ID's of the points of a coarser one
+
+    The cloud is split into cubic voxels with an edge of resolution, for
+    each voxel that contains points, the point closest to the barycentre
+    of the voxel's points is kept. There is no loop over the voxels, the
+    points are sorted by voxel once, the barycentres are a segmented sum
+    with np.add.reduceat, and the closest point of each voxel is the first
+    of each segment after sorting by voxel then distance.
+
+    Points as close to the barycentre as each other, e.g. both points of
+    a voxel with two, are tied to a relative tolerance, and the one with
+    the lowest ID is kept. The loop this replaced kept whichever rounding
+    put closer, so it can keep a different point of those voxels.
+
+    Parameters
+    ----------
+    points : np.array or pd.DataFrame
+        Point locations with 3 columns, X, Y and Z, the number of rows is
+        the number of points.
+    resolution : int or float
+        The desired resolution in meters, for example, if we wanted an
+        output sensor grid no finner than 5m then we can input 5.
+
+    Returns
+    -------
+    np.array
+        The ID's of the points in the original points list to KEEP, one
+        per voxel, ordered by voxel.
+
+    '''
+    points = np.asarray(points, dtype=float)
+    if points.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    keys = voxel_keys(points, resolution)
+
+    # Points grouped by voxel, in the order of np.unique's voxel ranks,
+    # and by ID within a voxel
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    sorted_points = points[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_keys)])
+
+    # The geometric centre of the points of each voxel
+    barycentres = np.add.reduceat(sorted_points, starts, axis=0) / counts[:, np.newaxis]
+
+    segment = np.repeat(np.arange(len(starts)), counts)
+    distance = np.linalg.norm(sorted_points - barycentres[segment], axis=1)
+
+    # The closest point of each voxel, ties go to the first point. Equal
+    # distances can differ by an ulp, a relative tolerance keeps them tied
+    minimum = np.minimum.reduceat(distance, starts)
+    candidates = np.flatnonzero(distance <= minimum[segment] * (1 + TIE_TOLERANCE))
+    candidate_segment = segment[candidates]
+    is_first = np.r_[True, candidate_segment[1:] != candidate_segment[:-1]]
+
+    return order[candidates[is_first]]
+
+
+def grid_connected_components(points, distance):
+    '''
+    Take a point cloud, return a label for each connected group of points
+
+    The points are hashed into cubic cells with an edge of distance, two
+    occupied cells that touch, including at an edge or corner, are
+    connected. Each connected group of cells is one label. This takes one
+    sort of the occupied cells and 13 lookups per cell, so it is linear in
+    the number of points after the sort, and it is used to split a cloud
+    into its separate surfaces when the surfaces are not otherwise known.
+
+    Parameters
+    ----------
+    points : np.array or pd.DataFrame
+        Point locations with 3 columns, X, Y and Z, the number of rows is
+        the number of points.
+    distance : float
+        The cell size in meters, points further apart than this are only
+        connected through other points.
+
+    Returns
+    -------
+    labels : np.array
+        A 1D int64 array of a label per point, numbered from 0.
+
+    '''
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    points = np.asarray(points, dtype=float)
+    if points.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # A border of one cell, so neighbours of occupied cells are never negative
+    cells = ((points - np.min(points, axis=0)) // distance).astype(np.int64) + 1
+    dimensions = cells.max(axis=0) + 2
+
+    def cell_key(cells):
+        return (cells[:, 0] * dimensions[1] + cells[:, 1]) * dimensions[2] + cells[:, 2]
+
+    occupied, inverse = np.unique(cell_key(cells), return_inverse=True)
+    occupied_cells = np.stack(np.unravel_index(occupied, dimensions), axis=1)
+
+    # Half of the 26 neighbours, the other half are the same pairs reversed
+    offsets = np.array([(i, j, k)
+                        for i in (-1, 0, 1)
+                        for j in (-1, 0, 1)
+                        for k in (-1, 0, 1)
+                        if (i, j, k) > (0, 0, 0)])
+
+    rows = []
+    columns = []
+    for offset in offsets:
+        neighbour = cell_key(occupied_cells + offset)
+        position = np.searchsorted(occupied, neighbour)
+        position[position == len(occupied)] = 0
+        is_occupied = occupied[position] == neighbour
+
+        rows.append(np.flatnonzero(is_occupied))
+        columns.append(position[is_occupied])
+
+    rows = np.concatenate(rows)
+    columns = np.concatenate(columns)
+
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, columns)),
+                       shape=(len(occupied), len(occupied)))
+    _, cell_labels = connected_components(graph, directed=False)
+
+    return cell_labels[inverse.reshape(-1)].astype(np.int64)
@@ -19,6 +19,7 @@ class simulation_status():
         self.field_paths = None
         self.points_path = None
         self.output_stl_paths = None
+        self.store_path = None
 
     def set_simulation(self, project, simulation, run):
         self.project_name = project
@@ -93,6 +94,7 @@ class simulation_status():
         self.field_paths = read_dict["field_paths"]
         self.points_path = read_dict["points_path"]
         self.output_stl_paths = read_dict["output_stl_paths"]
+        self.store_path = read_dict.get("store_path")
 
     def write_simulation_status(self, boolean=None):
         '''
@@ -119,7 +121,8 @@ class simulation_status():
             "download_paths": self.download_paths,
             "field_paths": self.field_paths,
             "points_path": self.points_path,
-            "output_stl_paths": self.output_stl_paths
+            "output_stl_paths": self.output_stl_paths,
+            "store_path": self.store_path
         }
 
         json_object = json.dumps(json_dictionary, indent=4)